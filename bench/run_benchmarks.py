@@ -0,0 +1,318 @@
+"""Standard library only benchmarks for Platitudes.
+
+Measures the costs a CLI built with Platitudes pays on every start:
+
+- importing `Platitudes` and registering a command
+- decorating commands with `Platitudes.command` as the number of parameters
+  and the number of subcommands grow
+- `parse_args` plus action processing for the types with custom actions
+- merging a config file of growing size with the command line
+- memory retained per registered command
+
+Results are written as JSON. Passing `--compare` with a previous results file
+reports the relative change per benchmark and exits with a non-zero code if
+any of them regressed by more than `--threshold`.
+
+Usage
+-----
+```
+python bench/run_benchmarks.py --output bench_results.json
+python bench/run_benchmarks.py --compare bench_results.json
+```
+"""
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Any
+from unittest import mock
+from uuid import UUID
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import platitudes as pl  # noqa: E402
+from platitudes.platitudes import _merge_magic_config_with_argv  # noqa: E402
+
+SIZES = (10, 100, 1000)
+
+
+class Color(Enum):  # noqa: D101
+    RED = 0
+    GREEN = 1
+    BLUE = 2
+
+
+def _make_command(n_params: int, type_: Any = int, default: Any = 0) -> Callable:
+    """Build a function with `n_params` optional parameters of type `type_`."""
+
+    def command(**kwargs):
+        return kwargs
+
+    command.__signature__ = inspect.Signature(  # type: ignore[attr-defined]
+        [
+            inspect.Parameter(
+                f"param_{i}",
+                inspect.Parameter.KEYWORD_ONLY,
+                default=default,
+                annotation=type_,
+            )
+            for i in range(n_params)
+        ]
+    )
+    return command
+
+
+def _best_ns(stmt: Callable[[], Any], number: int, repeat: int) -> float:
+    """Best time per call in nanoseconds, as recommended by `timeit`."""
+    timer = timeit.Timer(stmt, timer=perf_counter_ns)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+IMPORT_CODE = """
+from time import perf_counter_ns as t
+s = t()
+from platitudes import Platitudes
+
+app = Platitudes()
+
+@app.command()
+def hello(name: str):
+    pass
+
+print(t() - s)
+"""
+
+
+def bench_import(repeat: int) -> dict[str, float]:
+    """Time importing `Platitudes` and registering a command, in a fresh interpreter.
+
+    A bare `import platitudes` is almost free since the names of the package
+    are imported on first use.
+    """
+    timings = []
+    env = os.environ | {"PYTHONPATH": str(REPO_ROOT), "PYTHONDONTWRITEBYTECODE": ""}
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_CODE],
+            check=True,
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+        timings.append(float(out.stdout))
+    return {"import_and_register": min(timings)}
+
+
+def bench_decoration_params(repeat: int) -> dict[str, float]:
+    """Cost of registering a single command as its signature grows."""
+    results = {}
+    for size in SIZES:
+        command = _make_command(size)
+        command.__name__ = "cmd"
+
+        def decorate(command=command):
+            pl.Platitudes().command()(command)
+
+        number = max(1, 1000 // size)
+        results[f"decorate_params_{size}"] = _best_ns(decorate, number, repeat)
+    return results
+
+
+def bench_decoration_commands(repeat: int) -> dict[str, float]:
+    """Cost of registering a growing number of small subcommands."""
+    results = {}
+    for size in SIZES:
+        commands = []
+        for i in range(size):
+            command = _make_command(3)
+            command.__name__ = f"cmd_{i}"
+            commands.append(command)
+
+        def decorate(commands=commands):
+            app = pl.Platitudes()
+            for command in commands:
+                app.command()(command)
+
+        number = max(1, 100 // size)
+        results[f"decorate_commands_{size}"] = _best_ns(decorate, number, repeat)
+    return results
+
+
+def bench_parse(repeat: int) -> dict[str, float]:
+    """`parse_args` plus action processing for each type with a custom action."""
+    cases: dict[str, tuple[Any, Any, str]] = {
+        "datetime": (
+            datetime,
+            datetime(2020, 1, 1, tzinfo=timezone.utc),
+            "2021-02-03T04:05:06",
+        ),
+        "enum": (Color, Color.RED, "2"),
+        "path": (Path, REPO_ROOT, str(REPO_ROOT / "LICENSE")),
+        "uuid": (UUID, UUID(int=0), "d48edaa6-871a-4082-a196-4daab372d4a1"),
+    }
+    results = {}
+    for name, (type_, default, raw) in cases.items():
+        for size in SIZES[:2]:
+            command = _make_command(size, type_, default)
+            command.__name__ = "cmd"
+            app = pl.Platitudes()
+            app.command()(command)
+            argv = ["cmd"]
+            for i in range(size):
+                argv.extend([f"--param-{i}", raw])
+
+            def parse(app=app, argv=argv):
+                app._parser.parse_args(argv)
+
+            number = max(1, 1000 // size)
+            results[f"parse_{name}_{size}"] = _best_ns(parse, number, repeat)
+    return results
+
+
+def bench_config_merge(repeat: int) -> dict[str, float]:
+    """Cost of loading and converting a config file as it grows.
+
+    Converted values are cached after the first run so this measures reusing
+    them, which is what repeated invocations pay.
+    """
+    results = {}
+    with (
+        tempfile.TemporaryDirectory() as tmp_dir,
+        mock.patch.dict(os.environ, {"PLATITUDES_CACHE_DIR": tmp_dir}),
+    ):
+        for size in SIZES:
+            command = _make_command(size)
+            command.__name__ = "cmd"
+            app = pl.Platitudes()
+            app.command(config_file="config-file")(command)
+
+            config_path = Path(tmp_dir) / f"config_{size}.json"
+            config_path.write_text(json.dumps({f"param_{i}": i for i in range(size)}))
+            args_ = app._parser.parse_args(["cmd", "--config-file", str(config_path)])
+            actions = app._command_actions["cmd"]
+
+            def merge(args_=args_, actions=actions, command=command):
+                _merge_magic_config_with_argv("config-file", args_, actions, command)
+
+            number = max(1, 1000 // size)
+            results[f"config_merge_{size}"] = _best_ns(merge, number, repeat)
+
+    return results
+
+
+def bench_memory() -> dict[str, float]:
+    """Bytes retained by the app per registered command."""
+    results = {}
+    for n_params in SIZES[:2]:
+        commands = []
+        for i in range(100):
+            command = _make_command(n_params)
+            command.__name__ = f"cmd_{i}"
+            commands.append(command)
+
+        app = pl.Platitudes()
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        for command in commands:
+            app.command()(command)
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"bytes_per_command_{n_params}_params"] = (after - before) / 100
+    return results
+
+
+BENCHMARKS = (
+    bench_import,
+    bench_decoration_params,
+    bench_decoration_commands,
+    bench_parse,
+    bench_config_merge,
+)
+
+
+def run_benchmarks(repeat: int) -> dict[str, Any]:
+    """Run every benchmark and collect the results with some metadata."""
+    timings: dict[str, float] = {}
+    for benchmark in BENCHMARKS:
+        timings |= benchmark(repeat)
+
+    return {
+        "metadata": {
+            "platitudes": pl.__version__,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+        },
+        "timings": timings,
+        "memory": bench_memory(),
+    }
+
+
+def compare(
+    current: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    """Print a comparison table and return the names of the regressions."""
+    regressions = []
+    print(f"{'benchmark':<32} {'baseline':>14} {'current':>14} {'change':>9}")
+    for name, value in current.items():
+        if name not in baseline:
+            print(f"{name:<32} {'-':>14} {value:>14.0f} {'new':>9}")
+            continue
+
+        change = value / baseline[name] - 1
+        marker = ""
+        if change > threshold:
+            marker = "  <-- regression"
+            regressions.append(name)
+        print(
+            f"{name:<32} {baseline[name]:>14.0f} {value:>14.0f} {change:>+8.1%}{marker}"
+        )
+    return regressions
+
+
+def main() -> None:  # noqa: D103
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat)
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.compare is None:
+        for name, value in results["timings"].items():
+            print(f"{name:<32} {value:>14.0f} ns")
+        for name, value in results["memory"].items():
+            print(f"{name:<32} {value:>14.0f} B")
+        return
+
+    baseline = json.loads(args.compare.read_text())
+    regressions = []
+    for section in ("timings", "memory"):
+        regressions += compare(
+            results[section], baseline.get(section, {}), args.threshold
+        )
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed: {regressions}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,69 @@
 
 __version__ = "2.0.0"
 
-from .argument import Argument
-from .platitudes import (
-    Exit,
-    Platitudes,
-    PlatitudesError,
-    _is_maybe,  # noqa: F401
-    _unwrap_annotated,  # noqa: F401
-    _unwrap_maybe,  # noqa: F401
-    run,
-)
-
-__all__ = ["Argument", "Exit", "Platitudes", "PlatitudesError", "run"]
+import importlib
+
+# Same as `typing.TYPE_CHECKING` without importing `typing`
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+
+    from .argument import Argument
+    from .context import Context
+    from .files import BinaryFile, MappedFile, TextFile
+    from .intset import IntSet
+    from .platitudes import Exit, Platitudes, PlatitudesError, run
+    from .progress import Progress
+    from .resources import Resource
+
+__all__ = [
+    "Argument",
+    "BinaryFile",
+    "Context",
+    "Exit",
+    "IntSet",
+    "MappedFile",
+    "Platitudes",
+    "PlatitudesError",
+    "Progress",
+    "Resource",
+    "TextFile",
+    "run",
+]
+
+# Public names are imported from their module on first access, so that
+# `platitudes.launcher` can answer `--help` without importing the whole package
+_EXPORTS = {
+    "Argument": "argument",
+    "BinaryFile": "files",
+    "Context": "context",
+    "Exit": "platitudes",
+    "IntSet": "intset",
+    "MappedFile": "files",
+    "Platitudes": "platitudes",
+    "PlatitudesError": "platitudes",
+    "Progress": "progress",
+    "Resource": "resources",
+    "TextFile": "files",
+    "run": "platitudes",
+    "_is_maybe": "platitudes",
+    "_unwrap_annotated": "platitudes",
+    "_unwrap_maybe": "platitudes",
+}
+
+
+def __getattr__(name: str) -> "Any":
+    """Import the public names of the package when first used."""
+    module = _EXPORTS.get(name)
+    if module is None:
+        e_ = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(e_)
+
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    """Names of the package, including those not imported yet."""
+    return sorted({*globals(), *_EXPORTS})
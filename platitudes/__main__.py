@@ -0,0 +1,116 @@
+"""Command line tools for applications built with Platitudes."""
+
+import os
+import sys
+from pathlib import Path
+from typing import Annotated
+
+from . import __version__
+from .argument import Argument
+from .bundle import build_bundle, compare_startup
+from .check import check_app
+from .errors import PlatitudesError
+from .manifest import import_target, write_manifest
+from .platitudes import Platitudes
+
+app = Platitudes(
+    description="Build tools for Platitudes applications.", version=__version__
+)
+app._parser.prog = "python -m platitudes"
+
+
+@app.command()
+def manifest(
+    target: Annotated[
+        str, Argument(help="The application as 'package.module:attribute'")
+    ],
+    output: Annotated[Path, Argument(help="Where to write the manifest")] = Path(
+        "cli_manifest.json"
+    ),
+    prog: Annotated[
+        str | None,
+        Argument(help="Program name shown in the help. Defaults to the package"),
+    ] = None,
+):
+    """Write the manifest used by `platitudes.launcher` to answer --help."""
+    if prog is None:
+        prog = _default_prog(target)
+
+    commands = write_manifest(target, output, prog)["commands"]
+    print(f"Wrote manifest for {len(commands)} commands to {output}")
+
+
+@app.command()
+def bundle(
+    target: Annotated[
+        str, Argument(help="The application as 'package.module:attribute'")
+    ],
+    output: Annotated[Path, Argument(help="Where to write the zipapp")] = Path(
+        "app.pyz"
+    ),
+    prog: Annotated[
+        str | None,
+        Argument(help="Program name shown in the help. Defaults to the package"),
+    ] = None,
+    interpreter: Annotated[
+        str | None,
+        Argument(help="Shebang interpreter. Defaults to the running Python version"),
+    ] = None,
+    timing: Annotated[
+        bool, Argument(help="Compare the startup time of the bundle")
+    ] = True,
+):
+    """Package an application as a zipapp with precompiled bytecode."""
+    if prog is None:
+        prog = _default_prog(target)
+
+    build_bundle(target, output, prog, interpreter)
+    print(f"Wrote {output} ({output.stat().st_size / 1024:.0f} KiB)")
+
+    if timing:
+        unbundled, bundled = compare_startup(target, output, prog)
+        print(f"--help startup: {unbundled * 1e3:.1f} ms unbundled,", end=" ")
+        print(f"{bundled * 1e3:.1f} ms bundled ({unbundled / bundled:.1f}x)")
+
+
+@app.command()
+def check(
+    target: Annotated[
+        str, Argument(help="The application as 'package.module:attribute'")
+    ],
+):
+    """Validate the signatures of every command of an application.
+
+    Applications passing the check can run in trusted mode, with `python -O`
+    or `PLATITUDES_TRUSTED=1`, which skips these checks on every start.
+    """
+    # Import in trusted mode so that all the problems are reported below
+    # rather than the first one raising while registering the commands
+    previous = os.environ.get("PLATITUDES_TRUSTED")
+    os.environ["PLATITUDES_TRUSTED"] = "1"
+    try:
+        target_app = import_target(target)
+    except PlatitudesError as e:
+        print(f"{target}: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if previous is None:
+            del os.environ["PLATITUDES_TRUSTED"]
+        else:
+            os.environ["PLATITUDES_TRUSTED"] = previous
+
+    n_commands, errors = check_app(target_app)
+    for error in errors:
+        print(error, file=sys.stderr)
+    if errors:
+        print(f"{target}: {len(errors)} problems found", file=sys.stderr)
+        sys.exit(1)
+    print(f"{target}: {n_commands} commands OK")
+
+
+def _default_prog(target: str) -> str:
+    return target.split(".", 1)[0].split(":", 1)[0]
+
+
+if __name__ == "__main__":
+    app()
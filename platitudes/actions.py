@@ -15,9 +15,20 @@ from typing import Any
 from uuid import UUID
 
 from .errors import PlatitudesError
+from .files import DASH, MappedFile
+from .globbing import GlobPaths
+from .intset import IntSet, parse_range
+
+ROLES = (None, "input", "output")
 
 
 class PlatitudesAction(argparse.Action):  # noqa: D101
+    # Whether the parameter is an "input" or an "output" of the command
+    role: str | None = None
+    # Whether parsed values can be reused, i.e. they don't depend on the state
+    # of the filesystem
+    cacheable: bool = True
+
     @staticmethod
     def process(val, _dest) -> Any:  # noqa: D102
         raise NotImplementedError
@@ -111,6 +122,7 @@ class IntAction(PlatitudesAction):
 
 class UUIDAction(PlatitudesAction):
     """Action for parsing UUID"""
+
     @staticmethod
     def process(val, dest):
         """Process UUID"""
@@ -124,8 +136,45 @@ class UUIDAction(PlatitudesAction):
         return out
 
 
+class RangeAction(PlatitudesAction):
+    """Action for parsing inclusive ranges like 0-100 into `range`"""
+
+    @staticmethod
+    def process(val, dest):
+        """Process range"""
+        if isinstance(val, range):
+            return val
+        try:
+            out = parse_range(str(val))
+        except PlatitudesError as e:
+            e_ = f"argument {dest}: {e.args[0]}"
+            raise PlatitudesError(e_) from None
+        return out
+
+
+class IntSetAction(PlatitudesAction):
+    """Action for parsing integers and ranges like 1,5,9-200 into an `IntSet`"""
+
+    @staticmethod
+    def process(val, dest):
+        """Process IntSet"""
+        if isinstance(val, IntSet):
+            return val
+        try:
+            if isinstance(val, list):
+                # e.g. from a JSON config file
+                out = IntSet(",".join(str(v) for v in val))
+            else:
+                out = IntSet(str(val))
+        except PlatitudesError as e:
+            e_ = f"argument {dest}: {e.args[0]}"
+            raise PlatitudesError(e_) from None
+        return out
+
+
 class StrAction(PlatitudesAction):
     """Action for parsing strings"""
+
     @staticmethod
     def process(val, dest):
         "process string"
@@ -139,6 +188,7 @@ def make_path_action(
     writable: bool = False,
     readable: bool = False,
     resolve_path: bool = False,
+    role: str | None = None,
 ) -> type[PlatitudesAction]:
     """Produces a class responsible for parsing paths."""
 
@@ -146,20 +196,21 @@ def make_path_action(
         @staticmethod
         def process(val, dest):
             path = Path(val)
-            resolved_path = path.resolve()
 
+            # The checks follow symlinks by themselves so the path is only
+            # resolved when asked to
             if resolve_path:
                 path = path.resolve()
 
-            if exists and not resolved_path.exists():
+            if exists and not path.exists():
                 e_ = f"Invalid value for '{dest}': Path {path} does not exist."
                 raise PlatitudesError(e_)
 
-            if not file_okay and resolved_path.is_file():
+            if not file_okay and path.is_file():
                 e_ = f"Invalid value for '{dest}': File {path} is a file."
                 raise PlatitudesError(e_)
 
-            if not dir_okay and resolved_path.is_dir():
+            if not dir_okay and path.is_dir():
                 e_ = f"Invalid value for '{dest}': File {path} is a directory."
                 raise PlatitudesError(e_)
 
@@ -172,4 +223,113 @@ def make_path_action(
                 raise PlatitudesError(e_)
             return path
 
+    _PathAction.cacheable = False
+    _PathAction.role = role
+
     return _PathAction
+
+
+def make_file_action(
+    path_action: type[PlatitudesAction],
+    file_type: type,
+    compression: str | None = None,
+    buffer_size: int | None = None,
+    writing: bool = False,
+) -> type[PlatitudesAction]:
+    """Produces a class responsible for parsing lazily opened files.
+
+    The path is validated by `path_action` and, unless the file is opened for
+    `writing`, must point to an existing file. `-` stands for stdin, or stdout
+    when `writing`, and skips the validation.
+    """
+
+    class _FileAction(PlatitudesAction):
+        @staticmethod
+        def process(val, dest):
+            if isinstance(val, file_type):
+                return val
+
+            if str(val) == DASH:
+                if issubclass(file_type, MappedFile):
+                    e_ = f"Invalid value for '{dest}': stdin can't be memory mapped."
+                    raise PlatitudesError(e_)
+                return file_type(DASH, compression, buffer_size, writing)
+
+            path = path_action.process(val, dest)
+            if not writing and not path.is_file():
+                e_ = f"Invalid value for '{dest}': Path {path} is not an existing file."
+                raise PlatitudesError(e_)
+
+            return file_type(path, compression, buffer_size, writing)
+
+    _FileAction.cacheable = False
+    _FileAction.role = path_action.role
+
+    return _FileAction
+
+
+def make_dash_action(
+    path_action: type[PlatitudesAction], std_action: type[PlatitudesAction]
+) -> type[PlatitudesAction]:
+    """Produces a class parsing `-` with `std_action` and paths with `path_action`.
+
+    Lets `Path` parameters receive stdin, or stdout, as a lazily opened file.
+    """
+
+    class _DashAction(PlatitudesAction):
+        @staticmethod
+        def process(val, dest):
+            if str(val) == DASH:
+                return std_action.process(val, dest)
+            return path_action.process(val, dest)
+
+    _DashAction.cacheable = False
+    _DashAction.role = path_action.role
+
+    return _DashAction
+
+
+def make_glob_action(
+    exists: bool = False,
+    file_okay: bool = True,
+    dir_okay: bool = True,
+    writable: bool = False,
+    readable: bool = False,
+    resolve_path: bool = False,
+    role: str | None = None,
+    materialise: bool = False,
+) -> type[PlatitudesAction]:
+    """Produces a class responsible for expanding glob patterns into paths.
+
+    The path checks filter the matches. With `exists` at least one path must
+    match. If `materialise` the command receives a sorted list instead of an
+    iterator.
+    """
+
+    class _GlobAction(PlatitudesAction):
+        @staticmethod
+        def process(val, dest):
+            if not isinstance(val, str):
+                return val
+
+            paths = GlobPaths(
+                val, file_okay, dir_okay, writable, readable, resolve_path
+            )
+            if materialise:
+                paths = sorted(paths)
+                first = paths[0] if paths else None
+            elif exists:
+                # Only the first match is needed to know there is one
+                first = paths.peek()
+            else:
+                return paths
+
+            if exists and first is None:
+                e_ = f"Invalid value for '{dest}': No path matches {val}."
+                raise PlatitudesError(e_)
+            return paths
+
+    _GlobAction.cacheable = False
+    _GlobAction.role = role
+
+    return _GlobAction
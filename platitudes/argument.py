@@ -1,6 +1,19 @@
 """Functionality to customize and validate arguments."""
 
-from .actions import make_datetime_action, make_path_action
+from functools import cached_property
+
+from .actions import (
+    ROLES,
+    PlatitudesAction,
+    make_dash_action,
+    make_datetime_action,
+    make_file_action,
+    make_glob_action,
+    make_path_action,
+)
+from .compression import check_compression
+from .errors import PlatitudesError
+from .files import BinaryFile
 
 DEFAULT_DATETIME_FORMATS = ["%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S"]
 
@@ -19,6 +32,14 @@ class Argument:
         writable: bool = False,
         readable: bool = False,
         resolve_path: bool = False,
+        role: str | None = None,
+        glob: bool = False,
+        allow_dash: bool = False,
+        # Files
+        mmap: bool = False,
+        decompress: bool = False,
+        compress: str | None = None,
+        buffer_size: int | None = None,
         # DateTime
         formats: list[str] | None = None,
     ):
@@ -32,6 +53,7 @@ class Argument:
         - Reading parameters from environment variables.
         - Adding validation options for parsed
           [`pathlib.Path`](https://docs.python.org/3/library/pathlib.html#basic-use)
+          and for lazily opened files.
         - Modifying the accepted
           [datetime.datetime](https://docs.python.org/3/library/datetime.html#datetime-objects)
           for the CLI.
@@ -61,6 +83,39 @@ class Argument:
         resolve_path
             Whether to resolve the path supplied before passing it to the
             function.
+        role
+            Either `"input"` or `"output"`. Declares whether the path is read
+            or produced by the command. Used to skip commands whose outputs
+            are up to date, see [Incremental Execution](incremental.md). File
+            parameters with the `"output"` role are opened for writing.
+        allow_dash
+            Only valid for `Path` parameters. Passing `-` gives the command a
+            `platitudes.BinaryFile` reading stdin, or writing stdout if `role`
+            is `"output"`, instead of a path. File parameters always accept
+            `-`. See [Standard Streams](types/files.md#standard-streams).
+        glob
+            Only valid for `Iterator[Path]` and `list[Path]` parameters. The
+            value passed is a glob pattern, like `"data/**/*.csv"`, expanded by
+            Platitudes. The other path options filter the matches, except
+            `exists` which requires at least one match. See
+            [Glob Patterns](types/glob.md).
+        mmap
+            Only valid for `bytes` parameters. The command receives a read-only
+            `platitudes.MappedFile` of the path passed instead of its contents.
+        decompress
+            Only valid for `Path`, `BinaryFile` and `TextFile` parameters. The
+            file is decompressed while it is read, detecting gzip, bzip2 and xz
+            from its extension or contents. `Path` parameters receive a
+            `platitudes.BinaryFile`. Defaults `role` to `"input"`. See
+            [Compressed Files](types/files.md#compressed-files).
+        compress
+            One of `"gzip"`, `"bz2"` or `"xz"`. Like `decompress` but the file
+            is opened for writing and compressed while it is written. Defaults
+            `role` to `"output"`.
+        buffer_size
+            Size in bytes of the buffers used to read or write file
+            parameters. Defaults to 1 MiB for compressed files and to the
+            Python default otherwise.
         formats
             A list of format strings that can be used in the CLI to enter
             timestamps
@@ -69,17 +124,70 @@ class Argument:
         self.help = help
         self.envvar = envvar
 
+        if role not in ROLES:
+            e_ = f"Unknown role '{role}'. Supported roles are: {ROLES[1:]}"
+            raise PlatitudesError(e_)
+
+        check_compression(compress)
+        if decompress and compress is not None:
+            e_ = "decompress and compress can't be used together"
+            raise PlatitudesError(e_)
+        if mmap and (decompress or compress is not None):
+            e_ = "Memory mapped files can't be compressed"
+            raise PlatitudesError(e_)
+        if role is None and decompress:
+            role = "input"
+        elif role is None and compress is not None:
+            role = "output"
+
         # Only relevant if we are dealing with Paths
-        self._path_action = make_path_action(
+        self._path_options = (
             exists,
             file_okay,
             dir_okay,
             writable,
             readable,
             resolve_path,
+            role,
         )
+        self.role = role
+        self.glob = glob
+        self.allow_dash = allow_dash
+        self.mmap = mmap
+        self.decompress = decompress
+        self.compress = compress
+        self._stream_options = {
+            "compression": "auto" if decompress else compress,
+            "buffer_size": buffer_size,
+            "writing": role == "output",
+        }
 
-        # Only relevant if we are dealing with Paths
+        # Only relevant if we are dealing with datetimes
         if formats is None:
             formats = DEFAULT_DATETIME_FORMATS
-        self._datetime_action = make_datetime_action(formats)
+        self._formats = formats
+
+    # NOTE: The actions are built on first use. Creating a class is by far the
+    # most expensive step of registering a parameter and most parameters
+    # are neither paths nor datetimes.
+    @cached_property
+    def _path_action(self) -> type[PlatitudesAction]:
+        return make_path_action(*self._path_options)
+
+    @cached_property
+    def _dash_action(self) -> type[PlatitudesAction]:
+        return make_dash_action(self._path_action, self._file_action(BinaryFile))
+
+    def _glob_action(self, materialise: bool) -> type[PlatitudesAction]:
+        return make_glob_action(*self._path_options, materialise=materialise)
+
+    @property
+    def _streaming(self) -> bool:
+        return self.decompress or self.compress is not None
+
+    def _file_action(self, file_type: type) -> type[PlatitudesAction]:
+        return make_file_action(self._path_action, file_type, **self._stream_options)
+
+    @cached_property
+    def _datetime_action(self) -> type[PlatitudesAction]:
+        return make_datetime_action(self._formats)
@@ -0,0 +1,125 @@
+"""Package a Platitudes application as a zipapp.
+
+The archive contains the package defining the application, Platitudes itself,
+the bytecode of both compiled for the running interpreter and the manifest of
+the application frozen as a Python module. Starting the bundle neither
+compiles any source nor, for `--help` and `--version`, imports the
+application.
+
+Dependencies other than Platitudes are not included and must be installed on
+the hosts running the bundle.
+"""
+
+import compileall
+import importlib.util
+import os
+import py_compile
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipapp
+from pathlib import Path
+
+from .errors import PlatitudesError
+from .manifest import build_manifest, import_target
+
+_MAIN = """\
+from _platitudes_manifest import MANIFEST
+from platitudes.launcher import launch
+
+launch(MANIFEST)
+"""
+
+
+def _copy_source(module_name: str, destination: Path) -> None:
+    spec = importlib.util.find_spec(module_name)
+    if spec is None or spec.origin is None:
+        e_ = f"Can't find the source of '{module_name}'"
+        raise PlatitudesError(e_)
+
+    ignore = shutil.ignore_patterns("__pycache__", "*.pyc")
+    if spec.submodule_search_locations:
+        source_dir = Path(next(iter(spec.submodule_search_locations)))
+        shutil.copytree(source_dir, destination / module_name, ignore=ignore)
+    else:
+        shutil.copy(spec.origin, destination)
+
+
+def build_bundle(
+    target: str, output: Path, prog: str, interpreter: str | None = None
+) -> None:
+    """Write a zipapp running the application pointed at by `target`.
+
+    Parameters
+    ----------
+    target
+        The application as `"package.module:attribute"`.
+    output
+        Path of the archive to create.
+    prog
+        Name of the program shown in the help.
+    interpreter
+        Interpreter written in the shebang line of the archive. Defaults to the
+        version of Python running the build, as the bytecode is only valid
+        for it.
+    """
+    if interpreter is None:
+        major, minor = sys.version_info[:2]
+        interpreter = f"/usr/bin/env python{major}.{minor}"
+
+    manifest = build_manifest(import_target(target), target, prog)
+    top_level = target.partition(":")[0].split(".")[0]
+
+    with tempfile.TemporaryDirectory() as staging_dir:
+        staging = Path(staging_dir)
+        _copy_source(top_level, staging)
+        if top_level != "platitudes":
+            _copy_source("platitudes", staging)
+
+        frozen_manifest = f"MANIFEST = {manifest!r}\n"
+        (staging / "_platitudes_manifest.py").write_text(frozen_manifest)
+        (staging / "__main__.py").write_text(_MAIN)
+
+        # zipimport only finds bytecode sitting next to the sources and can't
+        # check timestamps reliably, hence the legacy layout and hash based pycs
+        compiled = compileall.compile_dir(
+            staging,
+            quiet=1,
+            legacy=True,
+            invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+        )
+        if not compiled:
+            e_ = "Failed to compile the application"
+            raise PlatitudesError(e_)
+
+        zipapp.create_archive(staging, output, interpreter=interpreter, compressed=True)
+
+
+def _median_startup(command: list[str], env: dict[str, str], runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, capture_output=True, check=False)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def compare_startup(
+    target: str, bundle: Path, prog: str, runs: int = 5
+) -> tuple[float, float]:
+    """Median time in seconds to answer `--help` unbundled and bundled."""
+    env = os.environ | {"PYTHONPATH": os.pathsep.join(sys.path)}
+    code = (
+        "from platitudes.manifest import import_target;"
+        f" import_target({target!r})([{prog!r}, '--help'])"
+    )
+    unbundled = [sys.executable, "-c", code]
+    bundled = [sys.executable, str(bundle), "--help"]
+
+    return (
+        _median_startup(unbundled, env, runs),
+        _median_startup(bundled, os.environ | {"PYTHONPATH": ""}, runs),
+    )
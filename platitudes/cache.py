@@ -0,0 +1,189 @@
+"""Disk backed memoization of command results.
+
+Commands registered with `cache=True` are keyed by their fully parsed
+arguments. Path arguments are fingerprinted by their modification time and
+size, or by their contents when using `cache="content"`. The return value and
+everything the command wrote to stdout are pickled into the cache directory
+and replayed on a hit.
+
+The cache lives in `$PLATITUDES_CACHE_DIR` and defaults to
+`$XDG_CACHE_HOME/platitudes` (`~/.cache/platitudes`). Once it grows past
+`$PLATITUDES_CACHE_MAX_SIZE` bytes (256 MiB by default) the least recently
+used entries are evicted.
+"""
+
+import io
+import os
+import pickle
+import sys
+import tempfile
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+from .errors import PlatitudesError
+from .globbing import GlobPaths
+from .streams import routed_streams
+
+DEFAULT_MAX_SIZE = 256 * 1024**2
+CACHE_MODES = ("mtime", "content")
+
+
+def cache_dir() -> Path:
+    """Directory where Platitudes keeps its caches and state."""
+    if (path := os.environ.get("PLATITUDES_CACHE_DIR")) is not None:
+        return Path(path)
+
+    xdg_cache = os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")
+    return Path(xdg_cache) / "platitudes"
+
+
+def check_cache_mode(cache: bool | str) -> None:
+    """Fail early if `cache` is not a known caching mode."""
+    if not isinstance(cache, bool) and cache not in CACHE_MODES:
+        e_ = f"Unknown cache mode '{cache}'. Supported modes are: {CACHE_MODES}"
+        raise PlatitudesError(e_)
+
+
+def command_id(function: Callable) -> str:
+    """A name identifying `function` across processes."""
+    return f"{function.__module__}.{function.__qualname__}"
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file, or of every file below a directory."""
+    import hashlib
+
+    digest = hashlib.sha256()
+    paths = [path]
+    if path.is_dir():
+        paths = sorted(p for p in path.rglob("*") if p.is_file())
+    for file_path in paths:
+        digest.update(str(file_path.relative_to(path)).encode())
+        with file_path.open("rb") as fh:
+            while chunk := fh.read(1 << 20):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fingerprint(value: Any, mode: str) -> Any:
+    if isinstance(value, GlobPaths):
+        # Expanded again, the command still receives every match
+        matches = sorted(value.matches())
+        return ("glob", value.pattern, [_fingerprint(p, mode) for p in matches])
+    if isinstance(value, list | tuple):
+        return [_fingerprint(item, mode) for item in value]
+    if not isinstance(value, os.PathLike):
+        return repr(value)
+
+    path = Path(value)
+    try:
+        stat = path.stat()
+    except OSError:
+        return ("path", str(path), None)
+
+    if mode == "content":
+        return ("path", str(path), file_digest(path))
+    return ("path", str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def cache_key(function: Callable, config: dict[str, Any], mode: str) -> str:
+    """Hash identifying a call to `function` with the parsed `config`."""
+    import hashlib
+
+    fingerprint = [command_id(function)]
+    for name in sorted(config):
+        fingerprint.append((name, _fingerprint(config[name], mode)))
+    return hashlib.sha256(repr(fingerprint).encode()).hexdigest()
+
+
+class _Tee(io.TextIOBase):
+    """Write to a stream while keeping a copy of everything written."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.captured = io.StringIO()
+
+    def write(self, s: str) -> int:  # noqa: D102
+        self._stream.write(s)
+        return self.captured.write(s)
+
+    def flush(self) -> None:  # noqa: D102
+        self._stream.flush()
+
+
+def call_cached(
+    main: Callable,
+    config: dict[str, Any],
+    cache: bool | str = True,
+    injected: dict[str, Any] | None = None,
+) -> Any:
+    """Call `main` with `config` unless an identical call was cached.
+
+    `injected` values are passed to `main` too but, unlike `config`, are not
+    part of the key. Calls reading stdin, or writing stdout, through a file
+    parameter given `-` are never cached.
+    """
+    # The contents of the standard streams can't be fingerprinted
+    if any(getattr(value, "is_std", False) for value in config.values()):
+        return main(**config, **(injected or {}))
+
+    mode = "mtime" if cache is True else str(cache)
+    directory = cache_dir() / "results"
+    entry = directory / f"{cache_key(main, config, mode)}.pickle"
+
+    try:
+        with entry.open("rb") as fh:
+            stdout, result = pickle.load(fh)
+        # Refresh the modification time which doubles as the LRU timestamp
+        os.utime(entry)
+        sys.stdout.write(stdout)
+        return result
+    except Exception:
+        # Missing, truncated or stale entries, e.g. of a class since renamed,
+        # are computed again
+        pass
+
+    # Only the output of this thread is captured, other threads may be running
+    # commands of their own, e.g. with `CliRunner.invoke_many`
+    with routed_streams() as routers:
+        tee = _Tee(routers["stdout"].target())
+        with routers["stdout"].redirected(tee):
+            result = main(**config, **(injected or {}))
+            # Generators can't be stored so they are materialised
+            if isinstance(result, Iterator):
+                result = list(result)
+
+    try:
+        data = pickle.dumps((tee.captured.getvalue(), result))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return result
+
+    directory.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as fh:
+        fh.write(data)
+    Path(fh.name).replace(entry)
+
+    max_size = int(os.environ.get("PLATITUDES_CACHE_MAX_SIZE", DEFAULT_MAX_SIZE))
+    _evict(directory, max_size)
+
+    return result
+
+
+def _evict(directory: Path, max_size: int) -> None:
+    entries = []
+    total_size = 0
+    for dir_entry in os.scandir(directory):
+        try:
+            stat = dir_entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, dir_entry.path))
+        total_size += stat.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total_size <= max_size:
+            break
+        Path(path).unlink(missing_ok=True)
+        total_size -= size
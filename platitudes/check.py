@@ -0,0 +1,121 @@
+"""Validating the commands of an application ahead of time.
+
+Registering a command checks its signature: that parameters which may be
+`None` have a default, that environment variables are only used by
+parameters with a default, that types are supported and that defaults are
+valid. `check_app` runs these checks, and a few more, for every command of an
+application, reporting all the problems found instead of stopping at the
+first one. Once an application passes them it can run in trusted mode, see
+`python -m platitudes check`, which skips the redundant checks on startup.
+"""
+
+import argparse
+import inspect
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from .argument import Argument
+from .context import Context
+from .errors import PlatitudesError
+from .files import FILE_TYPES, MappedFile
+from .platitudes import (
+    Platitudes,
+    _handle_maybe,
+    _handle_type_specific_behaviour,
+    _has_default_value,
+    _is_glob_type,
+    _unwrap_annotated,
+)
+from .progress import Progress
+from .resources import find_resource
+from .signatures import signature
+
+
+def _check_options(type_: Any, argument: Argument) -> list[str]:
+    # Options which are silently ignored at runtime for other types
+    errors = []
+    if argument.glob and not _is_glob_type(type_):
+        errors.append("glob=True only applies to Iterator[Path] and list[Path]")
+    if argument.allow_dash and type_ is not Path:
+        errors.append("allow_dash only applies to Path, files always accept -")
+    if argument.mmap and type_ is not bytes:
+        errors.append("mmap=True only applies to bytes")
+    if argument._streaming and not (type_ is Path or type_ in FILE_TYPES):
+        errors.append("decompress and compress only apply to paths and files")
+    if argument._streaming and type_ is MappedFile:
+        errors.append("Memory mapped files can't be compressed")
+    path_like = type_ is Path or type_ in FILE_TYPES or _is_glob_type(type_)
+    if argument.role is not None and not (path_like or argument.mmap):
+        errors.append("role only applies to paths and files")
+    return errors
+
+
+def _check_param(param: inspect.Parameter) -> list[str]:
+    annot = param.annotation
+    if annot is inspect.Parameter.empty:
+        annot = str
+    type_, argument = _unwrap_annotated(annot)
+    if type_ in (Context, Progress) or find_resource(annot) is not None:
+        return []
+
+    try:
+        type_ = _handle_maybe(type_, param)
+        action, _ = _handle_type_specific_behaviour(type_, argument)
+    except PlatitudesError as e:
+        return [e.args[0]]
+
+    errors = _check_options(type_, argument)
+    if not _has_default_value(param):
+        if argument.envvar is not None:
+            errors.append("Envvars are not supported for arguments without a default")
+    elif (
+        param.default is not None
+        and not isinstance(param.default, bool)
+        # Paths and files can only be validated where the command runs
+        and getattr(action, "cacheable", False)
+    ):
+        try:
+            action.process(param.default, param.name.replace("_", "-"))
+        except PlatitudesError as e:
+            errors.append(f"Invalid default: {e.args[0]}")
+    return errors
+
+
+def check_command(
+    function: Callable, cmd_parser: argparse.ArgumentParser | None = None
+) -> list[str]:
+    """Problems found in the signature of `function`, one per line."""
+    errors = []
+    for name, param in signature(function).parameters.items():
+        errors.extend(
+            f"{function.__name__}: parameter '{name}': {error}"
+            for error in _check_param(param)
+        )
+
+    if cmd_parser is not None:
+        # Mistakes in help strings, like a stray %, only fail when the help is
+        # shown
+        try:
+            cmd_parser.format_help()
+        except (ValueError, TypeError, KeyError) as e:
+            errors.append(f"{function.__name__}: invalid help string: {e!r}")
+    return errors
+
+
+def check_app(app: Platitudes | Callable) -> tuple[int, list[str]]:
+    """Check every command of `app`, or a single function used with `pl.run`.
+
+    Returns
+    -------
+    tuple[int, list[str]]
+        The number of commands checked and the problems found.
+    """
+    if not isinstance(app, Platitudes):
+        return 1, check_command(app)
+
+    subparsers = app._subparsers.choices
+    errors = []
+    for name, function in app._registered_commands.items():
+        errors.extend(check_command(function, subparsers.get(name)))
+    return len(app._registered_commands), errors
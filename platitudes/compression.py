@@ -0,0 +1,114 @@
+"""Streaming compression of file parameters.
+
+Files compressed with gzip, bzip2 or xz are decoded on the fly as they are
+read, and encoded as they are written, using only the standard library. The
+compressed file is read and written in large blocks, `STREAM_BUFFER_SIZE`
+bytes by default, and so are the decoded contents, so commands never hold
+more than a couple of blocks of a file in memory.
+
+The codecs are imported on first use to keep them out of the startup of
+commands that never see a compressed file.
+"""
+
+import importlib
+import io
+from pathlib import Path
+from typing import IO, Any
+
+from .errors import PlatitudesError
+
+STREAM_BUFFER_SIZE = 1 << 20
+
+# Format -> (module, suffixes, magic bytes)
+FORMATS = {
+    "gzip": ("gzip", (".gz", ".gzip"), b"\x1f\x8b"),
+    "bz2": ("bz2", (".bz2",), b"BZh"),
+    "xz": ("lzma", (".xz", ".lzma"), b"\xfd7zXZ\x00"),
+}
+MAGIC_SIZE = max(len(magic) for _, _, magic in FORMATS.values())
+
+
+def check_compression(compression: str | None) -> None:
+    """Raise if `compression` is not one of the supported formats."""
+    if compression is not None and compression not in FORMATS:
+        e_ = f"Unknown compression '{compression}'. Supported: {list(FORMATS)}"
+        raise PlatitudesError(e_)
+
+
+def sniff_compression(head: bytes) -> str | None:
+    """Format of the data starting with `head`, from its magic bytes."""
+    for compression, (_, _, magic) in FORMATS.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def detect_compression(path: Path) -> str | None:
+    """Format of `path` from its suffix or else from its first bytes."""
+    suffix = path.suffix.lower()
+    for compression, (_, suffixes, _) in FORMATS.items():
+        if suffix in suffixes:
+            return compression
+
+    try:
+        with path.open("rb") as fh:
+            return sniff_compression(fh.read(MAGIC_SIZE))
+    except OSError:
+        return None
+
+
+def _codec(compression: str, fileobj: IO[bytes], mode: str) -> Any:
+    module = importlib.import_module(FORMATS[compression][0])
+    if compression == "gzip":
+        return module.GzipFile(fileobj=fileobj, mode=mode)
+    if compression == "bz2":
+        return module.BZ2File(fileobj, mode)
+    return module.LZMAFile(fileobj, mode)
+
+
+class _Reader(io.BufferedReader):
+    """Buffered decoded contents, closing the compressed file with them."""
+
+    def __init__(self, codec: Any, fileobj: IO[bytes], buffer_size: int):
+        super().__init__(codec, buffer_size)
+        self._compressed = fileobj
+
+    def close(self) -> None:  # noqa: D102
+        try:
+            super().close()
+        finally:
+            self._compressed.close()
+
+
+class _Writer(io.BufferedWriter):
+    """Buffered contents to encode, closing the compressed file with them."""
+
+    def __init__(self, codec: Any, fileobj: IO[bytes], buffer_size: int):
+        super().__init__(codec, buffer_size)
+        self._compressed = fileobj
+
+    def close(self) -> None:  # noqa: D102
+        try:
+            super().close()
+        finally:
+            self._compressed.close()
+
+
+def wrap_stream(
+    fileobj: IO[bytes],
+    compression: str,
+    writing: bool = False,
+    buffer_size: int | None = None,
+) -> IO[bytes]:
+    """Stream the decoded, or encoded, contents of the binary `fileobj`.
+
+    Closing the stream closes `fileobj` too.
+    """
+    try:
+        codec = _codec(compression, fileobj, "wb" if writing else "rb")
+    except BaseException:
+        fileobj.close()
+        raise
+
+    stream = _Writer if writing else _Reader
+    return stream(codec, fileobj, buffer_size or STREAM_BUFFER_SIZE)
@@ -0,0 +1,146 @@
+"""Reading default values from layered config files.
+
+Commands can take defaults from several config files, for instance a system
+wide one, one per user and one per project, plus the file passed on the
+command line. Files are JSON unless their suffix is `.toml`. Later files take
+precedence over earlier ones.
+
+Only the keys matching a parameter of the command are converted. The values
+converted from each file are cached in the cache directory, keyed by the path
+of the file, its modification time and size, so large shared config files are
+not parsed again on every invocation. Values whose validation depends on the
+state of the filesystem, like paths, are stored unconverted and validated on
+every run.
+"""
+
+import json
+import pickle
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+from .actions import PlatitudesAction
+from .cache import cache_dir, command_id
+from .errors import PlatitudesError
+
+
+def config_paths(layers: Iterable[str | Path]) -> list[Path]:
+    """The existing files among `layers`, with `~` expanded."""
+    paths = [Path(layer).expanduser() for layer in layers]
+    return [path for path in paths if path.is_file()]
+
+
+def _read(path: Path) -> dict[str, Any]:
+    if path.suffix == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            e_ = f"Reading {path} requires Python 3.11 or later for TOML support"
+            raise PlatitudesError(e_) from None
+        with path.open("rb") as fh:
+            values = tomllib.load(fh)
+    else:
+        with path.open("r") as fh:
+            values = json.load(fh)
+
+    if not isinstance(values, dict):
+        e_ = f"The config file {path} must contain a mapping of parameters"
+        raise PlatitudesError(e_)
+    return values
+
+
+def _code_stamp(main: Callable) -> int | None:
+    try:
+        return Path(main.__code__.co_filename).stat().st_mtime_ns
+    except (AttributeError, OSError):
+        return None
+
+
+def _entry(
+    path: Path, main: Callable, argument_actions: dict[str, type[PlatitudesAction]]
+) -> Path:
+    import hashlib
+
+    # Changes to the command, e.g. to the type of a parameter, invalidate the
+    # values cached for it
+    params = sorted((name, a.__qualname__) for name, a in argument_actions.items())
+    key = repr((str(path.resolve()), command_id(main), params, _code_stamp(main)))
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return cache_dir() / "config" / f"{digest}.pickle"
+
+
+def _is_cacheable(action: type) -> bool:
+    # Booleans use argparse's own action and are taken as they are
+    return not issubclass(action, PlatitudesAction) or action.cacheable
+
+
+def _convert(action: type, name: str, value: Any) -> Any:
+    if not issubclass(action, PlatitudesAction):
+        return value
+    return action.process(value, name.replace("_", "-"))
+
+
+def _store(entry: Path, data: dict[str, Any]) -> None:
+    import pickle
+    import tempfile
+
+    try:
+        payload = pickle.dumps(data)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=entry.parent, delete=False) as fh:
+            fh.write(payload)
+        Path(fh.name).replace(entry)
+    except (OSError, pickle.PicklingError, TypeError, AttributeError):
+        # Caching is only an optimisation
+        pass
+
+
+def load_config(
+    path: Path,
+    argument_actions: dict[str, type[PlatitudesAction]],
+    main: Callable,
+) -> dict[str, Any]:
+    """Parsed values for the parameters of `main` defined in `path`."""
+    stat = path.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    entry = _entry(path, main, argument_actions)
+
+    try:
+        with entry.open("rb") as fh:
+            cached = pickle.load(fh)
+        if cached["stamp"] != stamp:
+            cached = None
+    except Exception:
+        cached = None
+
+    if cached is None:
+        converted = {}
+        deferred = {}
+        for name, value in _read(path).items():
+            if name not in argument_actions:
+                continue
+            action = argument_actions[name]
+            if _is_cacheable(action):
+                converted[name] = _convert(action, name, value)
+            else:
+                deferred[name] = value
+
+        cached = {"stamp": stamp, "converted": converted, "deferred": deferred}
+        _store(entry, cached)
+
+    return cached["converted"] | {
+        name: _convert(argument_actions[name], name, value)
+        for name, value in cached["deferred"].items()
+    }
+
+
+def load_layers(
+    paths: Iterable[Path],
+    argument_actions: dict[str, type[PlatitudesAction]],
+    main: Callable,
+) -> dict[str, Any]:
+    """Merge the values of every config file, later files taking precedence."""
+    config: dict[str, Any] = {}
+    for path in paths:
+        config |= load_config(path, argument_actions, main)
+    return config
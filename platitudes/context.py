@@ -0,0 +1,47 @@
+"""State handed from one command to the next."""
+
+from typing import Any
+
+
+class Context:
+    """Shared state of the commands run by a single invocation.
+
+    Commands receive the context by annotating one of their parameters with
+    `pl.Context`. The parameter is not exposed on the CLI. When commands are
+    run with `chain` they all receive the same context, which lets them hand
+    data to the next command in memory. Otherwise each invocation gets a fresh
+    one.
+
+    Besides the attributes below, commands are free to set their own.
+
+    Attributes
+    ----------
+    last
+        The value returned by the previous command of the chain.
+    results
+        The values returned by each of the commands run so far, by name.
+
+    Example
+    -------
+    ```python
+    import platitudes as pl
+
+    app = pl.Platitudes()
+
+    @app.command()
+    def extract(src: Path, ctx: pl.Context):
+        return src.read_text().splitlines()
+
+    @app.command()
+    def load(dst: Path, ctx: pl.Context):
+        dst.write_text("\\n".join(ctx.last))
+    ```
+    """
+
+    def __init__(self):
+        self.last: Any = None
+        self.results: dict[str, Any] = {}
+
+    def __repr__(self) -> str:
+        """Results so far, used to key cached results of the next commands."""
+        return f"Context({vars(self)!r})"
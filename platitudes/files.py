@@ -0,0 +1,257 @@
+"""Lazily opened file parameters.
+
+Parameters annotated with one of the types defined here receive an object
+wrapping the path passed on the command line. The underlying file is only
+opened the first time it is used and Platitudes closes it once the command
+returns. Closed files are reopened on their next use, which allows them to be
+used as defaults shared between several invocations.
+
+Files can also be decompressed while they are read, or compressed while they
+are written, see `compression`. Passing `-` reads from stdin, or writes to
+stdout for parameters with `role="output"`.
+"""
+
+import io
+import sys
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import IO, Any
+
+from .compression import (
+    MAGIC_SIZE,
+    STREAM_BUFFER_SIZE,
+    detect_compression,
+    sniff_compression,
+    wrap_stream,
+)
+
+DASH = "-"
+
+
+class _Borrowed(io.BufferedIOBase):
+    """A stream left open when closed, e.g. `sys.stdout.buffer`."""
+
+    def __init__(self, stream: IO[bytes]):
+        self._stream = stream
+
+    def readable(self) -> bool:  # noqa: D102
+        return self._stream.readable()
+
+    def writable(self) -> bool:  # noqa: D102
+        return self._stream.writable()
+
+    def read(self, size: int | None = -1) -> bytes:  # noqa: D102
+        return self._stream.read(size)
+
+    def read1(self, size: int = -1) -> bytes:  # noqa: D102
+        return self._stream.read1(size)  # pyright: ignore
+
+    def readinto(self, buffer: Any) -> int:  # noqa: D102
+        return self._stream.readinto(buffer)  # pyright: ignore
+
+    def write(self, data: Any) -> int:  # noqa: D102
+        return self._stream.write(data)
+
+    def flush(self) -> None:  # noqa: D102
+        if not self.closed:
+            self._stream.flush()
+
+
+def _open_std(writing: bool, buffer_size: int | None) -> IO[bytes]:
+    std = sys.stdout if writing else sys.stdin
+    try:
+        fd = std.fileno()
+    except (AttributeError, OSError, ValueError):
+        # Replaced by an in-memory stream, e.g. while testing
+        return _Borrowed(std.buffer)
+
+    if writing:
+        # Keep anything already printed before what the command writes
+        std.flush()
+    # A stream of its own over the same descriptor, with a larger buffer than
+    # `sys.stdin.buffer`, which leaves the descriptor open once closed
+    mode = "wb" if writing else "rb"
+    return open(fd, mode, buffering=buffer_size or STREAM_BUFFER_SIZE, closefd=False)
+
+
+class _LazyFile:
+    _mode = "rb"
+    _encoding: str | None = None
+
+    def __init__(
+        self,
+        path: str | Path,
+        compression: str | None = None,
+        buffer_size: int | None = None,
+        writing: bool = False,
+    ):
+        self.path = Path(path)
+        # "auto" detects the compression of the file when opening it
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.writing = writing
+        self._file: Any = None
+
+    @property
+    def is_std(self) -> bool:
+        """Whether the file is stdin, or stdout, given as `-`."""
+        return str(self.path) == DASH
+
+    def _open(self) -> Any:
+        compression = self.compression
+        if self.is_std:
+            stream = _open_std(self.writing, self.buffer_size)
+            if compression == "auto":
+                peek = getattr(stream, "peek", None)
+                head = peek(MAGIC_SIZE)[:MAGIC_SIZE] if peek is not None else b""
+                compression = sniff_compression(head)
+        else:
+            if compression == "auto":
+                compression = detect_compression(self.path)
+            if compression is None:
+                mode = self._mode.replace("r", "w") if self.writing else self._mode
+                buffering = self.buffer_size or -1
+                return self.path.open(mode, buffering, encoding=self._encoding)
+
+            mode = "wb" if self.writing else "rb"
+            buffering = self.buffer_size or STREAM_BUFFER_SIZE
+            stream = self.path.open(mode, buffering=buffering)
+
+        if compression is not None:
+            stream = wrap_stream(stream, compression, self.writing, self.buffer_size)
+        if "b" in self._mode:
+            return stream
+        return io.TextIOWrapper(stream, encoding=self._encoding)
+
+    @property
+    def file(self) -> IO[Any]:
+        """The underlying file object. Accessing it opens the file."""
+        if self._file is None:
+            self._file = self._open()
+        return self._file
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the underlying file has been opened."""
+        return self._file is not None
+
+    def close(self) -> None:
+        """Close the underlying file if it was ever opened."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __getattr__(self, name: str) -> Any:
+        # Private names are never forwarded, otherwise `copy`/`pickle` would
+        # open the file while probing for their special methods
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.file, name)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __fspath__(self) -> str:
+        return str(self.path)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({str(self.path)!r})"
+
+
+class BinaryFile(_LazyFile):
+    """A file opened in binary mode on first use.
+
+    All the methods of the file object returned by `open(path, "rb")`,
+    e.g. `read`, `readinto` or `seek`, are available directly on it.
+    """
+
+    _mode = "rb"
+
+    def chunks(self, size: int | None = None) -> Iterator[memoryview]:
+        """Iterate over the contents read into a single, reused, buffer.
+
+        Nothing is copied: each chunk is a view over the same buffer and is
+        only valid until the next one is read. Use `bytes(chunk)` to keep it.
+
+        Parameters
+        ----------
+        size
+            Size of the buffer. Defaults to the `buffer_size` of the file, or
+            1 MiB.
+        """
+        buffer = memoryview(bytearray(size or self.buffer_size or STREAM_BUFFER_SIZE))
+        # Returns as soon as some data is available, which matters for pipes
+        readinto = getattr(self.file, "readinto1", self.file.readinto)
+        while n := readinto(buffer):
+            yield buffer[:n]
+
+
+class TextFile(_LazyFile):
+    """A file opened in text mode, encoded as UTF-8, on first use.
+
+    All the methods of the file object returned by `open(path, "r")`, e.g.
+    `read` or `readline`, are available directly on it. Iterating over it
+    yields lines.
+    """
+
+    _mode = "r"
+    _encoding = "utf-8"
+
+
+class MappedFile(_LazyFile):
+    """A read-only memory map of a file created on first use.
+
+    Indexing and slicing work like on the underlying `mmap.mmap` and so do
+    methods like `find` or `readline`. Use `memoryview` for zero-copy access
+    to the contents.
+    """
+
+    def _open(self) -> Any:
+        import mmap
+
+        with self.path.open("rb") as fh:
+            # Empty files can't be mapped
+            if self.path.stat().st_size == 0:
+                return _EmptyMap()
+            return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def memoryview(self) -> memoryview:
+        """A zero-copy view over the mapped contents."""
+        return memoryview(self.file)  # pyright: ignore
+
+    def close(self) -> None:  # noqa: D102
+        try:
+            super().close()
+        except BufferError:
+            # The command kept a memoryview alive. The mapping is released when
+            # the last view is garbage collected.
+            self._file = None
+
+    def __len__(self) -> int:
+        """Size of the file in bytes."""
+        return len(self.file)  # pyright: ignore
+
+    def __getitem__(self, key: int | slice) -> Any:
+        """Bytes of the file at `key`, without copying the whole file."""
+        return self.file[key]  # pyright: ignore
+
+
+class _EmptyMap(bytes):
+    def close(self) -> None:
+        pass
+
+
+FILE_TYPES = (BinaryFile, TextFile, MappedFile)
+
+
+def close_files(values: Iterable[Any]) -> None:
+    """Close any lazily opened file among `values`."""
+    for value in values:
+        if isinstance(value, _LazyFile):
+            value.close()
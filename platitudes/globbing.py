@@ -0,0 +1,181 @@
+"""Expansion of glob patterns passed as arguments.
+
+Patterns are expanded by walking the directories with `os.scandir`, so the
+type of the entries found comes from the directory listing itself instead of
+an extra `stat` per path, and matches are produced as soon as they're found.
+This lets commands receive patterns matching millions of files which, expanded
+by the shell, wouldn't fit in the command line.
+
+The syntax follows the `glob` module: `*`, `?` and `[...]` match within a
+path component and a `**` component matches any number of directories.
+Entries starting with a dot are only matched by patterns starting with a dot.
+"""
+
+import fnmatch
+import itertools
+import os
+import re
+from collections.abc import Callable, Iterator
+from pathlib import Path, PurePath
+from typing import Any
+
+_MAGIC = re.compile(r"[*?[]")
+
+
+def _is_hidden(name: str, part: str) -> bool:
+    return name.startswith(".") and not part.startswith(".")
+
+
+def _scandir(directory: str) -> Iterator[os.DirEntry]:
+    # Missing and unreadable directories simply don't match anything
+    try:
+        with os.scandir(directory or ".") as entries:
+            yield from entries
+    except OSError:
+        return
+
+
+def _walk_all(directory: str) -> Iterator[os.DirEntry]:
+    for entry in _scandir(directory):
+        if _is_hidden(entry.name, ""):
+            continue
+        yield entry
+        if entry.is_dir(follow_symlinks=False):
+            yield from _walk_all(entry.path)
+
+
+def _match(
+    directory: str, parts: list[str], matchers: list[Callable]
+) -> Iterator[os.DirEntry]:
+    part, match, last = parts[0], matchers[0], len(parts) == 1
+
+    if part == "**":
+        if last:
+            yield from _walk_all(directory)
+            return
+        yield from _match(directory, parts[1:], matchers[1:])
+        for entry in _scandir(directory):
+            if _is_hidden(entry.name, ""):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                yield from _match(entry.path, parts, matchers)
+        return
+
+    for entry in _scandir(directory):
+        if _is_hidden(entry.name, part) or not match(entry.name):
+            continue
+        if last:
+            yield entry
+        elif entry.is_dir():
+            yield from _match(entry.path, parts[1:], matchers[1:])
+
+
+def iglob_entries(pattern: str) -> Iterator[tuple[str, os.DirEntry | None]]:
+    """Lazily yield the paths matching `pattern` with their directory entry.
+
+    The entry is `None` when the pattern has no magic characters and the path
+    is returned as long as it exists.
+    """
+    if os.altsep is not None:
+        pattern = pattern.replace(os.altsep, os.sep)
+
+    if not _MAGIC.search(pattern):
+        if os.path.lexists(pattern):
+            yield pattern, None
+        return
+
+    parts = PurePath(pattern).parts
+    # The leading components without magic are the directory to walk from
+    first_magic = next(i for i, part in enumerate(parts) if _MAGIC.search(part))
+    root = str(PurePath(*parts[:first_magic])) if first_magic else ""
+    # `PurePath` drops a leading "./" which `glob.glob` keeps in the matches
+    if pattern.startswith(f".{os.sep}"):
+        root = f".{os.sep}{root}" if root else "."
+
+    parts = list(parts[first_magic:])
+    matchers = [re.compile(fnmatch.translate(part)).match for part in parts]
+    prefix = "." + os.sep if not root else ""
+    for entry in _match(root, parts, matchers):
+        # Relative patterns are walked from "." but matched paths are not
+        # prefixed with it, just like `glob.glob`
+        yield entry.path.removeprefix(prefix), entry
+
+
+def _is_file(path: str, entry: os.DirEntry | None) -> bool:
+    return entry.is_file() if entry is not None else Path(path).is_file()
+
+
+def _is_dir(path: str, entry: os.DirEntry | None) -> bool:
+    return entry.is_dir() if entry is not None else Path(path).is_dir()
+
+
+class GlobPaths:
+    """Paths matching a glob pattern, produced lazily while iterated.
+
+    Like any iterator it can only be consumed once.
+    """
+
+    def __init__(
+        self,
+        pattern: str,
+        file_okay: bool = True,
+        dir_okay: bool = True,
+        writable: bool = False,
+        readable: bool = False,
+        resolve_path: bool = False,
+    ):
+        self.pattern = pattern
+        self._options = (file_okay, dir_okay, writable, readable, resolve_path)
+        self._paths: Iterator[Path] | None = None
+
+    def _expand(self) -> Iterator[Path]:
+        file_okay, dir_okay, writable, readable, resolve_path = self._options
+        for path, entry in iglob_entries(self.pattern):
+            if not file_okay and _is_file(path, entry):
+                continue
+            if not dir_okay and _is_dir(path, entry):
+                continue
+            if readable and not os.access(path, os.R_OK):
+                continue
+            if writable and not os.access(path, os.W_OK):
+                continue
+            yield Path(path).resolve() if resolve_path else Path(path)
+
+    def matches(self) -> Iterator[Path]:
+        """Expand the pattern again, leaving this iterator untouched."""
+        return self._expand()
+
+    def peek(self) -> Path | None:
+        """The first match, which is still produced when iterating."""
+        paths = self._expand() if self._paths is None else self._paths
+        first = next(paths, None)
+        self._paths = paths if first is None else itertools.chain((first,), paths)
+        return first
+
+    def __iter__(self) -> Iterator[Path]:
+        """The paths themselves, which are consumed while iterated."""
+        return self
+
+    def __next__(self) -> Path:
+        """The next match, expanding the pattern further as needed."""
+        if self._paths is None:
+            self._paths = self._expand()
+        return next(self._paths)
+
+    def __repr__(self) -> str:
+        """The pattern, independently of the matches consumed so far."""
+        # Used to key cached results, so it must not depend on the object id
+        return f"{self.__class__.__name__}({self.pattern!r})"
+
+
+def paths_of(value: Any) -> list[Path]:
+    """The paths passed to a path parameter, or matched by a glob parameter.
+
+    `GlobPaths` are expanded again so that the command still receives every
+    match.
+    """
+    if isinstance(value, GlobPaths):
+        return sorted(value.matches())
+    if isinstance(value, list | tuple):
+        return [Path(path) for path in value]
+    return [Path(value)]
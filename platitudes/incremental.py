@@ -0,0 +1,184 @@
+"""Skipping commands whose outputs are up to date.
+
+Path parameters can be tagged as inputs or outputs of a command with
+`Argument(role=...)`. Commands registered with `incremental` are skipped when
+their outputs are up to date with respect to their inputs:
+
+- `"mtime"`: like `make`, every output exists and is newer than every input.
+- `"hash"`: the contents of the inputs and outputs, and the values of the rest
+  of the arguments, are the same as the last time the command ran
+  successfully. The digests are kept in a small SQLite database inside the
+  Platitudes cache directory.
+"""
+
+import os
+import sys
+from collections.abc import Callable
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+
+from .actions import PlatitudesAction
+from .cache import cache_dir, command_id, file_digest
+from .errors import PlatitudesError
+from .globbing import GlobPaths, paths_of
+
+INCREMENTAL_MODES = ("mtime", "hash")
+
+
+def check_incremental_mode(mode: str | None) -> None:
+    """Fail early if `mode` is not a known incremental mode."""
+    if mode is not None and mode not in INCREMENTAL_MODES:
+        e_ = (
+            f"Unknown incremental mode '{mode}'. Supported modes are:"
+            f" {INCREMENTAL_MODES}"
+        )
+        raise PlatitudesError(e_)
+
+
+def paths_with_role(
+    config: dict[str, Any],
+    argument_actions: dict[str, type[PlatitudesAction]],
+    role: str,
+) -> list[Path]:
+    """Paths passed to the parameters declared with `role`.
+
+    Glob parameters contribute every path matching their pattern.
+    """
+    return [
+        path
+        for param, action in argument_actions.items()
+        if getattr(action, "role", None) == role and config.get(param) is not None
+        for path in paths_of(config[param])
+    ]
+
+
+def _newest_mtime(path: Path) -> int:
+    newest = path.stat().st_mtime_ns
+    if path.is_dir():
+        for dir_path, _, file_names in os.walk(path):
+            for name in file_names:
+                newest = max(newest, (Path(dir_path) / name).stat().st_mtime_ns)
+    return newest
+
+
+def _outputs_are_newer(inputs: list[Path], outputs: list[Path]) -> bool:
+    try:
+        oldest_output = min(path.stat().st_mtime_ns for path in outputs)
+        newest_input = max((_newest_mtime(path) for path in inputs), default=None)
+    except OSError:
+        # Some output is missing or some input vanished
+        return False
+
+    return newest_input is None or oldest_output > newest_input
+
+
+def _path_digest(path: Path) -> Any:
+    return file_digest(path) if path.exists() else path
+
+
+def _inputs_digest(config: dict[str, Any], outputs: list[Path]) -> str:
+    import hashlib
+
+    # Everything but the outputs, including arguments that aren't paths
+    digest = hashlib.sha256()
+    for param in sorted(config):
+        value = config[param]
+        if isinstance(value, GlobPaths):
+            value = paths_of(value)
+        if isinstance(value, os.PathLike):
+            if Path(value) in outputs:
+                continue
+            value = _path_digest(Path(value))
+        elif isinstance(value, list) and all(isinstance(v, os.PathLike) for v in value):
+            value = [(str(path), _path_digest(Path(path))) for path in value]
+        digest.update(f"{param}={value!r}\n".encode())
+    return digest.hexdigest()
+
+
+def _outputs_digest(outputs: list[Path]) -> str:
+    import hashlib
+
+    digest = hashlib.sha256()
+    for path in outputs:
+        digest.update(file_digest(path).encode())
+    return digest.hexdigest()
+
+
+class _StateDB:
+    def __init__(self, path: Path):
+        # Only the "hash" mode keeps its state in a database
+        import sqlite3
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS runs (key TEXT PRIMARY KEY, digest TEXT)"
+        )
+
+    def get(self, key: str) -> str | None:
+        row = self._connection.execute(
+            "SELECT digest FROM runs WHERE key = ?", (key,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key: str, digest: str) -> None:
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?)", (key, digest)
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def _state_key(main: Callable, outputs: list[Path]) -> str:
+    targets = sorted(str(path.resolve()) for path in outputs)
+    return f"{command_id(main)}:{targets}"
+
+
+def call_incremental(
+    main: Callable,
+    config: dict[str, Any],
+    argument_actions: dict[str, type[PlatitudesAction]],
+    mode: str,
+    injected: dict[str, Any] | None = None,
+) -> Any:
+    """Call `main` with `config` unless its outputs are up to date.
+
+    Commands without any output, or reading stdin or writing stdout through a
+    file parameter given `-`, are always run. Returns `None` when the command
+    is skipped. `injected` values are passed to `main` too but are not
+    considered when deciding whether to run it.
+    """
+    inputs = paths_with_role(config, argument_actions, "input")
+    outputs = paths_with_role(config, argument_actions, "output")
+    # The contents of the standard streams can't be tracked
+    streams = any(getattr(value, "is_std", False) for value in config.values())
+    if not outputs or streams:
+        return main(**config, **(injected or {}))
+
+    if mode == "mtime":
+        if _outputs_are_newer(inputs, outputs):
+            _report_skip(main)
+            return None
+        return main(**config, **(injected or {}))
+
+    with closing(_StateDB(cache_dir() / "state.sqlite")) as db:
+        key = _state_key(main, outputs)
+        inputs_digest = _inputs_digest(config, outputs)
+        if all(path.exists() for path in outputs):
+            digest = f"{inputs_digest}:{_outputs_digest(outputs)}"
+            if db.get(key) == digest:
+                _report_skip(main)
+                return None
+
+        result = main(**config, **(injected or {}))
+        if all(path.exists() for path in outputs):
+            db.set(key, f"{inputs_digest}:{_outputs_digest(outputs)}")
+
+    return result
+
+
+def _report_skip(main: Callable) -> None:
+    print(f"{main.__name__}: outputs are up to date, skipping", file=sys.stderr)
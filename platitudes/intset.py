@@ -0,0 +1,152 @@
+"""Compact sets of integers written as ranges.
+
+Commands often take ranges of rows or lists of shards, like `0-5000000` or
+`1,5,9-200`. `IntSet` stores them as the bounds of their spans, in two
+`array.array`, instead of one object per integer. Membership is a binary
+search over the spans and iterating produces the integers lazily. Ranges are
+inclusive, so `9-200` contains both 9 and 200.
+"""
+
+import bisect
+import re
+from array import array
+from collections.abc import Iterable, Iterator, Set
+from typing import Any
+
+from .errors import PlatitudesError
+
+_SPAN = re.compile(r"\s*(-?\d+)\s*(?:-\s*(-?\d+)\s*)?")
+# Bounds of the signed 64 bit integers of the arrays, spans end one past their
+# last integer
+INT64_MIN = -(2**63)
+INT64_MAX = 2**63 - 2
+
+
+def parse_range(text: str) -> range:
+    """Parse a single inclusive span like `0-5000000` into a `range`."""
+    match = _SPAN.fullmatch(text)
+    if match is None:
+        e_ = f"invalid range '{text}'"
+        raise PlatitudesError(e_)
+
+    start = int(match[1])
+    stop = int(match[2]) if match[2] is not None else start
+    if stop < start:
+        e_ = f"invalid range '{text}', {stop} is smaller than {start}"
+        raise PlatitudesError(e_)
+    return range(start, stop + 1)
+
+
+class IntSet(Set):
+    """An immutable set of integers stored as sorted, disjoint spans.
+
+    Parameters
+    ----------
+    spec
+        Comma separated integers and inclusive ranges, e.g. `"1,5,9-200"`.
+
+    Example
+    -------
+    ```python
+    import platitudes as pl
+
+    def export(rows: pl.IntSet = pl.IntSet("0-999")):
+        for row in rows:
+            ...
+
+    pl.run(export)
+    ```
+    ```
+    ❯ python export.py --rows 0-5000000,7000000
+    ```
+    """
+
+    def __init__(self, spec: str = ""):
+        spans = [parse_range(part) for part in spec.split(",") if part.strip()]
+        self._set_spans(spans)
+
+    def _set_spans(self, spans: Iterable[range]) -> None:
+        # Merge overlapping and adjacent spans so each integer is in exactly
+        # one of them
+        starts: list[int] = []
+        stops: list[int] = []
+        for span in sorted(spans, key=lambda span: span.start):
+            if stops and span.start <= stops[-1]:
+                stops[-1] = max(stops[-1], span.stop)
+            else:
+                starts.append(span.start)
+                stops.append(span.stop)
+
+        if starts and (starts[0] < INT64_MIN or stops[-1] - 1 > INT64_MAX):
+            e_ = f"IntSet only holds integers between {INT64_MIN} and {INT64_MAX}"
+            raise PlatitudesError(e_)
+
+        self._starts = array("q", starts)
+        self._stops = array("q", stops)
+        self._len = sum(stop - start for start, stop in zip(starts, stops))
+
+    @classmethod
+    def from_ranges(cls, spans: Iterable[range]) -> "IntSet":
+        """Build a set from `range` objects with a step of 1."""
+        spans = list(spans)
+        if any(span.step != 1 for span in spans):
+            e_ = "Only ranges with a step of 1 can be part of an IntSet"
+            raise PlatitudesError(e_)
+        intset = cls()
+        intset._set_spans(span for span in spans if span)
+        return intset
+
+    @classmethod
+    def _from_iterable(cls, values: Iterable[int]) -> "IntSet":
+        # Used by the operators inherited from `Set`, e.g. `a & b`, which
+        # produce every integer of the result so runs are merged as they come
+        spans: list[range] = []
+        for value in values:
+            if spans and value == spans[-1].stop:
+                spans[-1] = range(spans[-1].start, value + 1)
+            else:
+                spans.append(range(value, value + 1))
+        return cls.from_ranges(spans)
+
+    @property
+    def ranges(self) -> list[range]:
+        """The spans of the set as `range` objects, in increasing order."""
+        return [range(start, stop) for start, stop in zip(self._starts, self._stops)]
+
+    def __contains__(self, value: Any) -> bool:
+        """Whether `value` is in one of the spans, with a binary search."""
+        if not isinstance(value, int):
+            return False
+        i = bisect.bisect_right(self._starts, value) - 1
+        return i >= 0 and value < self._stops[i]
+
+    def __iter__(self) -> Iterator[int]:
+        """The integers of the set in increasing order, produced lazily."""
+        for start, stop in zip(self._starts, self._stops):
+            yield from range(start, stop)
+
+    def __len__(self) -> int:
+        """The number of integers in the set."""
+        return self._len
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare the spans of two `IntSet`, or the integers otherwise."""
+        if isinstance(other, IntSet):
+            return self._starts == other._starts and self._stops == other._stops
+        return super().__eq__(other)
+
+    def __hash__(self) -> int:
+        """Hash of the spans, consistent with `__eq__`."""
+        return hash((bytes(self._starts), bytes(self._stops)))
+
+    def __str__(self) -> str:
+        """The set as a spec accepted by `IntSet`, e.g. `1,5,9-200`."""
+        return ",".join(
+            str(span.start) if len(span) == 1 else f"{span.start}-{span.stop - 1}"
+            for span in self.ranges
+        )
+
+    def __repr__(self) -> str:
+        """The constructor call building the same set."""
+        # Used to key cached results so it only depends on the content
+        return f"{type(self).__name__}({str(self)!r})"
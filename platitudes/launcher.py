@@ -0,0 +1,77 @@
+"""Answer `--help` and `--version` from a manifest.
+
+The launcher is meant to be the entry point of applications whose commands are
+expensive to import. Help and version requests are answered from the manifest
+written by `python -m platitudes manifest`. Anything else imports the
+application and runs it as usual.
+
+Example
+-------
+```python
+# mypkg/__main__.py
+from pathlib import Path
+
+from platitudes.launcher import launch
+
+launch(Path(__file__).with_name("cli_manifest.json"))
+```
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+# Same as `typing.TYPE_CHECKING`, answering from the manifest doesn't need the
+# `typing` module
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+
+_HELP_FLAGS = ("-h", "--help")
+
+
+def _answer(manifest: dict[str, Any], args: list[str]) -> str | None:
+    if len(args) == 1 and args[0] in _HELP_FLAGS:
+        return manifest["help"]
+
+    if len(args) == 1 and args[0] == "--version" and manifest["version"]:
+        return manifest["version"].replace("%(prog)s", manifest["prog"])
+
+    if len(args) == 2 and args[1] in _HELP_FLAGS:
+        command = manifest["commands"].get(args[0])
+        if command is not None:
+            return command["help"]
+
+    return None
+
+
+def launch(
+    manifest: str | Path | dict[str, Any], arguments: list[str] | None = None
+) -> Any:
+    """Run the application described by `manifest`.
+
+    Parameters
+    ----------
+    manifest
+        Path to the JSON manifest describing the application or the already
+        loaded manifest.
+    arguments
+        List of strings passed for the CLI parsing. Defaults to using `sys.argv`.
+    """
+    if arguments is None:
+        arguments = sys.argv
+
+    if not isinstance(manifest, dict):
+        manifest = json.loads(Path(manifest).read_text())
+    answer = _answer(manifest, arguments[1:])
+    if answer is not None:
+        print(answer.rstrip("\n"))
+        sys.exit(0)
+
+    # Only imported when the application itself is needed, answering from the
+    # manifest must not pay for the rest of Platitudes
+    from .manifest import import_target
+
+    return import_target(manifest["target"])(arguments)
@@ -0,0 +1,208 @@
+"""Resource limits and timeouts for commands.
+
+Commands registered with `max_memory`, `cpu_seconds` or `timeout` run with
+the corresponding limits in place:
+
+- `max_memory` caps the address space of the process with `RLIMIT_AS`.
+  Allocations beyond it fail with a `MemoryError` instead of attracting the
+  OOM killer.
+- `cpu_seconds` sets `RLIMIT_CPU` to the CPU time already used plus the
+  budget. The kernel signals `SIGXCPU` once it is spent.
+- `timeout` arms a wall clock timer delivering `SIGALRM`.
+
+When a limit is exceeded a JSON line describing it is written to stderr and
+the process exits with a code specific to the limit. The previous limits are
+restored once the command finishes so that in-process callers, like tests,
+are not affected.
+"""
+
+import contextlib
+import json
+import re
+import signal
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None  # type: ignore[assignment]
+
+from .cache import command_id
+from .errors import PlatitudesError
+
+EXIT_CODES = {"max_memory": 121, "cpu_seconds": 122, "timeout": 124}
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+_SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*$", re.I)
+
+
+class LimitExceeded(BaseException):
+    """Raised inside the command when one of its limits is exceeded.
+
+    It derives from `BaseException` so that a broad `except Exception` in the
+    command doesn't swallow it.
+    """
+
+    def __init__(self, limit: str):
+        super().__init__(limit)
+        self.limit = limit
+
+
+def parse_size(size: int | str) -> int:
+    """Number of bytes in sizes like `4096`, `"512M"` or `"4G"`.
+
+    Units are binary, i.e. `"1K"` is 1024 bytes.
+    """
+    if isinstance(size, int):
+        n_bytes = size
+    elif match := _SIZE_PATTERN.match(size):
+        number, unit = match.groups()
+        n_bytes = int(float(number) * _SIZE_UNITS[unit.upper()])
+    else:
+        e_ = f"Invalid size '{size}'. Use a number of bytes or e.g. '512M', '4G'"
+        raise PlatitudesError(e_)
+
+    if n_bytes <= 0:
+        e_ = f"Sizes must be positive, got '{size}'"
+        raise PlatitudesError(e_)
+    return n_bytes
+
+
+def check_limits(
+    max_memory: int | str | None, cpu_seconds: int | None, timeout: float | None
+) -> dict[str, Any]:
+    """Validate the limits of a command and normalise them.
+
+    Returns
+    -------
+    dict[str, Any]
+        The limits to pass to `enforce_limits`. `max_memory` is in bytes.
+    """
+    if (max_memory is not None or cpu_seconds is not None) and resource is None:
+        e_ = "max_memory and cpu_seconds are not supported on this platform"
+        raise PlatitudesError(e_)
+    if timeout is not None and not hasattr(signal, "setitimer"):
+        e_ = "timeout is not supported on this platform"
+        raise PlatitudesError(e_)
+
+    for name, value in (("cpu_seconds", cpu_seconds), ("timeout", timeout)):
+        if value is not None and value <= 0:
+            e_ = f"{name} must be positive, got {value}"
+            raise PlatitudesError(e_)
+
+    return {
+        "max_memory": parse_size(max_memory) if max_memory is not None else None,
+        "cpu_seconds": cpu_seconds,
+        "timeout": timeout,
+    }
+
+
+def _raise_limit(limit: str) -> Callable[[int, Any], None]:
+    def handler(signum: int, frame: Any) -> None:
+        raise LimitExceeded(limit)
+
+    return handler
+
+
+def _lower_soft_limit(which: int, soft: int) -> tuple[int, int]:
+    """Set the soft limit `which` to `soft` and return the previous limits."""
+    previous = resource.getrlimit(which)
+    hard = previous[1]
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(which, (soft, hard))
+    return previous
+
+
+def _limit_cpu(
+    cpu_seconds: int, handlers: dict[int, Any], rlimits: dict[int, Any]
+) -> None:
+    # RLIMIT_CPU counts the CPU time used since the process started
+    used = resource.getrusage(resource.RUSAGE_SELF)
+    budget = int(used.ru_utime + used.ru_stime + cpu_seconds + 0.999)
+    handlers[signal.SIGXCPU] = signal.signal(
+        signal.SIGXCPU, _raise_limit("cpu_seconds")
+    )
+    rlimits[resource.RLIMIT_CPU] = _lower_soft_limit(resource.RLIMIT_CPU, budget)
+
+
+def _limit_wall_time(timeout: float, handlers: dict[int, Any]) -> None:
+    handlers[signal.SIGALRM] = signal.signal(signal.SIGALRM, _raise_limit("timeout"))
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+
+
+def _limit_memory(max_memory: int, rlimits: dict[int, Any]) -> None:
+    rlimits[resource.RLIMIT_AS] = _lower_soft_limit(resource.RLIMIT_AS, max_memory)
+
+
+def _restore_limits(handlers: dict[int, Any], rlimits: dict[int, Any]) -> None:
+    if signal.SIGALRM in handlers:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    for which, previous in rlimits.items():
+        resource.setrlimit(which, previous)
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+
+def _report(main: Callable, limit: str, value: Any, elapsed: float) -> None:
+    error = {
+        "error": "limit_exceeded",
+        "command": command_id(main),
+        "limit": limit,
+        "value": value,
+        "elapsed_seconds": round(elapsed, 3),
+        "exit_code": EXIT_CODES[limit],
+    }
+    print(json.dumps(error), file=sys.stderr)
+
+
+@contextlib.contextmanager
+def enforce_limits(
+    main: Callable,
+    max_memory: int | None = None,
+    cpu_seconds: int | None = None,
+    timeout: float | None = None,
+) -> Iterator[None]:
+    """Run the body with the limits of `main` in place.
+
+    Exits the process with the code in `EXIT_CODES` if a limit is exceeded.
+    """
+    limits = {"max_memory": max_memory, "cpu_seconds": cpu_seconds, "timeout": timeout}
+    if all(value is None for value in limits.values()):
+        yield
+        return
+
+    if threading.current_thread() is not threading.main_thread():
+        e_ = "Resource limits can only be enforced from the main thread"
+        raise PlatitudesError(e_)
+
+    # Previous signal handlers and resource limits, restored on the way out
+    handlers: dict[int, Any] = {}
+    rlimits: dict[int, Any] = {}
+    start = time.monotonic()
+    exceeded = None
+    try:
+        if cpu_seconds is not None:
+            _limit_cpu(cpu_seconds, handlers, rlimits)
+        if timeout is not None:
+            _limit_wall_time(timeout, handlers)
+        if max_memory is not None:
+            _limit_memory(max_memory, rlimits)
+
+        yield
+    except LimitExceeded as e:
+        exceeded = e.limit
+    except MemoryError:
+        if max_memory is None:
+            raise
+        exceeded = "max_memory"
+    finally:
+        _restore_limits(handlers, rlimits)
+
+    if exceeded is not None:
+        _report(main, exceeded, limits[exceeded], time.monotonic() - start)
+        sys.exit(EXIT_CODES[exceeded])
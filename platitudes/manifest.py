@@ -0,0 +1,108 @@
+"""Static description of a Platitudes application.
+
+A manifest is a JSON file describing the commands of an application: their
+names, docstring summaries, parameters and fully rendered help. It is written
+once, as a build step, and read by `platitudes.launcher` to answer `--help` and
+`--version` without importing the modules defining the commands.
+"""
+
+import argparse
+import importlib
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from .errors import PlatitudesError
+
+if TYPE_CHECKING:
+    from .platitudes import Platitudes
+
+MANIFEST_VERSION = 1
+
+
+def import_target(target: str) -> Any:
+    """Import the object pointed at by a `"package.module:attribute"` string."""
+    module_name, _, attribute = target.partition(":")
+    if not module_name or not attribute:
+        e_ = f"Targets must look like 'package.module:attribute', got '{target}'"
+        raise PlatitudesError(e_)
+
+    obj = importlib.import_module(module_name)
+    for name in attribute.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+def _describe_parameter(action: argparse.Action) -> dict[str, Any]:
+    default = action.default
+    if default is not None and not isinstance(default, bool | int | float | str):
+        default = str(default)
+
+    return {
+        "name": action.dest,
+        "flags": action.option_strings,
+        "help": action.help,
+        "default": default,
+        "choices": None if action.choices is None else list(action.choices),
+        "required": action.required,
+    }
+
+
+def _format_help(parser: argparse.ArgumentParser, prog: str) -> str:
+    original_prog = parser.prog
+    parser.prog = prog
+    try:
+        return parser.format_help()
+    finally:
+        parser.prog = original_prog
+
+
+def build_manifest(app: "Platitudes", target: str, prog: str) -> dict[str, Any]:
+    """Describe every command registered on `app`.
+
+    Parameters
+    ----------
+    app
+        The application being described.
+    target
+        The `"package.module:attribute"` string pointing at `app`. The launcher
+        imports it for anything it can't answer from the manifest.
+    prog
+        The name of the program as invoked by the users. It's used in the
+        usage lines of the rendered help.
+    """
+    # Imported here since the launcher only needs `import_target`
+    from .platitudes import Platitudes
+
+    if not isinstance(app, Platitudes):
+        e_ = f"'{target}' is not a Platitudes application"
+        raise PlatitudesError(e_)
+
+    commands = {}
+    for name, cmd_parser in app._subparsers.choices.items():
+        description = cmd_parser.description or ""
+        commands[name] = {
+            "summary": description.split("\n", 1)[0],
+            "help": _format_help(cmd_parser, f"{prog} {name}"),
+            "parameters": [
+                _describe_parameter(action)
+                for action in cmd_parser._actions
+                if not isinstance(action, argparse._HelpAction)
+            ],
+        }
+
+    return {
+        "manifest_version": MANIFEST_VERSION,
+        "target": target,
+        "prog": prog,
+        "version": app._version,
+        "help": _format_help(app._parser, prog),
+        "commands": commands,
+    }
+
+
+def write_manifest(target: str, output: Path, prog: str) -> dict[str, Any]:
+    """Import `target` and write its manifest to `output`."""
+    manifest = build_manifest(import_target(target), target, prog)
+    output.write_text(json.dumps(manifest, indent=2))
+    return manifest
@@ -0,0 +1,127 @@
+"""Writing the values returned by commands to stdout.
+
+Commands registered with an `output` format have their return value written
+to stdout. Generators and other iterators are consumed lazily and written
+record by record, so a command can stream an arbitrary number of records
+without materialising them. Records are serialised into a local buffer and
+handed to stdout in large chunks rather than paying for a `print` per line.
+"""
+
+import json
+import os
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+from .errors import PlatitudesError
+
+DEFAULT_BUFFER_SIZE = 1 << 16
+
+
+def _to_line(record: Any) -> str:
+    return str(record)
+
+
+def _to_jsonl(record: Any) -> str:
+    return json.dumps(record, default=str)
+
+
+def _escape_tsv_field(field: Any) -> str:
+    field = str(field)
+    if "\t" in field or "\n" in field or "\\" in field:
+        field = field.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+    return field
+
+
+def _to_tsv(record: Any) -> str:
+    if isinstance(record, dict):
+        record = record.values()
+    elif isinstance(record, str | bytes) or not isinstance(record, Iterable):
+        record = (record,)
+    return "\t".join([_escape_tsv_field(field) for field in record])
+
+
+SERIALIZERS: dict[str, Callable[[Any], str]] = {
+    "lines": _to_line,
+    "jsonl": _to_jsonl,
+    "tsv": _to_tsv,
+}
+
+
+def check_output_format(format_: str | None) -> None:
+    """Fail early if `format_` is not a known output format."""
+    if format_ is not None and format_ not in SERIALIZERS:
+        e_ = (
+            f"Unknown output format '{format_}'. Supported formats are:"
+            f" {list(SERIALIZERS)}"
+        )
+        raise PlatitudesError(e_)
+
+
+def _records(result: Any) -> Iterable[Any]:
+    # A single dict/str/bytes is one record even though they are iterable
+    if isinstance(result, Iterator):
+        return result
+    if isinstance(result, list | tuple) and not isinstance(result, str | bytes):
+        return result
+    return (result,)
+
+
+def write_output(
+    result: Any, format_: str, buffer_size: int = DEFAULT_BUFFER_SIZE
+) -> None:
+    """Serialise `result` to stdout using `format_`.
+
+    `None` produces no output. Iterators (including generators), lists and
+    tuples produce one record per item and anything else a single record.
+
+    If the reading end of the pipe is closed, e.g. `tool cmd | head`, the
+    generator producing the records is closed and the program exits without
+    printing a traceback.
+
+    Parameters
+    ----------
+    result
+        The value returned by the command.
+    format_
+        One of `"lines"`, `"jsonl"` or `"tsv"`.
+    buffer_size
+        Number of characters accumulated before handing them to stdout.
+    """
+    if result is None:
+        return
+
+    serialize = SERIALIZERS[format_]
+    records = _records(result)
+
+    # Anything the command printed has to appear before its return value
+    sys.stdout.flush()
+    pending: list[str] = []
+    pending_size = 0
+    try:
+        for record in records:
+            line = serialize(record)
+            pending.append(line)
+            pending.append("\n")
+            pending_size += len(line) + 1
+            if pending_size >= buffer_size:
+                sys.stdout.write("".join(pending))
+                pending.clear()
+                pending_size = 0
+        sys.stdout.write("".join(pending))
+        sys.stdout.flush()
+    except BrokenPipeError:
+        if hasattr(records, "close"):
+            records.close()  # pyright: ignore
+        _silence_stdout()
+        sys.exit(1)
+
+
+def _silence_stdout() -> None:
+    # Python flushes stdout on exit which would raise BrokenPipeError again.
+    # See https://docs.python.org/3/library/signal.html#note-on-sigpipe
+    try:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+    except (OSError, ValueError):
+        pass
@@ -6,34 +6,55 @@ import argparse
 import inspect
 import os
 import sys
-from collections.abc import Callable
+from collections.abc import Callable, Collection, Iterator, Sequence
+from contextlib import AbstractContextManager, nullcontext
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
 from types import UnionType
-from typing import Annotated, Any, Union, cast, get_args, get_origin
+from typing import Annotated, Any, NoReturn, Union, cast, get_args, get_origin
 from uuid import UUID
 
 from .actions import (
     FloatAction,
     IntAction,
+    IntSetAction,
     PlatitudesAction,
+    RangeAction,
     StrAction,
     UUIDAction,
     make_enum_action,
 )
 from .argument import Argument
+from .context import Context
 from .errors import PlatitudesError
+from .files import FILE_TYPES, BinaryFile, MappedFile, close_files
+from .intset import IntSet
+from .probes import Probe, _env_value, start_probes
+from .progress import Progress
+from .resources import Providers, find_resource, resource_params
+from .signatures import signature
 
 # TODO: Internal docstrings
 # TODO: Shown default valid datetime formats
 # TODO: Fix fake cast
 
+CHAIN_COMMAND = "chain"
+CHAIN_SEPARATOR = "--"
+SHELL_COMMAND = "shell"
+
 
 def _create_parser(
-    main: Callable, cmd_parser: argparse.ArgumentParser, config_file: str | None = None
+    main: Callable,
+    cmd_parser: argparse.ArgumentParser,
+    config_file: str | None = None,
+    exclude: Collection[str] = (),
+    config_layers: Sequence[str | Path] = (),
 ) -> tuple[argparse.ArgumentParser, dict[str, type[PlatitudesAction]]]:
-    cmd_signature = inspect.signature(main)
+    cmd_signature = signature(main)
+    # Parameters may get their values from config files
+    with_config = config_file is not None or bool(config_layers)
+    trusted = _trusted()
 
     argument_actions: dict[str, type[PlatitudesAction]] = {}
     for param_name, param in cmd_signature.parameters.items():
@@ -46,17 +67,23 @@ def _create_parser(
             annot = str
 
         type_, extra_annotations = _unwrap_annotated(annot)
+        if type_ in (Context, Progress) or find_resource(annot) is not None:
+            # Injected when the command runs rather than parsed
+            continue
+
         action, choices = _handle_type_specific_behaviour(
-            _handle_maybe(type_, param), extra_annotations
+            _handle_maybe(type_, param, trusted), extra_annotations
         )
 
         # In theory this can be extracted from the argument parser in practice
         # it is just much more convenient to collect them here
         argument_actions[param_name] = action
+        if param_name in exclude:
+            continue
 
         envvar = extra_annotations.envvar
         default, optional_prefix = _get_default(
-            param, envvar, action, param_name, type_
+            param, envvar, action, param_name, type_, trusted
         )
 
         add_argument_kwargs = {}
@@ -79,25 +106,47 @@ def _create_parser(
         # calls for positional and optional parameters
         add_argument_kwargs["type"] = str
         add_argument_kwargs["default"] = (
-            default if (not config_file or default is not None) else None
+            default if (not with_config or default is not None) else None
         )
         add_argument_kwargs["help"] = help
         add_argument_kwargs["action"] = action
         add_argument_kwargs["choices"] = choices
 
-        optional_prefix = optional_prefix if not config_file else "--"
+        optional_prefix = optional_prefix if not with_config else "--"
         cmd_parser.add_argument(
             f"{optional_prefix}{param_name.replace('_', '-')}", **add_argument_kwargs
         )
 
     if config_file is not None:
         cmd_parser.add_argument(
-            f"--{config_file}", default=None, type=Path, required=True
+            f"--{config_file}",
+            default=None,
+            type=Path,
+            # Unless defaults can be found elsewhere
+            required=not config_layers,
         )
 
     return cmd_parser, argument_actions
 
 
+def _params_of_type(main: Callable, type_: type) -> tuple[str, ...]:
+    """Parameters of `main` receiving an injected `type_`, e.g. the `Context`."""
+    return tuple(
+        param_name
+        for param_name, param in signature(main).parameters.items()
+        if _unwrap_annotated(param.annotation)[0] is type_
+    )
+
+
+def _trusted() -> bool:
+    """Whether the signatures of the commands were validated ahead of time.
+
+    Either by running Python with `-O` or setting `PLATITUDES_TRUSTED` to
+    anything but a false value like `0`. See `python -m platitudes check`.
+    """
+    return sys.flags.optimize > 0 or _env_value("PLATITUDES_TRUSTED") is not None
+
+
 def _has_default_value(param: inspect.Parameter):
     return param.default is not inspect._empty
 
@@ -144,10 +193,10 @@ def _unwrap_annotated(annot: Any) -> tuple[Any, Argument]:
     return type_, extra_annotations
 
 
-def _handle_maybe(type_, param):
+def _handle_maybe(type_, param, trusted: bool = False):
     # Check for `None | x` parameters
     if _is_maybe(type_):
-        if not _has_default_value(param):
+        if not trusted and not _has_default_value(param):
             e_ = (
                 "Potentially None params must provide a default. "
                 f"Missing from {param}"
@@ -158,26 +207,47 @@ def _handle_maybe(type_, param):
     return type_
 
 
+def _is_glob_type(type_: Any) -> bool:
+    # `Iterator[Path]` or `list[Path]`
+    origin = get_origin(type_)
+    return origin in (Iterator, list) and get_args(type_) == (Path,)
+
+
+_ACTIONS: dict[type[Any], type[PlatitudesAction]] = {
+    bool: cast(type[PlatitudesAction], argparse.BooleanOptionalAction),  # not true
+    int: IntAction,
+    float: FloatAction,
+    str: StrAction,
+    UUID: UUIDAction,
+    range: RangeAction,
+    IntSet: IntSetAction,
+}
+
+
 def _handle_type_specific_behaviour(
     type_, extra_annotations
 ) -> tuple[type[PlatitudesAction], list[Any] | None]:
     choices = None
 
-    actions: dict[type[Any], type[PlatitudesAction]] = {
-        bool: cast(type[PlatitudesAction], argparse.BooleanOptionalAction),  # not true
-        Path: extra_annotations._path_action,
-        datetime: extra_annotations._datetime_action,
-        int: IntAction,
-        float: FloatAction,
-        str: StrAction,
-        UUID: UUIDAction,
-    }
-
-    if issubclass(type_, Enum):
+    if type_ in _ACTIONS:
+        action = _ACTIONS[type_]
+    elif type_ is Path and extra_annotations._streaming:
+        action = extra_annotations._file_action(BinaryFile)
+    elif type_ is Path and extra_annotations.allow_dash:
+        action = extra_annotations._dash_action
+    elif type_ is Path:
+        action = extra_annotations._path_action
+    elif type_ is datetime:
+        action = extra_annotations._datetime_action
+    elif type_ in FILE_TYPES:
+        action = extra_annotations._file_action(type_)
+    elif type_ is bytes and extra_annotations.mmap:
+        action = extra_annotations._file_action(MappedFile)
+    elif extra_annotations.glob and _is_glob_type(type_):
+        action = extra_annotations._glob_action(get_origin(type_) is list)
+    elif isinstance(type_, type) and issubclass(type_, Enum):
         choices = [str(e.value) for e in type_]
         action = make_enum_action(type_)
-    elif type_ in actions:
-        action = actions[type_]
     else:
         e_ = "Unsupported type"
         raise PlatitudesError(e_)
@@ -186,7 +256,12 @@ def _handle_type_specific_behaviour(
 
 
 def _get_default(
-    param, envvar: str | None, action, param_name: str, type_: Any
+    param,
+    envvar: str | None,
+    action,
+    param_name: str,
+    type_: Any,
+    trusted: bool = False,
 ) -> tuple[Any, str]:
     optional_prefix = ""
     default = None
@@ -197,6 +272,15 @@ def _get_default(
             # NOTE: bool is special because we are not using an action defined
             # by us
             default = param.default
+        elif (
+            trusted
+            and getattr(action, "cacheable", False)
+            and isinstance(type_, type)
+            and isinstance(param.default, type_)
+        ):
+            # Validated ahead of time. Defaults whose validity depends on the
+            # filesystem, like paths, are still checked
+            default = param.default
         else:
             default = action.process(param.default, param_name.replace("_", "-"))
 
@@ -210,7 +294,7 @@ def _get_default(
                 )
             except KeyError:
                 pass
-    elif envvar is not None:
+    elif envvar is not None and not trusted:
         e_ = "Envvars are not supported for arguments without a default."
         raise PlatitudesError(e_)
 
@@ -220,56 +304,224 @@ def _get_default(
     return default, optional_prefix
 
 
+def _check_options(
+    output: str | None,
+    cache: bool | str,
+    incremental: str | None,
+    max_memory: int | str | None,
+    cpu_seconds: int | None,
+    timeout: float | None,
+) -> dict[str, Any]:
+    """Fail early on invalid command options and return the normalised limits."""
+    if output is not None:
+        from .output import check_output_format
+
+        check_output_format(output)
+    if cache is not False:
+        from .cache import check_cache_mode
+
+        check_cache_mode(cache)
+    if incremental is not None:
+        from .incremental import check_incremental_mode
+
+        check_incremental_mode(incremental)
+    if max_memory is None and cpu_seconds is None and timeout is None:
+        return {"max_memory": None, "cpu_seconds": None, "timeout": None}
+
+    from .limits import check_limits
+
+    return check_limits(max_memory, cpu_seconds, timeout)
+
+
+def _has_option(arguments: list[str], prefix: str) -> bool:
+    """Whether an argument before the first `--` starts with `prefix`."""
+    end = arguments.index("--") if "--" in arguments else len(arguments)
+    return any(argument.startswith(prefix) for argument in arguments[:end])
+
+
+def _extract_mode_flags(
+    arguments: list[str],
+) -> tuple[list[str], dict[str, str], int | None, bool]:
+    """Strip the `--sweep*` and `--watch` options from `arguments`."""
+    sweep: dict[str, str] = {}
+    workers = None
+    watching = False
+    if _has_option(arguments, "--sweep"):
+        from .sweep import extract_sweep
+
+        arguments, sweep, workers = extract_sweep(arguments)
+    if _has_option(arguments, "--watch"):
+        from .watch import extract_watch
+
+        arguments, watching = extract_watch(arguments)
+    return arguments, sweep, workers, watching
+
+
 def _merge_magic_config_with_argv(
     magic_config_name: str | None,
     args_: argparse.Namespace,
     argument_actions: dict[str, type[PlatitudesAction]],
+    main: Callable,
+    config_layers: Sequence[str | Path] = (),
 ) -> dict[str, Any]:
-    import json
-
     cmdline_args = {k.replace("-", "_"): v for k, v in vars(args_).items()}
+    if magic_config_name is None and not config_layers:
+        return cmdline_args
 
-    if magic_config_name is not None:
-        config_attr_name = magic_config_name.replace("-", "_")
-        config_attr = getattr(args_, config_attr_name)
+    from .config import config_paths, load_layers
 
+    paths = config_paths(config_layers)
+    if magic_config_name is not None:
+        # Remove config as it is special. All the remaining ones
+        # are required by the function
+        config_attr = cmdline_args.pop(magic_config_name.replace("-", "_"))
         if config_attr is not None:
-            magic_config_path = Path(config_attr)
-            with magic_config_path.open("r") as fh:
-                magic_config = json.load(fh)
-
-            for param, action in argument_actions.items():
-                if param in magic_config:
-                    parsed_value = action.process(magic_config[param], "")
-                    magic_config[param] = parsed_value
-
-            # Remove config as it is special. All the remaining ones
-            # are required by the function
-            del cmdline_args[config_attr_name]
-            config = magic_config | {
-                arg: val for arg, val in cmdline_args.items() if val is not None
-            }
+            paths.append(Path(config_attr))
 
-            missing_params = []
-            args = [arg for arg in cmdline_args]
-            for arg in args:
-                if arg not in config:
-                    missing_params.append(arg)
+    file_config = load_layers(paths, argument_actions, main)
+    config = file_config | {
+        arg: val for arg, val in cmdline_args.items() if val is not None
+    }
 
-            if len(missing_params) > 0:
-                e_ = (
-                    "The following mandatory config params have not been"
-                    f" passed: {missing_params}"
-                )
-                raise PlatitudesError(e_)
-        else:
-            config = cmdline_args
-    else:
-        config = cmdline_args
+    missing_params = []
+    args = [arg for arg in cmdline_args]
+    for arg in args:
+        if arg not in config:
+            missing_params.append(arg)
+
+    if len(missing_params) > 0:
+        e_ = (
+            "The following mandatory config params have not been"
+            f" passed: {missing_params}"
+        )
+        raise PlatitudesError(e_)
 
     return config
 
 
+def _limits(
+    main: Callable,
+    max_memory: int | None,
+    cpu_seconds: int | None,
+    timeout: float | None,
+) -> AbstractContextManager:
+    if max_memory is None and cpu_seconds is None and timeout is None:
+        return nullcontext()
+
+    from .limits import enforce_limits
+
+    return enforce_limits(main, max_memory, cpu_seconds, timeout)
+
+
+def _call(
+    main: Callable,
+    config: dict[str, Any],
+    argument_actions: dict[str, type[PlatitudesAction]],
+    cache: bool | str,
+    incremental: str | None,
+    injected: dict[str, Any],
+) -> Any:
+    if incremental is not None:
+        from .incremental import call_incremental
+
+        return call_incremental(main, config, argument_actions, incremental, injected)
+    if cache:
+        from .cache import call_cached
+
+        return call_cached(main, config, cache, injected)
+    return main(**config, **injected)
+
+
+def _execute(
+    main: Callable,
+    config: dict[str, Any],
+    argument_actions: dict[str, type[PlatitudesAction]],
+    probes: list[Probe],
+    output: str | None = None,
+    cache: bool | str = False,
+    incremental: str | None = None,
+    max_memory: int | None = None,
+    cpu_seconds: int | None = None,
+    timeout: float | None = None,
+    context_params: Collection[str] = (),
+    context: Context | None = None,
+    resource_params: dict[str, str] | None = None,
+    providers: Providers | None = None,
+    progress_params: Collection[str] = (),
+) -> Any:
+    for probe in probes:
+        probe.parsed()
+
+    if context_params:
+        context = context if context is not None else Context()
+        config = config | dict.fromkeys(context_params, context)
+
+    progress = None
+    try:
+        with _limits(main, max_memory, cpu_seconds, timeout):
+            injected = {}
+            if resource_params:
+                assert providers is not None
+                injected = providers.resolve(resource_params)
+            if progress_params:
+                progress = Progress(main.__name__)
+                injected |= dict.fromkeys(progress_params, progress)
+
+            result = _call(main, config, argument_actions, cache, incremental, injected)
+            if output is not None:
+                from .output import write_output
+
+                write_output(result, output)
+    except Exit:
+        sys.exit(0)
+    finally:
+        if progress is not None:
+            progress.close()
+        close_files(config.values())
+        for probe in probes:
+            probe.finished()
+
+    return result
+
+
+def _sweep(
+    main: Callable,
+    cmd_parser: argparse.ArgumentParser,
+    arguments: list[str],
+    sweep: dict[str, str],
+    workers: int | None,
+    probes: list[Probe],
+    options: dict[str, Any],
+    config_file: str | None = None,
+    config_layers: Sequence[str | Path] = (),
+) -> None:
+    # The swept parameters are left out of the parser so that they are neither
+    # required nor parsed from the command line
+    cmd_parser, argument_actions = _create_parser(
+        main, cmd_parser, config_file, exclude=sweep, config_layers=config_layers
+    )
+    from .sweep import expand_grid, run_sweep
+
+    raw_grid, grid = expand_grid(sweep, argument_actions)
+    args_ = cmd_parser.parse_args(arguments)
+    config = _merge_magic_config_with_argv(
+        config_file, args_, argument_actions, main, config_layers
+    )
+
+    def execute(config: dict[str, Any]) -> Any:
+        return _execute(main, config, argument_actions, [], **options)
+
+    for probe in probes:
+        probe.parsed()
+    try:
+        providers = options.get("providers")
+        teardown = providers.close if providers is not None else None
+        run_sweep(execute, config, raw_grid, grid, workers, main.__name__, teardown)
+    finally:
+        for probe in probes:
+            probe.finished()
+
+
 class Platitudes:
     """The easiest way to create CLI applications.
 
@@ -278,21 +530,28 @@ class Platitudes:
 
     """
 
-    def __init__(self, description: str | None = None):
+    def __init__(self, description: str | None = None, version: str | None = None):
         """
         Parameters
         ----------
         description
             The description that will be shown when we run the help for the whole
             application.
+        version
+            If provided the application gets a `--version` option printing it.
         """
         self._registered_commands: dict[str, Callable] = {}
         self._parser = argparse.ArgumentParser(description=description)
+        self._version = version
+        if version is not None:
+            self._parser.add_argument("--version", action="version", version=version)
         self._subparsers = self._parser.add_subparsers()
         self._command_actions: dict[str, dict[str, type[PlatitudesAction]]] = {}
-        self._with_magic_config: str | None = None
+        self._command_options: dict[str, dict[str, Any]] = {}
+        self._command_configs: dict[str, dict[str, Any]] = {}
+        self._providers = Providers()
 
-    def __call__(self, arguments: list[str] | None = None) -> None:
+    def __call__(self, arguments: list[str] | None = None) -> Any:
         """Runs the CLI program.
 
         By default we run with the arguments passed to the CLI, that is,
@@ -305,42 +564,200 @@ class Platitudes:
         arguments
             List of strings passed for the CLI parsing. Defaults to using `sys.argv`.
 
+        Returns
+        -------
+        Any
+            The value returned by the command that was run.
+
         """
         if arguments is None:
             arguments = sys.argv
         else:
             pass
 
+        arguments, probes = start_probes(arguments)
+        arguments, sweep, workers, watching = self._extract_modes(arguments)
+
+        name = arguments[1] if len(arguments) >= 2 else None
+        if name in (CHAIN_COMMAND, SHELL_COMMAND):
+            if name not in self._registered_commands:
+                return self._pseudo_command(arguments, probes, bool(sweep or watching))
+
+        if sweep and name in self._registered_commands:
+            return self._sweep_command(name, arguments[2:], sweep, workers, probes)
+
+        if watching:
+            return self._watch(arguments)
+
+        name, config = self._parse_command(arguments)
+
+        # NOTE: argparse insists on replacing _ with - for positional arguments
+        # so the config keys have already been translated back
+        return _execute(
+            self._registered_commands[name],
+            config,
+            self._command_actions[name],
+            probes,
+            **self._command_options[name],
+        )
+
+    def _usage_error(self, error: object, name: str | None = None) -> NoReturn:
+        # Mistakes on the command line are reported with the help of the
+        # command, or of the app, instead of a traceback
+        parser = self._subparsers.choices.get(name, self._parser)
+        print("\n", error, "\n", file=sys.stderr)
+        print(parser.format_help(), file=sys.stderr)
+        sys.exit(1)
+
+    def _extract_modes(
+        self, arguments: list[str]
+    ) -> tuple[list[str], dict[str, str], int | None, bool]:
+        """Strip the options running the command in a sweep or when watching."""
+        name = arguments[1] if len(arguments) >= 2 else None
         try:
-            args_ = self._parser.parse_args(arguments[1:])
+            arguments, sweep, workers, watching = _extract_mode_flags(arguments)
         except PlatitudesError as e:
-            print("\n", e, "\n", file=sys.stderr)
-            print(
-                self._parser._get_positional_actions()[0]  # pyright: ignore
-                .choices[arguments[1]]
-                .format_help(),
-                file=sys.stderr,
+            self._usage_error(e, name)
+
+        if watching and sweep:
+            self._usage_error("--watch and --sweep can't be combined", name)
+        return arguments, sweep, workers, watching
+
+    def _pseudo_command(
+        self, arguments: list[str], probes: list[Probe], other_mode: bool
+    ) -> Any:
+        """Run the `chain` and `shell` commands provided by Platitudes."""
+        if arguments[1] == CHAIN_COMMAND:
+            if other_mode:
+                self._usage_error("Chained commands can't be swept or watched")
+            return self._chain(arguments[0], arguments[2:], probes)
+
+        if other_mode or len(arguments) > 2:
+            self._usage_error("The shell takes no arguments")
+        # Only imported when used as it pulls in readline
+        from .shell import Shell
+
+        return Shell(self, self._parser.prog).run()
+
+    def _sweep_command(
+        self,
+        name: str,
+        arguments: list[str],
+        sweep: dict[str, str],
+        workers: int | None,
+        probes: list[Probe],
+    ) -> None:
+        main_command = self._registered_commands[name]
+        cmd_parser = argparse.ArgumentParser(
+            prog=f"{self._parser.prog} {name}",
+            description=inspect.getdoc(main_command),
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        )
+        try:
+            _sweep(
+                main_command,
+                cmd_parser,
+                arguments,
+                sweep,
+                workers,
+                probes,
+                self._command_options[name],
+                **self._command_configs[name],
             )
-            sys.exit(1)
+        except PlatitudesError as e:
+            # Raised while expanding the grid or parsing, the runs themselves
+            # report their errors
+            self._usage_error(e, name)
+
+    def _watch(self, arguments: list[str]) -> None:
+        from .watch import watch, watched_paths
+
+        def parse() -> tuple[list[Path], Callable[[], Any]]:
+            name, config = self._parse_command(arguments)
+            actions = self._command_actions[name]
+
+            def run_command() -> Any:
+                return _execute(
+                    self._registered_commands[name],
+                    config,
+                    actions,
+                    [],
+                    **self._command_options[name],
+                )
 
-        if len(arguments) >= 2:
-            main_command = self._registered_commands[arguments[1]]
-        else:
+            return watched_paths(config, actions), run_command
+
+        watch(arguments[1] if len(arguments) >= 2 else arguments[0], parse)
+
+    def _parse_command(self, arguments: list[str]) -> tuple[str, dict[str, Any]]:
+        try:
+            args_ = self._parser.parse_args(arguments[1:])
+        except PlatitudesError as e:
+            self._usage_error(e, arguments[1])
+
+        if len(arguments) < 2:
             print(self._parser.format_help(), file=sys.stderr)
             sys.exit(1)
 
+        name = arguments[1]
+        command_config = self._command_configs[name]
         config = _merge_magic_config_with_argv(
-            self._with_magic_config, args_, self._command_actions[arguments[1]]
+            command_config["config_file"],
+            args_,
+            self._command_actions[name],
+            self._registered_commands[name],
+            command_config["config_layers"],
         )
+        return name, config
 
-        try:
-            # NOTE: argparse insists on replacing _ with - for positional arguments
-            # so we need to undo it
-            main_command(**config)
-        except Exit:
-            sys.exit(0)
+    def _chain(self, prog: str, arguments: list[str], probes: list[Probe]) -> Any:
+        segments: list[list[str]] = [[]]
+        for argument in arguments:
+            if argument == CHAIN_SEPARATOR:
+                segments.append([])
+            else:
+                segments[-1].append(argument)
+        if any(not segment for segment in segments):
+            self._usage_error(
+                f"Missing command in chain. Separate commands with '{CHAIN_SEPARATOR}'"
+            )
+
+        # Every command is parsed before running any so that mistakes in the
+        # last one don't waste the work done by the first ones
+        commands = [self._parse_command([prog, *segment]) for segment in segments]
+
+        for probe in probes:
+            probe.parsed()
 
-    def command(self, config_file: str | None = None) -> Callable:
+        context = Context()
+        try:
+            for name, config in commands:
+                context.last = _execute(
+                    self._registered_commands[name],
+                    config,
+                    self._command_actions[name],
+                    [],
+                    context=context,
+                    **self._command_options[name],
+                )
+                context.results[name] = context.last
+        finally:
+            for probe in probes:
+                probe.finished()
+
+        return context.last
+
+    def command(
+        self,
+        config_file: str | None = None,
+        config_layers: Sequence[str | Path] = (),
+        output: str | None = None,
+        cache: bool | str = False,
+        incremental: str | None = None,
+        max_memory: int | str | None = None,
+        cpu_seconds: int | None = None,
+        timeout: float | None = None,
+    ) -> Callable:
         """Add a function to the app.
 
         The function will be accessible from the CLI using the original's
@@ -349,6 +766,41 @@ class Platitudes:
         within your program. This is useful when we want to build CLI out of
         code that we would like to reuse for building a library.
 
+        Parameters
+        ----------
+        config_file
+            Name of the additional optional parameter that may be injected to
+            provide default values via a json file. For more information on this
+            functionality consult [Config File Defaults](config_file_defaults.md)
+        config_layers
+            Config files, JSON or TOML, read for default values on every run,
+            from lowest to highest precedence. Missing files are skipped. The
+            file passed with `config_file`, if any, takes precedence over all
+            of them.
+        output
+            If set, the value returned by the command is written to stdout using
+            this format. One of `"lines"`, `"jsonl"` or `"tsv"`. Generators are
+            written incrementally as they yield. See
+            [Command Output](command_output.md).
+        cache
+            If `True` the results of the command are cached on disk and reused
+            when it is called again with the same arguments. Path arguments
+            are compared by modification time and size, or by their contents
+            if set to `"content"`. See [Caching Results](caching.md).
+        incremental
+            Skip running the command if its outputs are up to date with its
+            inputs. Either `"mtime"` or `"hash"`. Inputs and outputs are declared
+            with `Argument(role=...)`. See
+            [Incremental Execution](incremental.md).
+        max_memory
+            Maximum address space of the process while the command runs, in
+            bytes or with a unit like `"4G"`. See
+            [Resource Limits](resource_limits.md).
+        cpu_seconds
+            CPU time the command may use before being stopped.
+        timeout
+            Wall clock seconds the command may run before being stopped.
+
         Example
         -------
         ```python
@@ -367,6 +819,10 @@ class Platitudes:
         ```
         """
 
+        limits = _check_options(
+            output, cache, incremental, max_memory, cpu_seconds, timeout
+        )
+
         def proc_command(function: Callable) -> Callable:
             cmd_parser = self._subparsers.add_parser(
                 function.__name__,
@@ -375,23 +831,85 @@ class Platitudes:
             )
 
             cmd_parser, argument_actions = _create_parser(
-                function, cmd_parser, config_file
+                function, cmd_parser, config_file, config_layers=config_layers
             )
 
-            if config_file is not None:
-                self._with_magic_config = config_file
-
+            self._command_configs[function.__name__] = {
+                "config_file": config_file,
+                "config_layers": config_layers,
+            }
             self._registered_commands[function.__name__] = function
             self._command_actions[function.__name__] = argument_actions
+            self._command_options[function.__name__] = {
+                "output": output,
+                "cache": cache,
+                "incremental": incremental,
+                **limits,
+                "context_params": _params_of_type(function, Context),
+                "progress_params": _params_of_type(function, Progress),
+                "resource_params": resource_params(function),
+                "providers": self._providers,
+            }
 
             return function
 
         return proc_command
 
+    def resource(self, name: str | None = None) -> Callable:
+        """Register a provider of a resource shared by the commands.
+
+        Commands receive the resource through a parameter annotated with
+        `pl.Resource(name)`. The provider is called the first time a command
+        running in the process needs the resource and the value is reused
+        afterwards. Providers can be generators, in which case they yield the
+        resource and are resumed to tear it down when the program exits. See
+        [Shared Resources](resources.md).
+
+        Parameters
+        ----------
+        name
+            Name of the resource. Defaults to the name of the provider.
+
+        Example
+        -------
+        ```python
+        import sqlite3
+
+        import platitudes as pl
+
+        app = pl.Platitudes()
+
+        @app.resource()
+        def db():
+            connection = sqlite3.connect("app.db")
+            yield connection
+            connection.close()
+
+        @app.command()
+        def count(table: str, db: Annotated[sqlite3.Connection, pl.Resource()]):
+            print(db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0])
+        ```
+        """
+
+        def register(factory: Callable) -> Callable:
+            self._providers.register(name or factory.__name__, factory)
+            return factory
+
+        return register
+
 
 def run(
-    main: Callable, arguments: list[str] | None = None, config_file: str | None = None
-) -> None:
+    main: Callable,
+    arguments: list[str] | None = None,
+    config_file: str | None = None,
+    config_layers: Sequence[str | Path] = (),
+    output: str | None = None,
+    cache: bool | str = False,
+    incremental: str | None = None,
+    max_memory: int | str | None = None,
+    cpu_seconds: int | None = None,
+    timeout: float | None = None,
+) -> Any:
     """Create a Platitudes CLI out of a single function.
 
     Platitudes provides to ways to generate CLIs: `pl.Platitudes` and `pl.run`.
@@ -410,6 +928,33 @@ def run(
         Name of the additional optional parameter that may be injected to
         provide default values via a json file. For more information on this
         functionality consult [Config File Defaults](config_file_defaults.md)
+    config_layers
+        Config files, JSON or TOML, read for default values on every run, from
+        lowest to highest precedence. Missing files are skipped.
+    output
+        If set, the value returned by `main` is written to stdout using this
+        format. One of `"lines"`, `"jsonl"` or `"tsv"`. Generators are written
+        incrementally as they yield. See [Command Output](command_output.md).
+    cache
+        If `True` the results of `main` are cached on disk and reused when it
+        is called again with the same arguments. See
+        [Caching Results](caching.md).
+    incremental
+        Skip running `main` if its outputs are up to date with its inputs.
+        Either `"mtime"` or `"hash"`. See
+        [Incremental Execution](incremental.md).
+    max_memory
+        Maximum address space of the process while `main` runs, in bytes or
+        with a unit like `"4G"`. See [Resource Limits](resource_limits.md).
+    cpu_seconds
+        CPU time `main` may use before being stopped.
+    timeout
+        Wall clock seconds `main` may run before being stopped.
+
+    Returns
+    -------
+    Any
+        The value returned by `main`.
 
     Example
     -------
@@ -422,24 +967,83 @@ def run(
     pl.run(hello_world)
     ```
     """
-    cmd_parser = argparse.ArgumentParser(
-        description=inspect.getdoc(main),
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    limits = _check_options(
+        output, cache, incremental, max_memory, cpu_seconds, timeout
     )
-    cmd_parser, command_actions = _create_parser(main, cmd_parser, config_file)
+    if resource_params(main):
+        e_ = "Resources are only available to commands of a pl.Platitudes app"
+        raise PlatitudesError(e_)
 
     if arguments is None:
         arguments = sys.argv
     else:
         pass
 
-    args_ = cmd_parser.parse_args(arguments[1:])
+    arguments, probes = start_probes(arguments)
+    arguments, sweep, workers, watching = _extract_mode_flags(arguments)
+    if watching and sweep:
+        e_ = "--watch and --sweep can't be combined"
+        raise PlatitudesError(e_)
+
+    cmd_parser = argparse.ArgumentParser(
+        description=inspect.getdoc(main),
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    if sweep:
+        options = {
+            "output": output,
+            "cache": cache,
+            "incremental": incremental,
+            "context_params": _params_of_type(main, Context),
+            "progress_params": _params_of_type(main, Progress),
+        }
+        return _sweep(
+            main,
+            cmd_parser,
+            arguments[1:],
+            sweep,
+            workers,
+            probes,
+            options | limits,
+            config_file=config_file,
+            config_layers=config_layers,
+        )
 
-    config = _merge_magic_config_with_argv(config_file, args_, command_actions)
-    try:
-        main(**config)
-    except Exit:
-        sys.exit(0)
+    cmd_parser, command_actions = _create_parser(
+        main, cmd_parser, config_file, config_layers=config_layers
+    )
+
+    def parse() -> dict[str, Any]:
+        args_ = cmd_parser.parse_args(arguments[1:])
+        return _merge_magic_config_with_argv(
+            config_file, args_, command_actions, main, config_layers
+        )
+
+    def run_command(config: dict[str, Any], probes: list[Probe]) -> Any:
+        return _execute(
+            main,
+            config,
+            command_actions,
+            probes,
+            output=output,
+            cache=cache,
+            incremental=incremental,
+            context_params=_params_of_type(main, Context),
+            progress_params=_params_of_type(main, Progress),
+            **limits,
+        )
+
+    if watching:
+        from .watch import watch, watched_paths
+
+        def parse_for_watch() -> tuple[list[Path], Callable[[], Any]]:
+            config = parse()
+            paths = watched_paths(config, command_actions)
+            return paths, lambda: run_command(config, [])
+
+        return watch(main.__name__, parse_for_watch)
+
+    return run_command(parse(), probes)
 
 
 class Exit(Exception):
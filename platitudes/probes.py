@@ -0,0 +1,236 @@
+"""Opt-in instrumentation of a CLI invocation.
+
+Probes are enabled with a flag on the command line, which is removed before
+parsing, or with an environment variable. Flags are only recognised before
+`--`, everything after it is passed on as is. Setting the variable to `0`,
+`false`, `no` or `off` leaves the probe disabled. They are notified when the
+arguments have been parsed and when the command finishes, so they can tell
+apart the cost of Platitudes from the cost of the command itself.
+
+- `--platitudes-stats` or `PLATITUDES_STATS=1`: report wall time, CPU time,
+  peak RSS and block I/O of the invocation to stderr.
+- `--platitudes-tracemalloc[=PREFIX]` or `PLATITUDES_TRACEMALLOC=1|PREFIX`:
+  report the top allocation sites while parsing and while running the
+  command. If a prefix is given the snapshots are dumped to
+  `PREFIX.parsed.snapshot` and `PREFIX.finished.snapshot`.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None  # type: ignore[assignment]
+
+
+# Values of the environment variables leaving a probe disabled
+_FALSE = ("", "0", "false", "no", "off")
+
+
+class Probe:
+    """Base class of the probes. Instantiated right before parsing.
+
+    `value` is whatever followed the `=` in the flag or the value of the
+    environment variable.
+    """
+
+    flag: str
+    envvar: str
+
+    def __init__(self, value: str | None = None):
+        self.value = value
+
+    def parsed(self) -> None:
+        """Called once the arguments have been parsed and merged."""
+
+    def finished(self) -> None:
+        """Called once the command has returned or raised."""
+
+
+def _read_proc_io() -> dict[str, int]:
+    try:
+        lines = Path("/proc/self/io").read_text().splitlines()
+    except OSError:
+        return {}
+
+    counters = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        if name in ("read_bytes", "write_bytes"):
+            counters[name] = int(value)
+    return counters
+
+
+def _rusage() -> Any:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF)
+
+
+class ResourceStats(Probe):
+    """Report the resources used by the invocation to stderr.
+
+    Parse time covers building the parser (for `pl.run`), parsing the
+    arguments and merging config files. Command time covers the call to the
+    command, including writing its output.
+    """
+
+    flag = "--platitudes-stats"
+    envvar = "PLATITUDES_STATS"
+
+    def __init__(self, value: str | None = None):
+        super().__init__(value)
+        self._start = time.perf_counter()
+        self._parsed = self._start
+        self._rusage = _rusage()
+        self._io = _read_proc_io()
+
+    def parsed(self) -> None:  # noqa: D102
+        self._parsed = time.perf_counter()
+
+    def finished(self) -> None:  # noqa: D102
+        end = time.perf_counter()
+        stats = {
+            "parse": f"{(self._parsed - self._start) * 1e3:.2f}ms",
+            "command": f"{(end - self._parsed) * 1e3:.2f}ms",
+            "wall": f"{(end - self._start) * 1e3:.2f}ms",
+        }
+
+        rusage = _rusage()
+        if rusage is not None:
+            # ru_maxrss is reported in bytes by macOS and in KiB elsewhere
+            maxrss = rusage.ru_maxrss
+            if sys.platform == "darwin":
+                maxrss //= 1024
+            stats |= {
+                "user": f"{rusage.ru_utime - self._rusage.ru_utime:.3f}s",
+                "sys": f"{rusage.ru_stime - self._rusage.ru_stime:.3f}s",
+                "maxrss": f"{maxrss}KiB",
+                "inblock": rusage.ru_inblock - self._rusage.ru_inblock,
+                "oublock": rusage.ru_oublock - self._rusage.ru_oublock,
+            }
+
+        for name, value in _read_proc_io().items():
+            stats[name] = value - self._io.get(name, 0)
+
+        line = " ".join(f"{name}={value}" for name, value in stats.items())
+        print(f"platitudes-stats: {line}", file=sys.stderr)
+
+
+def _format_size(size: int) -> str:
+    return f"{size / 1024**2:+.2f}MiB"
+
+
+class AllocationProfile(Probe):
+    """Report where memory was allocated using `tracemalloc`.
+
+    Allocations are traced from before parsing the arguments. For each phase,
+    parsing (including merging config files) and running the command, the net
+    memory growth and the lines responsible for most of it are printed to
+    stderr.
+    """
+
+    flag = "--platitudes-tracemalloc"
+    envvar = "PLATITUDES_TRACEMALLOC"
+    top = 10
+
+    def __init__(self, value: str | None = None):
+        super().__init__(value)
+        self._dump_prefix = value if value not in (None, "", "1") else None
+        # Imported here as it pulls in pickle, unused unless profiling
+        import tracemalloc
+
+        self._was_tracing = tracemalloc.is_tracing()
+        if not self._was_tracing:
+            tracemalloc.start()
+        self._snapshot = self._take_snapshot()
+
+    @staticmethod
+    def _take_snapshot() -> "tracemalloc.Snapshot":
+        import tracemalloc
+
+        return tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            )
+        )
+
+    def _report(self, phase: str) -> None:
+        snapshot = self._take_snapshot()
+        differences = snapshot.compare_to(self._snapshot, "lineno")
+        net = sum(stat.size_diff for stat in differences)
+        print(
+            f"platitudes-tracemalloc: {phase} net={_format_size(net)}",
+            file=sys.stderr,
+        )
+        for stat in differences[: self.top]:
+            if stat.size_diff == 0:
+                break
+            frame = stat.traceback[0]
+            print(
+                f"  {_format_size(stat.size_diff)} {stat.count_diff:+d} blocks"
+                f" {frame.filename}:{frame.lineno}",
+                file=sys.stderr,
+            )
+
+        if self._dump_prefix is not None:
+            snapshot.dump(f"{self._dump_prefix}.{phase}.snapshot")
+        self._snapshot = snapshot
+
+    def parsed(self) -> None:  # noqa: D102
+        self._report("parsed")
+
+    def finished(self) -> None:  # noqa: D102
+        import tracemalloc
+
+        self._report("finished")
+        if not self._was_tracing:
+            tracemalloc.stop()
+
+
+PROBES: tuple[type[Probe], ...] = (ResourceStats, AllocationProfile)
+
+
+def _env_value(envvar: str) -> str | None:
+    value = os.environ.get(envvar)
+    if value is None or value.strip().lower() in _FALSE:
+        return None
+    return value
+
+
+def start_probes(arguments: list[str]) -> tuple[list[str], list[Probe]]:
+    """Start the probes requested and strip their flags from `arguments`.
+
+    Flags are only stripped before the first `--`, so that they can still be
+    passed as values of the command.
+    """
+    end = arguments.index("--") if "--" in arguments else len(arguments)
+    options, rest = arguments[:end], arguments[end:]
+
+    probes = []
+    for probe in PROBES:
+        value = _env_value(probe.envvar)
+        enabled = value is not None
+
+        remaining = []
+        for arg in options:
+            flag, _, flag_value = arg.partition("=")
+            if flag == probe.flag:
+                value = flag_value or value
+                enabled = True
+            else:
+                remaining.append(arg)
+        options = remaining
+
+        if enabled:
+            probes.append(probe(value))
+    return [*options, *rest], probes
@@ -0,0 +1,249 @@
+"""Progress of long running commands.
+
+Commands receive a `Progress` reporter by annotating one of their parameters
+with `pl.Progress`. The parameter is not exposed on the CLI. Updating it only
+increments a counter: the clock is read once the counter reaches a threshold
+adapted to the rate of updates, roughly a hundred times per second, and the
+progress is drawn at most every `REDRAW_INTERVAL` seconds. When stderr is not
+a terminal, e.g. in CI or when redirected to a file, a line is logged every
+`LOG_INTERVAL` seconds instead.
+
+During a sweep the reporters of every run add their counts to counters shared
+by the workers, and the parent process draws the aggregated progress.
+"""
+
+import contextlib
+import sys
+import threading
+import time
+from collections.abc import Iterable, Iterator, Sized
+from typing import IO, Any, TypeVar
+
+T = TypeVar("T")
+
+REDRAW_INTERVAL = 0.1
+LOG_INTERVAL = 10.0
+# Target time between two reads of the clock while updating
+_CHECK_INTERVAL = 0.01
+
+# Counters of the number of items done and expected, shared by the workers of
+# a sweep, see `Aggregate`
+_shared: tuple[Any, Any] | None = None
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}" if hours else f"{minutes}:{seconds:02}"
+
+
+class _Display:
+    """Draw progress lines on a stream, redrawing in place on terminals."""
+
+    def __init__(self, name: str, stream: IO[str] | None = None):
+        self.name = name
+        self.stream = stream if stream is not None else sys.stderr
+        try:
+            self.tty = self.stream.isatty()
+        except (AttributeError, ValueError):
+            self.tty = False
+        self.interval = REDRAW_INTERVAL if self.tty else LOG_INTERVAL
+        self._drawn = False
+
+    def show(
+        self, count: int, total: int | None, elapsed: float, suffix: str = ""
+    ) -> None:
+        parts = [f"{count:,}" if not total else f"{count:,}/{total:,}"]
+        if total:
+            parts.append(f"({100 * count / total:.0f}%)")
+        rate = count / elapsed if elapsed > 0 else 0.0
+        parts.append(f"{rate:,.0f}/s")
+        parts.append(_format_duration(elapsed))
+        if total and rate and count < total:
+            parts.append(f"ETA {_format_duration((total - count) / rate)}")
+        if suffix:
+            parts.append(suffix)
+
+        line = f"{self.name}: {' '.join(parts)}"
+        try:
+            if self.tty:
+                self.stream.write(f"\r{line}\x1b[K")
+            else:
+                self.stream.write(f"{line}\n")
+            self.stream.flush()
+        except (OSError, ValueError):
+            # Progress is not worth failing the command for
+            pass
+        self._drawn = True
+
+    def finish(self) -> None:
+        if self.tty and self._drawn:
+            with contextlib.suppress(OSError, ValueError):
+                self.stream.write("\n")
+                self.stream.flush()
+
+
+class Progress:
+    """Report the progress of a command.
+
+    Commands receive a reporter by annotating one of their parameters with
+    `pl.Progress`. The parameter is not exposed on the CLI. Progress is drawn
+    on stderr while the command runs, and once more when it returns.
+
+    Attributes
+    ----------
+    count
+        Number of items done so far.
+    total
+        Number of items expected, if known. Used to show a percentage and an
+        estimate of the remaining time.
+
+    Example
+    -------
+    ```python
+    import platitudes as pl
+
+    def checksum(path: Path, progress: pl.Progress):
+        progress.total = path.stat().st_size
+        with path.open("rb") as fh:
+            while chunk := fh.read(1 << 20):
+                ...
+                progress.update(len(chunk))
+
+    pl.run(checksum)
+    ```
+    """
+
+    def __init__(self, name: str = "", stream: IO[str] | None = None):
+        self.count = 0
+        self.total: int | None = None
+        self._display = _Display(name, stream)
+        self._shared = _shared
+        self._pushed = (0, 0)
+        self._start = time.monotonic()
+        self._next_time = self._start + (
+            REDRAW_INTERVAL if self._shared is not None else self._display.interval
+        )
+        self._next_check = 1
+
+    def update(self, n: int = 1) -> None:
+        """Count `n` more items as done.
+
+        Cheap enough to be called for every item of loops over millions of
+        them, but calling it once per batch is cheaper still.
+        """
+        self.count += n
+        if self.count >= self._next_check:
+            self._check()
+
+    def track(self, iterable: Iterable[T], total: int | None = None) -> Iterator[T]:
+        """Iterate over `iterable` counting every item as done.
+
+        `total` defaults to the length of `iterable` when it has one and is
+        added to the total of the reporter.
+        """
+        if total is None and isinstance(iterable, Sized):
+            total = len(iterable)
+        if total is not None:
+            self.total = (self.total or 0) + total
+
+        for item in iterable:
+            yield item
+            self.count += 1
+            if self.count >= self._next_check:
+                self._check()
+
+    def _check(self) -> None:
+        now = time.monotonic()
+        # Read the clock again once enough items are done for about
+        # `_CHECK_INTERVAL` to have passed at the current rate
+        elapsed = now - self._start
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        self._next_check = self.count + max(1, int(rate * _CHECK_INTERVAL))
+        if now >= self._next_time:
+            self._flush(now)
+
+    def _flush(self, now: float) -> None:
+        if self._shared is not None:
+            count, total = self._shared
+            pushed_count, pushed_total = self._pushed
+            with count.get_lock():
+                count.value += self.count - pushed_count
+            with total.get_lock():
+                total.value += (self.total or 0) - pushed_total
+            self._pushed = (self.count, self.total or 0)
+            self._next_time = now + REDRAW_INTERVAL
+        else:
+            self._display.show(self.count, self.total, now - self._start)
+            self._next_time = now + self._display.interval
+
+    def close(self) -> None:
+        """Report the final progress, if there was any."""
+        if self.count or self._display._drawn:
+            self._flush(time.monotonic())
+        if self._shared is None:
+            self._display.finish()
+
+    def __repr__(self) -> str:
+        """The count and the total, if known."""
+        return f"Progress(count={self.count}, total={self.total})"
+
+
+class Aggregate:
+    """Draw the progress of all the runs of a sweep.
+
+    While in the context, the reporters created, including those of forked
+    workers, add their counts to counters shared between processes. `start`
+    draws them from a thread of this process and must only be called once the
+    workers are forked, since forking a process running threads is unsafe.
+
+    Attributes
+    ----------
+    done
+        Shared counter of the runs done, which the caller increments.
+    """
+
+    def __init__(self, name: str, runs: int):
+        # Progress is imported by every app but only sweeps share counters
+        # between processes
+        import multiprocessing
+
+        self.runs = runs
+        self.count = multiprocessing.Value("q", 0)
+        self.total = multiprocessing.Value("q", 0)
+        self.done = multiprocessing.Value("q", 0)
+        self._display = _Display(name)
+        self._start = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> "Aggregate":
+        """Make the reporters created from now on add to the shared counters."""
+        global _shared
+        _shared = (self.count, self.total)
+        return self
+
+    def start(self) -> None:
+        """Start drawing the progress from a thread."""
+        self._thread = threading.Thread(target=self._draw, daemon=True)
+        self._thread.start()
+
+    def _show(self) -> None:
+        if self.count.value:
+            suffix = f"[{self.done.value}/{self.runs} runs]"
+            elapsed = time.monotonic() - self._start
+            self._display.show(self.count.value, self.total.value, elapsed, suffix)
+
+    def _draw(self) -> None:
+        while not self._stop.wait(self._display.interval):
+            self._show()
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Stop drawing and draw the final progress."""
+        global _shared
+        _shared = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._show()
+        self._display.finish()
@@ -0,0 +1,149 @@
+"""Shared resources injected into commands.
+
+Providers are declared on the application with `@app.resource()` and
+commands receive what they provide through parameters annotated with
+`pl.Resource`, which are not exposed on the CLI. Each resource is created the
+first time a command needs it and then reused by every command run by the
+same process, e.g. in a `chain`, the `shell` or a batch of calls to the app.
+Providers written as generators are resumed at exit to tear the resource down.
+"""
+
+import atexit
+import inspect
+import os
+import threading
+from collections.abc import Callable, Generator
+from typing import Annotated, Any, get_args, get_origin
+
+from .errors import PlatitudesError
+from .signatures import signature
+
+
+class Resource:
+    """Mark a parameter as receiving a resource instead of a CLI argument.
+
+    Parameters
+    ----------
+    name
+        Name of the provider. Defaults to the name of the parameter.
+
+    Example
+    -------
+    ```python
+    import platitudes as pl
+
+    app = pl.Platitudes()
+
+    @app.resource()
+    def session():
+        with requests.Session() as session:
+            yield session
+
+    @app.command()
+    def fetch(url: str, http: Annotated[requests.Session, pl.Resource("session")]):
+        print(http.get(url).text)
+    ```
+    """
+
+    def __init__(self, name: str | None = None):
+        self.name = name
+
+
+def find_resource(annotation: Any) -> Resource | None:
+    """The `Resource` marker of an annotation if there is one."""
+    if get_origin(annotation) is Annotated:
+        for arg in get_args(annotation)[1:]:
+            if isinstance(arg, Resource):
+                return arg
+    return None
+
+
+def resource_params(main: Callable) -> dict[str, str]:
+    """Name of the resource injected in each parameter of `main` taking one."""
+    params = {}
+    for param_name, param in signature(main).parameters.items():
+        if (resource := find_resource(param.annotation)) is not None:
+            params[param_name] = resource.name or param_name
+    return params
+
+
+class Providers:
+    """The providers of an application and the resources they created.
+
+    Each resource is created at most once per process and kept until the
+    process exits, so that commands run in a batch, a chain or the shell share
+    it. Processes which don't run exit handlers, like the workers of a sweep,
+    must call `close` themselves.
+    """
+
+    def __init__(self):
+        self._factories: dict[str, Callable[[], Any]] = {}
+        self._instances: dict[str, Any] = {}
+        self._teardowns: list[Generator] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._at_exit = False
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:  # noqa: D102
+        if name in self._factories:
+            e_ = f"A provider for the resource '{name}' is already registered"
+            raise PlatitudesError(e_)
+        self._factories[name] = factory
+
+    def get(self, name: str) -> Any:
+        """The resource `name`, created if this process doesn't have it yet."""
+        if self._pid != os.getpid():
+            # Forked processes can't share the connections, sessions... of
+            # their parent so they create their own. The lock may have been
+            # held by another thread of the parent when forking.
+            self._instances = {}
+            self._teardowns = []
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+
+        # Concurrent commands, e.g. run by `CliRunner.invoke_many`, must not
+        # create the same resource twice
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+
+            try:
+                factory = self._factories[name]
+            except KeyError:
+                e_ = f"No provider registered for the resource '{name}'"
+                raise PlatitudesError(e_) from None
+
+            if inspect.isgeneratorfunction(factory):
+                generator = factory()
+                value = next(generator)
+                self._teardowns.append(generator)
+            else:
+                value = factory()
+
+            if not self._at_exit:
+                atexit.register(self.close)
+                self._at_exit = True
+
+            self._instances[name] = value
+            return value
+
+    def resolve(self, params: dict[str, str]) -> dict[str, Any]:
+        """Resources for each of the `params` of a command."""
+        return {param: self.get(name) for param, name in params.items()}
+
+    def close(self) -> None:
+        """Tear down the resources in the reverse order of their creation."""
+        if self._pid != os.getpid():
+            return
+
+        with self._lock:
+            teardowns = self._teardowns
+            self._instances = {}
+            self._teardowns = []
+        for generator in reversed(teardowns):
+            try:
+                next(generator)
+            except StopIteration:
+                pass
+            else:
+                generator.close()
@@ -0,0 +1,214 @@
+"""An interactive shell running the commands of an application.
+
+`tool shell` starts a prompt where every line is run as if it had been passed
+to `tool` on the command line, but in the same process: the application is
+imported and its parsers built only once, and resources provided with
+`@app.resource()` are reused between commands. Each command reports how long
+it took.
+
+Lines are split like a POSIX shell would. With `readline` available, which is
+the case everywhere but on Windows, the shell keeps a history across sessions
+in the cache directory and completes the names of commands, their flags and
+the choices of their parameters.
+"""
+
+import cmd
+import contextlib
+import os
+import shlex
+import sys
+import time
+import traceback
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Any
+
+from .cache import cache_dir
+from .errors import PlatitudesError
+from .platitudes import SHELL_COMMAND, Platitudes
+
+try:
+    import readline
+except ImportError:  # e.g. on Windows
+    readline = None  # type: ignore[assignment]
+
+HISTORY_LENGTH = 1000
+_EXIT = ("exit", "quit", "EOF")
+
+
+def _complete_paths(text: str) -> list[str]:
+    # Everything up to the last separator is the directory to list
+    head, sep, prefix = text.rpartition(os.sep)
+    try:
+        names = [entry.name for entry in Path(head + sep or ".").iterdir()]
+    except OSError:
+        return []
+    # Hidden entries are only completed once the dot is typed, like globs
+    hidden = prefix.startswith(".")
+    return sorted(
+        f"{head}{sep}{name}"
+        for name in names
+        if name.startswith(prefix) and (hidden or not name.startswith("."))
+    )
+
+
+def _format_elapsed(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.1f} ms"
+    return f"{seconds:.3f} s"
+
+
+class Shell(cmd.Cmd):
+    """Read commands of `app` from a prompt and run them one after another.
+
+    Parameters
+    ----------
+    app
+        The application whose commands are run.
+    prog
+        Name of the program, used for the prompt and the history file.
+    stdin, stdout
+        Streams to read lines from and to write the prompt to. Using anything
+        but the default streams disables `readline`.
+    """
+
+    def __init__(
+        self,
+        app: Platitudes,
+        prog: str,
+        stdin: IO[str] | None = None,
+        stdout: IO[str] | None = None,
+    ):
+        super().__init__(stdin=stdin, stdout=stdout)
+        self.app = app
+        self.prog = prog
+        self.prompt = f"{prog}> "
+        self.use_rawinput = stdin is None
+        self.intro = f"{prog} shell. Type 'help' for the commands, Ctrl-D to exit."
+
+    @property
+    def _commands(self) -> dict[str, Any]:
+        return self.app._subparsers.choices
+
+    def _history_path(self) -> Path:
+        return cache_dir() / "shell" / f"{Path(self.prog).name}.history"
+
+    @contextlib.contextmanager
+    def _readline(self) -> Iterator[None]:
+        if readline is None or not self.use_rawinput:
+            yield
+            return
+
+        history = self._history_path()
+        with contextlib.suppress(OSError):
+            readline.read_history_file(history)
+        readline.set_history_length(HISTORY_LENGTH)
+        # Flags start with dashes which are word delimiters by default
+        delims = readline.get_completer_delims()
+        readline.set_completer_delims(" \t\n")
+        try:
+            yield
+        finally:
+            readline.set_completer_delims(delims)
+            with contextlib.suppress(OSError):
+                history.parent.mkdir(parents=True, exist_ok=True)
+                readline.write_history_file(history)
+
+    def run(self) -> None:
+        """Read and run commands until the end of the input or `exit`."""
+        intro = self.intro
+        with self._readline():
+            while True:
+                try:
+                    self.cmdloop(intro)
+                    return
+                except KeyboardInterrupt:
+                    # Ctrl-C discards the line being typed, not the shell
+                    self.stdout.write("^C\n")
+                    intro = ""
+
+    def emptyline(self) -> bool:
+        """Do nothing, instead of repeating the last command."""
+        return False
+
+    def onecmd(self, line: str) -> bool:
+        """Run a line, returning whether the shell should stop."""
+        try:
+            arguments = shlex.split(line)
+        except ValueError as e:
+            print(f"{self.prog}: {e}", file=sys.stderr)
+            return False
+        if not arguments:
+            return False
+
+        name = arguments[0]
+        # Commands of the application take precedence over the shell's own
+        if name not in self._commands:
+            if name in _EXIT:
+                if name == "EOF":
+                    self.stdout.write("\n")
+                return True
+            if name in ("help", "?"):
+                self.stdout.write(self.app._parser.format_help())
+                return False
+            if name == SHELL_COMMAND:
+                print(f"{self.prog}: already in the shell", file=sys.stderr)
+                return False
+
+        self.run_command(arguments)
+        return False
+
+    def run_command(self, arguments: list[str]) -> Any:
+        """Run the command line `arguments`, without the program name."""
+        start = time.perf_counter()
+        status = "ok"
+        result = None
+        try:
+            result = self.app([self.prog, *arguments])
+        except SystemExit as e:
+            # Raised by argparse for --help and mistakes, and by commands
+            if e.code not in (0, None):
+                status = f"exit code {e.code}"
+        except PlatitudesError as e:
+            print(e, file=sys.stderr)
+            status = "error"
+        except KeyboardInterrupt:
+            status = "interrupted"
+        except Exception:
+            traceback.print_exc()
+            status = "error"
+
+        elapsed = _format_elapsed(time.perf_counter() - start)
+        print(f"[{arguments[0]}: {status}, {elapsed}]", file=sys.stderr)
+        return result
+
+    def completenames(self, text: str, *ignored: Any) -> list[str]:
+        """Complete the name of a command."""
+        names = [*self._commands, "help", "exit"]
+        return [name for name in names if name.startswith(text)]
+
+    def completedefault(
+        self, text: str, line: str, begidx: int, endidx: int
+    ) -> list[str]:
+        """Complete the flags of a command, the choices or paths of values."""
+        words = line[:begidx].split()
+        parser = self._commands.get(words[0]) if words else None
+        if parser is None:
+            return []
+
+        actions = parser._actions
+        previous = next(
+            (a for a in actions if words[-1] in a.option_strings and a.nargs != 0),
+            None,
+        )
+        if previous is not None and previous.choices:
+            return [c for c in previous.choices if str(c).startswith(text)]
+
+        if text.startswith("-"):
+            flags = [flag for action in actions for flag in action.option_strings]
+            return [flag for flag in flags if flag.startswith(text)]
+
+        positional = [a for a in actions if not a.option_strings and a.choices]
+        choices = [str(c) for a in positional for c in a.choices]
+        paths = _complete_paths(text)
+        return [c for c in choices if c.startswith(text)] + paths
@@ -0,0 +1,76 @@
+"""Signatures of commands with their annotations resolved.
+
+Modules using `from __future__ import annotations`, or quoting their
+annotations, keep them as strings until something asks for the types. They
+are resolved with `typing.get_type_hints`, keeping the metadata of `Annotated`
+types where `pl.Argument` lives, the first time the signature of a command is
+needed and then remembered for as long as the command exists.
+"""
+
+import inspect
+import typing
+import weakref
+from collections.abc import Callable
+from types import UnionType
+from typing import Annotated, Any, Union, get_args, get_origin
+
+from .errors import PlatitudesError
+
+_signatures: "weakref.WeakKeyDictionary[Callable, inspect.Signature]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _unwrap_implicit_optional(hint: Any, default: Any) -> Any:
+    """`Annotated` types of parameters defaulting to `None`, without `Optional`.
+
+    Python 3.10 wraps the hints of such parameters in `Optional`, which hides
+    the `pl.Argument` they carry.
+    """
+    if default is not None or get_origin(hint) not in (Union, UnionType):
+        return hint
+    args = [arg for arg in get_args(hint) if arg is not type(None)]
+    if len(args) == 1 and get_origin(args[0]) is Annotated:
+        return args[0]
+    return hint
+
+
+def _resolve(function: Callable) -> inspect.Signature:
+    signature_ = inspect.signature(function)
+    parameters = signature_.parameters.values()
+    # Resolving annotations is far slower than reading them, so it's only done
+    # when they are postponed
+    if not any(isinstance(param.annotation, str) for param in parameters):
+        return signature_
+
+    try:
+        hints = typing.get_type_hints(function, include_extras=True)
+    except Exception as e:
+        name = getattr(function, "__name__", repr(function))
+        e_ = f"Can't resolve the annotations of '{name}': {e}"
+        raise PlatitudesError(e_) from e
+
+    return signature_.replace(
+        parameters=[
+            param.replace(
+                annotation=_unwrap_implicit_optional(
+                    hints.get(param.name, param.annotation), param.default
+                )
+            )
+            for param in parameters
+        ]
+    )
+
+
+def signature(function: Callable) -> inspect.Signature:
+    """The signature of `function` with string annotations turned into types."""
+    try:
+        return _signatures[function]
+    except KeyError:
+        pass
+    except TypeError:
+        # Can't be weakly referenced, so it can't be remembered either
+        return _resolve(function)
+
+    signature_ = _signatures[function] = _resolve(function)
+    return signature_
@@ -0,0 +1,79 @@
+"""Redirection of the standard streams for a single thread.
+
+`contextlib.redirect_stdout` swaps `sys.stdout` for the whole process, so the
+output of every other thread ends up in the redirected stream too. While in
+`routed_streams`, `sys.stdin`, `sys.stdout` and `sys.stderr` are replaced by
+routers forwarding to a stream chosen per thread, or to the original stream
+for threads that didn't choose one.
+"""
+
+import sys
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+STREAM_NAMES = ("stdin", "stdout", "stderr")
+
+
+class StreamRouter:
+    """Stand-in for a `sys` stream that can be redirected per thread."""
+
+    def __init__(self, default: Any):
+        self._default = default
+        self._local = threading.local()
+
+    def redirect(self, stream: Any) -> None:
+        """Send what the current thread writes to `stream`, or back if `None`."""
+        self._local.stream = stream
+
+    def target(self) -> Any:
+        """The stream the current thread writes to."""
+        return getattr(self._local, "stream", None) or self._default
+
+    @contextmanager
+    def redirected(self, stream: Any) -> Iterator[None]:
+        """Redirect the current thread to `stream` while in the context."""
+        previous = getattr(self._local, "stream", None)
+        self._local.stream = stream
+        try:
+            yield
+        finally:
+            self._local.stream = previous
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward everything else to the stream of the current thread."""
+        return getattr(self.target(), name)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the lines of the stream of the current thread."""
+        return iter(self.target())
+
+
+_routers_lock = threading.Lock()
+_routers_users = 0
+
+
+@contextmanager
+def routed_streams() -> Iterator[dict[str, StreamRouter]]:
+    """Install routers as the `sys` streams while in the context.
+
+    Nested and concurrent uses share the same routers, which are removed once
+    the last of them exits.
+    """
+    global _routers_users
+
+    with _routers_lock:
+        if _routers_users == 0:
+            for name in STREAM_NAMES:
+                setattr(sys, name, StreamRouter(getattr(sys, name)))
+        _routers_users += 1
+
+    try:
+        yield {name: getattr(sys, name) for name in STREAM_NAMES}
+    finally:
+        with _routers_lock:
+            _routers_users -= 1
+            if _routers_users == 0:
+                for name in STREAM_NAMES:
+                    setattr(sys, name, getattr(sys, name)._default)
@@ -0,0 +1,293 @@
+"""Running a command over a grid of parameter values.
+
+Any command accepts one or more `--sweep NAME=VALUES` options, which are
+removed before parsing the rest of the arguments, up to the first `--`.
+`VALUES` is a comma separated list where each item is either a value or an
+inclusive range of integers such as `3..8`. The command is run once for each
+combination of the swept values, over a pool of worker processes forked from
+the current one, so the application is imported and the arguments parsed only
+once.
+
+Each run is reported as a JSON line on stdout, in the order of the grid, with
+the swept values, the exit code, the value returned, anything the command
+printed and, for failures, the error.
+
+The number of workers defaults to the number of CPUs and can be set with
+`--sweep-workers N`. Commands reporting their progress with `pl.Progress` have
+it aggregated over all the runs and drawn on stderr.
+"""
+
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+from typing import Any
+
+from .actions import PlatitudesAction
+from .errors import PlatitudesError
+from .progress import Aggregate
+from .streams import routed_streams
+
+SWEEP_FLAG = "--sweep"
+WORKERS_FLAG = "--sweep-workers"
+
+_TRUE = ("true", "1", "yes", "on")
+_FALSE = ("false", "0", "no", "off")
+
+
+def _flag_value(arguments: list[str], i: int, flag: str) -> tuple[str, int]:
+    """Value of `flag` at `arguments[i]`, given as `--flag=x` or `--flag x`."""
+    argument = arguments[i]
+    if argument.startswith(f"{flag}="):
+        return argument[len(flag) + 1 :], i + 1
+    if i + 1 >= len(arguments):
+        e_ = f"{flag} expects a value"
+        raise PlatitudesError(e_)
+    return arguments[i + 1], i + 2
+
+
+def extract_sweep(
+    arguments: list[str],
+) -> tuple[list[str], dict[str, str], int | None]:
+    """Strip the sweep options from `arguments`.
+
+    Options are only looked for before the first `--`, after which every
+    argument is passed on as is.
+
+    Returns
+    -------
+    tuple[list[str], dict[str, str], int | None]
+        The remaining arguments, the unparsed values swept for each parameter
+        and the number of workers requested.
+    """
+    remaining = []
+    sweep: dict[str, str] = {}
+    workers = None
+    end = arguments.index("--") if "--" in arguments else len(arguments)
+    options = arguments[:end]
+    i = 0
+    while i < len(options):
+        argument = options[i]
+        flag = argument.partition("=")[0]
+        if flag == SWEEP_FLAG:
+            spec, i = _flag_value(options, i, SWEEP_FLAG)
+            name, sep, values = spec.partition("=")
+            if not sep or not name or not values:
+                e_ = f"Invalid sweep '{spec}'. Expected NAME=VALUES"
+                raise PlatitudesError(e_)
+            sweep[name.replace("-", "_")] = values
+        elif flag == WORKERS_FLAG:
+            value, i = _flag_value(options, i, WORKERS_FLAG)
+            try:
+                workers = int(value)
+            except ValueError:
+                workers = 0
+            if workers < 1:
+                e_ = f"{WORKERS_FLAG} expects a positive integer, got '{value}'"
+                raise PlatitudesError(e_)
+        else:
+            remaining.append(argument)
+            i += 1
+
+    return [*remaining, *arguments[end:]], sweep, workers
+
+
+def expand_values(values: str) -> list[str]:
+    """Split `"a,b,3..5"` into `["a", "b", "3", "4", "5"]`."""
+    expanded = []
+    for item in values.split(","):
+        start, sep, stop = item.partition("..")
+        if not sep:
+            expanded.append(item)
+            continue
+        try:
+            first, last = int(start), int(stop)
+        except ValueError:
+            e_ = f"Invalid range '{item}'. Ranges are only supported for integers"
+            raise PlatitudesError(e_) from None
+        step = 1 if last >= first else -1
+        expanded.extend(str(i) for i in range(first, last + step, step))
+    return expanded
+
+
+def _convert(action: type[PlatitudesAction], name: str, value: str) -> Any:
+    if issubclass(action, PlatitudesAction):
+        return action.process(value, name.replace("_", "-"))
+
+    # Booleans use argparse's own flag action
+    if value.lower() in _TRUE:
+        return True
+    if value.lower() in _FALSE:
+        return False
+    e_ = f"argument {name}: invalid boolean value '{value}'"
+    raise PlatitudesError(e_)
+
+
+def expand_grid(
+    sweep: dict[str, str], argument_actions: dict[str, type[PlatitudesAction]]
+) -> tuple[list[dict[str, str]], list[dict[str, Any]]]:
+    """Cartesian product of the swept values.
+
+    Every value is converted once with the action of its parameter.
+
+    Returns
+    -------
+    tuple[list[dict[str, str]], list[dict[str, Any]]]
+        The values of every combination as given on the command line and
+        converted.
+    """
+    unknown = [name for name in sweep if name not in argument_actions]
+    if unknown:
+        e_ = f"Can't sweep unknown parameters: {unknown}"
+        raise PlatitudesError(e_)
+
+    raw_values = {name: expand_values(values) for name, values in sweep.items()}
+    converted = {
+        name: [_convert(argument_actions[name], name, value) for value in values]
+        for name, values in raw_values.items()
+    }
+
+    names = list(sweep)
+    raw_grid = [
+        dict(zip(names, combination, strict=True))
+        for combination in itertools.product(*(raw_values[n] for n in names))
+    ]
+    grid = [
+        dict(zip(names, combination, strict=True))
+        for combination in itertools.product(*(converted[n] for n in names))
+    ]
+    return raw_grid, grid
+
+
+# State shared with the forked workers. It is inherited rather than pickled so
+# that commands defined anywhere, including `__main__`, can be swept.
+_sweep_state: dict[str, Any] = {}
+
+
+def _set_sweep_state(state: dict[str, Any]) -> None:
+    global _sweep_state
+    _sweep_state = state
+
+
+def _init_worker(state: dict[str, Any]) -> None:
+    _set_sweep_state(state)
+    if state["teardown"] is not None:
+        # Workers leave with `os._exit`, skipping the exit handlers, but run
+        # the finalizers of `multiprocessing` once the pool shuts them down
+        Finalize(None, state["teardown"], exitpriority=0)
+
+
+def _exit_code(exit_: SystemExit) -> int:
+    if exit_.code is None:
+        return 0
+    return exit_.code if isinstance(exit_.code, int) else 1
+
+
+def _run_combination(index: int) -> str:
+    state = _sweep_state
+    config = state["config"] | state["grid"][index]
+    record: dict[str, Any] = {"params": state["raw_grid"][index]}
+
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    start = time.perf_counter()
+    with (
+        routed_streams() as routers,
+        routers["stdout"].redirected(stdout),
+        routers["stderr"].redirected(stderr),
+    ):
+        try:
+            record["result"] = state["execute"](config)
+            record["exit_code"] = 0
+        except SystemExit as e:
+            record["exit_code"] = _exit_code(e)
+        except Exception as e:
+            record["exit_code"] = 1
+            record["error"] = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+
+    record["elapsed_seconds"] = round(time.perf_counter() - start, 6)
+    record["stdout"] = stdout.getvalue()
+    record["stderr"] = stderr.getvalue()
+    return json.dumps(record, default=str)
+
+
+def run_sweep(
+    execute: Callable[[dict[str, Any]], Any],
+    config: dict[str, Any],
+    raw_grid: list[dict[str, str]],
+    grid: list[dict[str, Any]],
+    workers: int | None = None,
+    name: str = "sweep",
+    teardown: Callable[[], Any] | None = None,
+) -> None:
+    """Run `execute` over the grid and write the JSON Lines report to stdout.
+
+    Parameters
+    ----------
+    execute
+        Runs the command with a full config.
+    config
+        The parsed values of the parameters not swept.
+    raw_grid, grid
+        The combinations of swept values as returned by `expand_grid`.
+    workers
+        Size of the process pool. Defaults to the number of CPUs.
+    name
+        Shown next to the aggregated progress of the runs.
+    teardown
+        Called by each worker before exiting, e.g. to close the resources it
+        created.
+
+    Exits with code 1 if any of the runs failed.
+    """
+    state = {
+        "execute": execute,
+        "config": config,
+        "grid": grid,
+        "raw_grid": raw_grid,
+        "teardown": teardown,
+    }
+
+    failed = 0
+    # Entered before forking so that the workers inherit the shared counters
+    with Aggregate(name, len(grid)) as progress:
+        if "fork" in multiprocessing.get_all_start_methods():
+            executor = ProcessPoolExecutor(
+                min(workers or os.cpu_count() or 1, len(grid)),
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_worker,
+                initargs=(state,),
+            )
+            # Submitting the runs forks every worker at once, which must
+            # happen before any thread is started
+            records = executor.map(_run_combination, range(len(grid)))
+        else:
+            # The runs share the resources of this process, closed at exit
+            executor = contextlib.nullcontext()
+            _set_sweep_state(state)
+            records = map(_run_combination, range(len(grid)))
+
+        progress.start()
+        with executor:
+            for record in records:
+                failed += _report(record)
+                progress.done.value += 1
+
+    if failed:
+        print(f"{failed} of {len(grid)} sweep runs failed", file=sys.stderr)
+        sys.exit(1)
+
+
+def _report(record: str) -> bool:
+    """Write a record as soon as it's available and tell whether it failed."""
+    print(record, flush=True)
+    return json.loads(record)["exit_code"] != 0
@@ -0,0 +1,268 @@
+"""Helpers to test Platitudes applications.
+
+`CliRunner` invokes an application in-process, reusing the parsers built when
+the commands were registered, while capturing everything written to stdout and
+stderr. Many invocations can be run concurrently with `CliRunner.invoke_many`.
+
+Example
+-------
+```python
+from platitudes.testing import CliRunner
+
+from mypkg.cli import app
+
+
+def test_hello():
+    result = CliRunner(app).invoke(["hello", "World"])
+    assert result.exit_code == 0
+    assert result.stdout == "Hello World\\n"
+```
+"""
+
+import io
+import multiprocessing
+import os
+import pickle
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any
+
+from .errors import PlatitudesError
+from .streams import routed_streams
+
+
+class Result:
+    """Outcome of invoking a CLI application.
+
+    Attributes
+    ----------
+    exit_code
+        `0` if the command returned normally, or exited with `pl.Exit`, the
+        code passed to `sys.exit` and `1` for uncaught exceptions.
+    stdout
+        Everything written to stdout.
+    stderr
+        Everything written to stderr.
+    return_value
+        The value returned by the command.
+    exception
+        The uncaught exception raised by the command if any. `SystemExit` is
+        not considered an exception.
+    """
+
+    def __init__(
+        self,
+        exit_code: int,
+        stdout: str,
+        stderr: str,
+        return_value: Any = None,
+        exception: BaseException | None = None,
+    ):
+        self.exit_code = exit_code
+        self.stdout = stdout
+        self.stderr = stderr
+        self.return_value = return_value
+        self.exception = exception
+
+    def __repr__(self) -> str:
+        """Exit code and exception, the output can be long."""
+        return f"<Result exit_code={self.exit_code} exception={self.exception!r}>"
+
+
+@contextmanager
+def _patched_environ(env: dict[str, str | None] | None) -> Iterator[None]:
+    if not env:
+        yield
+        return
+
+    original = {name: os.environ.get(name) for name in env}
+    _update_environ(env)
+    try:
+        yield
+    finally:
+        _update_environ(original)
+
+
+@contextmanager
+def _patched_argv(argv: list[str]) -> Iterator[None]:
+    original = sys.argv
+    sys.argv = argv
+    try:
+        yield
+    finally:
+        sys.argv = original
+
+
+def _update_environ(env: dict[str, str | None]) -> None:
+    for name, value in env.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+
+def _text_stream(data: bytes = b"") -> io.TextIOWrapper:
+    return io.TextIOWrapper(io.BytesIO(data), encoding="utf-8")
+
+
+def _read(stream: io.TextIOWrapper) -> str:
+    stream.flush()
+    return stream.buffer.getvalue().decode()  # pyright: ignore
+
+
+class CliRunner:
+    """Invoke a Platitudes application in-process.
+
+    Parameters
+    ----------
+    app
+        The `pl.Platitudes` application to invoke or, in general, any callable
+        taking the list of CLI arguments.
+    prog
+        Program name passed as the first CLI argument.
+    """
+
+    def __init__(self, app: Callable[[list[str]], Any], prog: str = "prog"):
+        self.app = app
+        self.prog = prog
+
+    def invoke(
+        self,
+        args: list[str],
+        env: dict[str, str | None] | None = None,
+        input: str | bytes | None = None,  # noqa: A002
+    ) -> Result:
+        """Run the application with `args` and capture its outcome.
+
+        Parameters
+        ----------
+        args
+            CLI arguments, not including the program name.
+        env
+            Environment variables set while the command runs. Variables set to
+            `None` are removed.
+        input
+            Data available to the command through stdin.
+
+        `sys.argv` is set to the program name followed by `args` while the
+        command runs.
+        """
+        with _patched_environ(env), _patched_argv([self.prog, *args]):
+            return self._invoke(args, input)
+
+    def _invoke(self, args: list[str], stdin_data: str | bytes | None) -> Result:
+        if isinstance(stdin_data, str):
+            stdin_data = stdin_data.encode()
+
+        stdin = _text_stream(stdin_data or b"")
+        stdout = _text_stream()
+        stderr = _text_stream()
+        return_value = None
+        exception = None
+        exit_code = 0
+        with routed_streams() as routers:
+            for router, stream in zip(
+                routers.values(), (stdin, stdout, stderr), strict=True
+            ):
+                router.redirect(stream)
+            try:
+                return_value = self.app([self.prog, *args])
+            except SystemExit as e:
+                exit_code = _exit_code(e)
+            except Exception as e:
+                exception = e
+                exit_code = 1
+            finally:
+                for router in routers.values():
+                    router.redirect(None)
+
+        return Result(exit_code, _read(stdout), _read(stderr), return_value, exception)
+
+    def invoke_many(
+        self,
+        cases: Iterable[list[str] | dict[str, Any]],
+        workers: int | None = None,
+        processes: bool = False,
+    ) -> list[Result]:
+        """Run many invocations concurrently.
+
+        Parameters
+        ----------
+        cases
+            Either the list of CLI arguments of each invocation or a dict with
+            the keyword arguments for `invoke`.
+        workers
+            Maximum number of invocations running at the same time.
+        processes
+            By default invocations run in a pool of threads. Commands that
+            release the GIL, or are I/O bound, scale well this way. CPU bound
+            commands, and cases changing environment variables, which are
+            shared by all threads, need a pool of processes instead. For the
+            same reason `sys.argv` is only set when using processes.
+
+        Returns
+        -------
+        list[Result]
+            The results in the same order as `cases`.
+        """
+        cases = [case if isinstance(case, dict) else {"args": case} for case in cases]
+
+        executor: Executor
+        if processes:
+            executor = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_set_worker_runner,
+                initargs=(self,),
+            )
+            call = _invoke_in_worker
+        else:
+            if any(case.get("env") for case in cases):
+                e_ = "Setting env requires running the cases with processes=True"
+                raise PlatitudesError(e_)
+            executor = ThreadPoolExecutor(workers)
+            call = self._invoke_case
+
+        with executor:
+            return list(executor.map(call, cases))
+
+    def _invoke_case(self, case: dict[str, Any]) -> Result:
+        return self._invoke(case["args"], case.get("input"))
+
+
+def _exit_code(exit_: SystemExit) -> int:
+    if exit_.code is None:
+        return 0
+    if isinstance(exit_.code, int):
+        return exit_.code
+    return 1
+
+
+_worker_runner: CliRunner | None = None
+
+
+def _set_worker_runner(runner: CliRunner) -> None:
+    global _worker_runner
+    _worker_runner = runner
+
+
+def _invoke_in_worker(case: dict[str, Any]) -> Result:
+    assert _worker_runner is not None
+    result = _worker_runner.invoke(**case)
+
+    # Results are sent back to the parent process so they must be picklable
+    if not _is_picklable(result.return_value):
+        result.return_value = repr(result.return_value)
+    if not _is_picklable(result.exception):
+        result.exception = RuntimeError(repr(result.exception))
+    return result
+
+
+def _is_picklable(value: Any) -> bool:
+    try:
+        pickle.dumps(value)
+    except Exception:
+        return False
+    return True
@@ -0,0 +1,309 @@
+"""Rerunning a command when the paths it reads change.
+
+Passing `--watch` to any command runs it and then waits for changes to the
+files and directories given to its `Path`, or file, parameters, except those
+declared with `role="output"`. Once they change the arguments are parsed
+again, with the parser already built, and the command rerun in the same
+process. Bursts of changes, like an editor saving several files, are
+debounced into a single rerun.
+
+On Linux changes are detected with inotify, through `ctypes`. Elsewhere, or if
+`PLATITUDES_WATCH_POLL` is set to a true value, e.g. for network filesystems,
+the paths are polled with `os.stat`.
+
+`--watch` is only looked for before the first `--`, after which every argument
+is passed on as is.
+"""
+
+import contextlib
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+import traceback
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+from .actions import PlatitudesAction
+from .errors import PlatitudesError
+from .globbing import GlobPaths, paths_of
+from .probes import _env_value
+
+WATCH_FLAG = "--watch"
+DEBOUNCE = 0.1
+POLL_INTERVAL = 0.5
+
+# From <sys/inotify.h>
+_IN_MODIFY = 0x2
+_IN_ATTRIB = 0x4
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_Q_OVERFLOW = 0x4000
+_IN_ISDIR = 0x40000000
+_IN_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+)
+_EVENT = struct.Struct("iIII")
+
+
+def extract_watch(arguments: list[str]) -> tuple[list[str], bool]:
+    """Strip `--watch` from `arguments` and tell whether it was there."""
+    end = arguments.index("--") if "--" in arguments else len(arguments)
+    remaining = [arg for arg in arguments[:end] if arg != WATCH_FLAG]
+    return [*remaining, *arguments[end:]], len(remaining) != end
+
+
+def watched_paths(
+    config: dict[str, Any], argument_actions: dict[str, type[PlatitudesAction]]
+) -> list[Path]:
+    """Paths passed to the command which are not outputs.
+
+    Glob parameters contribute every path matching their pattern.
+    """
+    paths = []
+    for param, action in argument_actions.items():
+        if getattr(action, "role", None) == "output":
+            continue
+        value = config.get(param)
+        values = paths_of(value) if isinstance(value, GlobPaths) else value
+        values = values if isinstance(values, list) else [values]
+        paths.extend(Path(v).absolute() for v in values if isinstance(v, os.PathLike))
+    return paths
+
+
+class _InotifyWatcher:
+    """Wait for changes with inotify.
+
+    Files are watched through their directory so that files replaced by a
+    rename, as most editors do when saving, are still tracked. Directories are
+    watched recursively.
+    """
+
+    def __init__(self, paths: Iterable[Path]):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # Watch descriptor -> (directory, names of interest or None for all)
+        self._watches: dict[int, tuple[str, set[str] | None]] = {}
+        try:
+            for path in paths:
+                if path.is_dir():
+                    self._watch_tree(str(path))
+                else:
+                    self._watch(str(path.parent), path.name)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch(self, directory: str, name: str | None = None) -> None:
+        import ctypes
+
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _IN_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Can't watch {directory}")
+
+        _, names = self._watches.get(wd, (directory, set()))
+        if name is None or names is None:
+            names = None
+        else:
+            names.add(name)
+        self._watches[wd] = (directory, names)
+
+    def _watch_tree(self, directory: str) -> None:
+        self._watch(directory)
+        with contextlib.suppress(OSError), os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    self._watch_tree(entry.path)
+
+    def _read_changes(self) -> set[str]:
+        changes = set()
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return changes
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                changes.add("")
+                continue
+            if wd not in self._watches:
+                continue
+            directory, names = self._watches[wd]
+            if names is not None and name not in names:
+                continue
+            path = str(Path(directory) / name)
+            if names is None and mask & _IN_ISDIR and mask & _IN_CREATE:
+                with contextlib.suppress(OSError):
+                    self._watch_tree(path)
+            changes.add(path)
+        return changes
+
+    def wait(self, debounce: float = DEBOUNCE) -> set[str]:
+        """Block until something changes and the changes settle down."""
+        changes: set[str] = set()
+        timeout = None
+        while True:
+            ready, _, _ = select.select([self._fd], [], [], timeout)
+            if not ready and changes:
+                return changes
+            changes |= self._read_changes()
+            if changes:
+                timeout = debounce
+
+    def close(self) -> None:  # noqa: D102
+        os.close(self._fd)
+
+
+class _PollingWatcher:
+    """Wait for changes by comparing snapshots of the stats of the paths."""
+
+    def __init__(self, paths: Iterable[Path], interval: float | None = None):
+        self._paths = [str(path) for path in paths]
+        self._interval = interval if interval is not None else POLL_INTERVAL
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        pending = list(self._paths)
+        while pending:
+            path = pending.pop()
+            try:
+                stat = Path(path).stat()
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+            if Path(path).is_dir():
+                with contextlib.suppress(OSError), os.scandir(path) as entries:
+                    pending.extend(entry.path for entry in entries)
+        return snapshot
+
+    def _changes(self) -> set[str]:
+        snapshot = self._take_snapshot()
+        changes = {
+            path
+            for path in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(path) != self._snapshot.get(path)
+        }
+        self._snapshot = snapshot
+        return changes
+
+    def wait(self, debounce: float = DEBOUNCE) -> set[str]:
+        """Block until something changes and the changes settle down."""
+        changes: set[str] = set()
+        while True:
+            time.sleep(debounce if changes else self._interval)
+            new_changes = self._changes()
+            if changes and not new_changes:
+                return changes
+            changes |= new_changes
+
+    def close(self) -> None:  # noqa: D102
+        pass
+
+
+def make_watcher(paths: list[Path]) -> _InotifyWatcher | _PollingWatcher:
+    """The best watcher available for the platform."""
+    polling = _env_value("PLATITUDES_WATCH_POLL") is not None
+    if sys.platform.startswith("linux") and not polling:
+        try:
+            return _InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            # e.g. no more inotify watches available
+            pass
+    return _PollingWatcher(paths)
+
+
+def _run_once(
+    name: str,
+    parse: Callable[[], tuple[list[Path], Callable[[], Any]]],
+    paths: list[Path],
+) -> list[Path] | None:
+    """Parse the arguments and run the command, reporting its failures.
+
+    Returns the paths to watch next, or `None` once interrupted.
+    """
+    try:
+        paths, run = parse()
+    except (SystemExit, PlatitudesError) as e:
+        if not paths:
+            # Nothing to watch if the arguments can't be parsed at all
+            raise
+        # Otherwise wait for the mistake to be fixed
+        if isinstance(e, PlatitudesError):
+            print(f"{name}: {e}", file=sys.stderr)
+        return paths
+
+    try:
+        run()
+    except SystemExit as e:
+        if e.code not in (0, None):
+            print(f"{name}: exited with code {e.code}", file=sys.stderr)
+    except KeyboardInterrupt:
+        return None
+    except Exception:
+        traceback.print_exc()
+    return paths
+
+
+def _wait(name: str, paths: list[Path]) -> set[str] | None:
+    """Block until some of `paths` change, or `None` once interrupted."""
+    watcher = make_watcher(paths)
+    print(
+        f"{name}: watching {len(paths)} paths for changes, Ctrl-C to stop",
+        file=sys.stderr,
+    )
+    try:
+        return watcher.wait()
+    except KeyboardInterrupt:
+        return None
+    finally:
+        watcher.close()
+
+
+def watch(name: str, parse: Callable[[], tuple[list[Path], Callable[[], Any]]]) -> None:
+    """Run a command again every time the paths it reads change.
+
+    `parse` parses the arguments and returns the paths to watch together with
+    a callable running the command. Only returns once interrupted with Ctrl-C.
+    """
+    paths: list[Path] | None = []
+    while True:
+        paths = _run_once(name, parse, paths)
+        if paths is None:
+            return
+        if not paths:
+            print(f"{name}: no paths to watch", file=sys.stderr)
+            return
+
+        changes = _wait(name, paths)
+        if changes is None:
+            return
+
+        shown = ", ".join(sorted(changes)[:3]) + (", ..." if len(changes) > 3 else "")
+        print(f"{name}: rerunning after changes to {shown}", file=sys.stderr)
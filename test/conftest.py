@@ -0,0 +1,10 @@
+"""Fixtures shared by every test."""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cache(tmp_path_factory, monkeypatch):
+    # Keep the caches written by the tests out of the user's cache directory
+    cache_dir = tmp_path_factory.mktemp("platitudes-cache")
+    monkeypatch.setenv("PLATITUDES_CACHE_DIR", str(cache_dir))
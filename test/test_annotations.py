@@ -0,0 +1,83 @@
+"""Commands defined in a module with postponed evaluation of annotations."""
+
+from __future__ import annotations
+
+from enum import Enum
+from pathlib import Path
+from typing import Annotated, Optional
+
+import pytest
+
+import platitudes as pl
+from platitudes.signatures import _signatures, _unwrap_implicit_optional, signature
+
+
+class Colour(Enum):
+    """Choices of a parameter."""
+
+    RED = "red"
+    BLUE = "blue"
+
+
+def paint(
+    colour: Colour,
+    src: Annotated[Path, pl.Argument(exists=True, envvar="PAINT_SRC")] = Path(),
+    coats: int | None = None,
+    shards: pl.IntSet = pl.IntSet("1-3"),
+    *,
+    ctx: pl.Context,
+):
+    """Command whose annotations are all strings until resolved."""
+    assert isinstance(ctx, pl.Context)
+    return colour, src, coats, shards
+
+
+def test_postponed_annotations(tmp_path):
+    """String annotations are resolved when building the parser."""
+    colour, src, coats, shards = pl.run(
+        paint, ["prog", "blue", "--src", str(tmp_path), "--coats", "2"]
+    )
+    assert colour is Colour.BLUE
+    assert src == tmp_path
+    assert coats == 2
+    assert shards == pl.IntSet("1-3")
+
+    with pytest.raises(pl.PlatitudesError):
+        pl.run(paint, ["prog", "blue", "--src", str(tmp_path / "missing")])
+
+
+def test_signature_is_memoised():
+    """Signatures are resolved once per function."""
+    resolved = signature(paint)
+    assert resolved is signature(paint)
+    assert paint in _signatures
+    assert resolved.parameters["colour"].annotation is Colour
+
+
+def test_unresolvable_annotations():
+    """Undefined names in annotations are reported."""
+
+    def _(x: Undefined):  # noqa: F821
+        pass
+
+    with pytest.raises(pl.PlatitudesError, match="Undefined"):
+        pl.run(_, ["prog", "1"])
+
+
+def scale(
+    factor: Annotated[int, pl.Argument(help="How much")] = None,  # noqa: RUF013
+):
+    """Command with an annotated parameter defaulting to `None`."""
+    return factor
+
+
+def test_annotated_none_default():
+    """`Annotated` parameters defaulting to `None` keep their `pl.Argument`."""
+    assert pl.run(scale, ["prog", "--factor", "2"]) == 2
+    assert pl.run(scale, ["prog"]) is None
+
+    # Python 3.10 resolves the annotation above as `Optional[Annotated[...]]`
+    annotated = Annotated[int, pl.Argument()]
+    assert _unwrap_implicit_optional(Optional[annotated], None) is annotated
+    assert _unwrap_implicit_optional(Optional[annotated], 1) == Optional[annotated]
+    assert _unwrap_implicit_optional(Optional[int], None) == Optional[int]
@@ -1,7 +1,15 @@
 """End to end tests for the CLI."""
 
+import gzip
+import io
 import json
 import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
 from datetime import datetime
 from enum import Enum
 from pathlib import Path, PosixPath
@@ -12,6 +20,8 @@ from uuid import UUID
 import pytest
 
 import platitudes as pl
+from platitudes.shell import Shell
+from platitudes.watch import make_watcher
 
 os.environ["TEST_DATE"] = "1956-01-31T10:00:00"
 
@@ -127,6 +137,31 @@ def test_uuid():
     )
 
 
+def test_int_ranges():
+    """Ranges and sets of integers are parsed into compact objects"""
+
+    def main(rows: range, shards: pl.IntSet = pl.IntSet("1,5,9-200")):
+        return rows, shards
+
+    rows, shards = pl.run(main, ["prog", "0-5000000"])
+    assert rows == range(5000001)
+    assert len(shards) == 194
+    assert 150 in shards and 6 not in shards and 201 not in shards
+    assert shards.ranges == [range(1, 2), range(5, 6), range(9, 201)]
+
+    _, shards = pl.run(main, ["prog", "7", "--shards", "10-20,3,21-30,-2--1"])
+    assert str(shards) == "-2--1,3,10-30"
+    assert list(shards) == [-2, -1, 3, *range(10, 31)]
+    assert shards & pl.IntSet("0-10") == pl.IntSet("3,10")
+    # Results of set operations are stored as spans, not one per integer
+    assert (shards | pl.IntSet("4-9")).ranges == [range(-2, 0), range(3, 31)]
+
+    too_big = ["prog", "1", "--shards", f"0-{2**63}"]
+    for argv in (["prog", "5-3"], ["prog", "1", "--shards", "1,a"], too_big):
+        with pytest.raises(pl.PlatitudesError):
+            pl.run(main, argv)
+
+
 def test_enum():
     """Check positional enums"""
     app = pl.Platitudes()
@@ -498,3 +533,833 @@ def test_magic_config_priority_pl_run():
             ["prog", "--config-file", fh.name, "--b-int", "2"],
             config_file="config-file",
         )
+
+
+def test_output_formats(capsys):
+    """Return values are written to stdout in the chosen format."""
+    app = pl.Platitudes()
+
+    @app.command(output="jsonl")
+    def records(n: int):
+        for i in range(n):
+            yield {"i": i, "path": Path("a")}
+
+    @app.command(output="tsv")
+    def rows():
+        return [("a\tb", 1), ("c", 2)]
+
+    @app.command(output="lines")
+    def single():
+        print("before")
+        return 42
+
+    app(["prog", "records", "2"])
+    assert capsys.readouterr().out == '{"i": 0, "path": "a"}\n{"i": 1, "path": "a"}\n'
+
+    app(["prog", "rows"])
+    assert capsys.readouterr().out == "a\\tb\t1\nc\t2\n"
+
+    assert app(["prog", "single"]) == 42
+    assert capsys.readouterr().out == "before\n42\n"
+
+    with pytest.raises(pl.PlatitudesError):
+        app.command(output="xml")
+
+
+def test_output_broken_pipe(monkeypatch):
+    """Closing stdout stops the output without a traceback."""
+    closed = []
+
+    def _():
+        try:
+            while True:
+                yield "y"
+        finally:
+            closed.append(True)
+
+    def broken_write(_):
+        raise BrokenPipeError
+
+    monkeypatch.setattr("sys.stdout.write", broken_write)
+    monkeypatch.setattr("platitudes.output._silence_stdout", lambda: None)
+    with pytest.raises(SystemExit):
+        pl.run(_, ["prog"], output="lines")
+    assert closed == [True]
+
+
+def test_lazy_files(tmp_path):
+    """File parameters are only opened when first used."""
+    data = tmp_path / "data.bin"
+    data.write_bytes(b"hello\nworld\n")
+    received = {}
+
+    app = pl.Platitudes()
+
+    @app.command()
+    def _(
+        binary: pl.BinaryFile,
+        text: pl.TextFile,
+        mapped: Annotated[bytes, pl.Argument(mmap=True)],
+    ):
+        assert not binary.is_open
+        assert binary.read(5) == b"hello"
+        assert list(text) == ["hello\n", "world\n"]
+        assert mapped[:5] == b"hello"
+        assert mapped.memoryview()[6:11].tobytes() == b"world"
+        assert mapped.find(b"world") == 6
+        received.update(binary=binary, text=text, mapped=mapped)
+
+    app(["prog", "_", str(data), str(data), str(data)])
+
+    assert isinstance(received["mapped"], pl.MappedFile)
+    assert not any(file.is_open for file in received.values())
+
+    with pytest.raises(SystemExit):
+        app(["prog", "_", str(tmp_path), str(data), str(data)])
+
+
+@pytest.mark.parametrize("compression", ["gzip", "bz2", "xz"])
+def test_compressed_files(tmp_path, compression):
+    """Compressed files are decoded and encoded while streaming."""
+
+    def compress(
+        src: pl.TextFile,
+        dst: Annotated[Path, pl.Argument(compress=compression, buffer_size=64)],
+    ):
+        for line in src:
+            dst.write(line.upper().encode())
+        return dst
+
+    def decompress(src: Annotated[pl.TextFile, pl.Argument(decompress=True)]):
+        return [line.strip() for line in src]
+
+    text = tmp_path / "data.txt"
+    text.write_text("".join(f"line {i}\n" for i in range(1000)))
+    compressed = tmp_path / "data.out"
+
+    dst = pl.run(compress, ["prog", str(text), str(compressed)])
+    assert isinstance(dst, pl.BinaryFile)
+    assert not compressed.read_bytes().startswith(b"LINE")
+
+    # Detected from the contents since the extension gives nothing away
+    lines = pl.run(decompress, ["prog", str(compressed)])
+    assert lines == [f"LINE {i}" for i in range(1000)]
+    assert pl.run(decompress, ["prog", str(text)])[-1] == "line 999"
+
+    with pytest.raises(pl.PlatitudesError):
+        pl.Argument(compress="zip")
+
+
+PIPE_SOURCE = """
+from pathlib import Path
+from typing import Annotated
+
+import platitudes as pl
+
+
+def upper(
+    src: Annotated[pl.BinaryFile, pl.Argument(decompress=True)],
+    dst: Annotated[Path, pl.Argument(allow_dash=True, role="output")],
+):
+    print("upper: starting")
+    if isinstance(dst, Path):
+        dst = pl.BinaryFile(dst, writing=True)
+    for chunk in src.chunks(4):
+        dst.write(bytes(chunk).upper())
+    dst.close()
+
+
+pl.run(upper)
+"""
+
+
+def test_std_streams(tmp_path, monkeypatch):
+    """A dash reads from stdin and writes to stdout."""
+    script = tmp_path / "upper.py"
+    script.write_text(PIPE_SOURCE)
+    env = os.environ | {"PYTHONPATH": str(Path(pl.__file__).parents[1])}
+
+    def pipe(*args: str, data: bytes) -> bytes:
+        process = subprocess.run(
+            [sys.executable, str(script), *args],
+            input=data,
+            capture_output=True,
+            env=env,
+            check=True,
+        )
+        return process.stdout
+
+    data = gzip.compress(b"hello\nworld\n")
+    assert pipe("-", "-", data=data) == b"upper: starting\nHELLO\nWORLD\n"
+
+    # Paths are still paths unless they are -
+    out = tmp_path / "out.txt"
+    assert pipe("-", str(out), data=b"plain") == b"upper: starting\n"
+    assert out.read_bytes() == b"PLAIN"
+
+    # Validation of the path is skipped for -
+    def _(src: Annotated[pl.TextFile, pl.Argument(exists=True)]):
+        return src.is_std
+
+    assert pl.run(_, ["prog", "-"])
+
+    # Calls reading stdin are never cached, its contents change between runs
+    calls = []
+
+    def cached(src: pl.TextFile):
+        calls.append(src.is_std)
+
+    monkeypatch.setenv("PLATITUDES_CACHE_DIR", str(tmp_path / "cache"))
+    for _ in range(2):
+        pl.run(cached, ["prog", "-"], cache=True)
+    assert calls == [True, True]
+
+    def mapped(data: pl.MappedFile):
+        return data
+
+    with pytest.raises(pl.PlatitudesError):
+        pl.run(mapped, ["prog", "-"])
+
+
+def test_cache(tmp_path, monkeypatch, capsys):
+    """Cached commands replay their output until their inputs change."""
+    monkeypatch.setenv("PLATITUDES_CACHE_DIR", str(tmp_path / "cache"))
+    data = tmp_path / "data.txt"
+    data.write_text("1")
+    calls = []
+
+    app = pl.Platitudes()
+
+    @app.command(cache=True, output="lines")
+    def _(n: int, path: Path):
+        calls.append(n)
+        print("computing")
+        return n * int(path.read_text())
+
+    assert app(["prog", "_", "2", str(data)]) == 2
+    assert app(["prog", "_", "2", str(data)]) == 2
+    assert capsys.readouterr().out == "computing\n2\n" * 2
+    assert calls == [2]
+
+    app(["prog", "_", "3", str(data)])
+    assert calls == [2, 3]
+
+    # Changing the contents of a Path argument invalidates the entry
+    data.write_text("10")
+    os.utime(data, ns=(0, 0))
+    assert app(["prog", "_", "2", str(data)]) == 20
+    assert calls == [2, 3, 2]
+
+    # So does changing a file matched by a glob argument
+    @app.command(cache=True)
+    def total(paths: Annotated[Iterator[Path], pl.Argument(glob=True)]):
+        calls.append("total")
+        return sum(int(path.read_text()) for path in paths)
+
+    pattern = str(tmp_path / "*.txt")
+    assert app(["prog", "total", pattern]) == 10
+    assert app(["prog", "total", pattern]) == 10
+    assert calls.count("total") == 1
+    data.write_text("7")
+    os.utime(data, ns=(1, 1))
+    assert app(["prog", "total", pattern]) == 7
+    assert calls.count("total") == 2
+
+    # Entries which no longer load, e.g. referencing a class since renamed or
+    # a module since removed, are recomputed
+    for stale in (b"cplatitudes\nGone\n.", b"cgone\nThing\n."):
+        for entry in (tmp_path / "cache" / "results").iterdir():
+            entry.write_bytes(stale)
+        assert app(["prog", "total", pattern]) == 7
+    assert calls.count("total") == 4
+
+    with pytest.raises(pl.PlatitudesError):
+        app.command(cache="sometimes")
+
+
+def test_cache_eviction(tmp_path, monkeypatch):
+    """The least recently used entries are evicted past the size limit."""
+    monkeypatch.setenv("PLATITUDES_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("PLATITUDES_CACHE_MAX_SIZE", "2000")
+
+    def _(n: int):
+        return b"x" * 900
+
+    for n in range(5):
+        pl.run(_, ["prog", str(n)], cache=True)
+
+    assert len(list((tmp_path / "results").iterdir())) == 2
+
+
+@pytest.mark.parametrize("mode", ["mtime", "hash"])
+def test_incremental(tmp_path, monkeypatch, mode):
+    """Commands are skipped while their outputs are up to date."""
+    monkeypatch.setenv("PLATITUDES_CACHE_DIR", str(tmp_path / "cache"))
+    source = tmp_path / "source.txt"
+    target = tmp_path / "target.txt"
+    source.write_text("a")
+    calls = []
+
+    app = pl.Platitudes()
+
+    @app.command(incremental=mode)
+    def build(
+        src: Annotated[Path, pl.Argument(role="input")],
+        dst: Annotated[Path, pl.Argument(role="output")],
+        upper: bool = False,
+    ):
+        calls.append(src.read_text())
+        dst.write_text(src.read_text().upper() if upper else src.read_text())
+
+    argv = ["prog", "build", str(source), str(target)]
+    app(argv)
+    app(argv)
+    assert calls == ["a"]
+
+    source.write_text("b")
+    os.utime(target, ns=(0, 0))
+    app(argv)
+    app(argv)
+    assert calls == ["a", "b"]
+
+    # Only the strict mode tracks changes on the other arguments
+    app([*argv, "--upper"])
+    assert len(calls) == (2 if mode == "mtime" else 3)
+
+    target.unlink()
+    app(argv)
+    assert target.exists()
+
+    # Every file matched by a glob input is an input
+    @app.command(incremental=mode)
+    def concat(
+        srcs: Annotated[Iterator[Path], pl.Argument(glob=True, role="input")],
+        dst: Annotated[Path, pl.Argument(role="output")],
+    ):
+        calls.append("concat")
+        dst.write_text("".join(src.read_text() for src in srcs))
+
+    argv = ["prog", "concat", str(tmp_path / "*.txt"), str(tmp_path / "all.out")]
+    app(argv)
+    app(argv)
+    assert calls.count("concat") == 1
+    source.write_text("c")
+    os.utime(tmp_path / "all.out", ns=(0, 0))
+    app(argv)
+    assert calls.count("concat") == 2
+
+    # Commands reading stdin always run, its contents can't be tracked
+    @app.command(incremental=mode)
+    def piped(
+        src: Annotated[pl.TextFile, pl.Argument(role="input")],
+        dst: Annotated[Path, pl.Argument(role="output")],
+    ):
+        calls.append("piped")
+        dst.write_text("piped")
+
+    app(["prog", "piped", "-", str(tmp_path / "piped.out")])
+    app(["prog", "piped", "-", str(tmp_path / "piped.out")])
+    assert calls.count("piped") == 2
+
+    with pytest.raises(pl.PlatitudesError):
+        pl.Argument(role="both")
+
+
+def test_platitudes_stats(capsys, monkeypatch):
+    """--platitudes-stats reports the resource usage of a run."""
+
+    def _(n: int):
+        return sum(range(n))
+
+    pl.run(_, ["prog", "10", "--platitudes-stats"])
+    stats = capsys.readouterr().err
+    assert stats.startswith("platitudes-stats: parse=")
+    assert "command=" in stats
+    assert "maxrss=" in stats
+
+    monkeypatch.setenv("PLATITUDES_STATS", "1")
+    pl.run(_, ["prog", "10"])
+    assert "platitudes-stats" in capsys.readouterr().err
+
+    monkeypatch.setenv("PLATITUDES_STATS", "0")
+    pl.run(_, ["prog", "10"])
+    assert "platitudes-stats" not in capsys.readouterr().err
+
+    # Arguments after -- are values, even if they look like the flag
+    def echo(text: str):
+        return text
+
+    monkeypatch.delenv("PLATITUDES_STATS")
+    assert pl.run(echo, ["prog", "--", "--platitudes-stats"]) == "--platitudes-stats"
+    assert "platitudes-stats:" not in capsys.readouterr().err
+
+
+def test_platitudes_tracemalloc(capsys, tmp_path):
+    """--platitudes-tracemalloc reports the top allocations."""
+
+    def _(n: int):
+        return [bytes(1024) for _ in range(n)]
+
+    prefix = tmp_path / "profile"
+    pl.run(_, ["prog", "1000", f"--platitudes-tracemalloc={prefix}"])
+    report = capsys.readouterr().err
+    assert "platitudes-tracemalloc: parsed net=" in report
+    assert "platitudes-tracemalloc: finished net=" in report
+    assert "test_cmdline.py" in report.split("finished")[1]
+    assert (tmp_path / "profile.parsed.snapshot").exists()
+    assert (tmp_path / "profile.finished.snapshot").exists()
+
+
+def test_resource_limits(capsys):
+    """Commands exceeding their limits are stopped."""
+    # The limits rely on POSIX APIs
+    resource = pytest.importorskip("resource")
+
+    def _(seconds: float):
+        time.sleep(seconds)
+        return "done"
+
+    with pytest.raises(SystemExit) as exit_:
+        pl.run(_, ["prog", "5"], timeout=0.1)
+    assert exit_.value.code == 124
+    error = json.loads(capsys.readouterr().err)
+    assert error["limit"] == "timeout"
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+    assert pl.run(_, ["prog", "0"], timeout=5) == "done"
+
+    def allocate(n_bytes: int):
+        return bytearray(n_bytes)
+
+    memory_limits = resource.getrlimit(resource.RLIMIT_AS)
+    with pytest.raises(SystemExit) as exit_:
+        pl.run(allocate, ["prog", str(2 * 1024**3)], max_memory="1G")
+    assert exit_.value.code == 121
+    assert json.loads(capsys.readouterr().err)["value"] == 1024**3
+    assert resource.getrlimit(resource.RLIMIT_AS) == memory_limits
+
+    def spin():
+        while True:
+            pass
+
+    with pytest.raises(SystemExit) as exit_:
+        pl.run(spin, ["prog"], cpu_seconds=1)
+    assert exit_.value.code == 122
+
+    with pytest.raises(pl.PlatitudesError):
+        pl.run(spin, ["prog"], max_memory="lots")
+
+
+def test_sweep(capsys):
+    """--sweep runs the command for every combination of values."""
+    app = pl.Platitudes()
+
+    @app.command()
+    def train(lr: float, depth: int = 1, verbose: bool = False):
+        if depth == 4:
+            e_ = "too deep"
+            raise ValueError(e_)
+        print(f"training {lr} {depth}")
+        return lr * depth
+
+    with pytest.raises(SystemExit) as exit_:
+        app(
+            [
+                "prog",
+                "train",
+                "--sweep",
+                "lr=0.5,0.25",
+                "--sweep=depth=2..4",
+                "--sweep-workers=2",
+            ]
+        )
+    assert exit_.value.code == 1
+
+    out, err = capsys.readouterr()
+    records = [json.loads(line) for line in out.splitlines()]
+    assert [r["params"] for r in records[:3]] == [
+        {"lr": "0.5", "depth": "2"},
+        {"lr": "0.5", "depth": "3"},
+        {"lr": "0.5", "depth": "4"},
+    ]
+    assert len(records) == 6
+    assert records[0]["result"] == 1.0
+    assert records[0]["stdout"] == "training 0.5 2\n"
+    assert records[2]["exit_code"] == 1
+    assert records[2]["error"] == "ValueError: too deep"
+    assert "2 of 6 sweep runs failed" in err
+
+    def _(name: str, times: int, shout: bool = False):
+        return name.upper() * times if shout else name * times
+
+    pl.run(_, ["prog", "a", "--sweep", "times=1,3", "--sweep", "shout=false,true"])
+    results = [
+        json.loads(line)["result"] for line in capsys.readouterr().out.splitlines()
+    ]
+    assert results == ["a", "A", "aaa", "AAA"]
+
+    with pytest.raises(pl.PlatitudesError):
+        pl.run(_, ["prog", "a", "--sweep", "repeat=1,2"])
+
+    # Mistakes are reported with the help of the command
+    for mistake in (
+        ["--sweep", "lr"],
+        ["--sweep", "depth=a,b"],
+        ["--sweep", "rate=1,2"],
+        ["--sweep", "lr=1,2", "--watch"],
+    ):
+        with pytest.raises(SystemExit) as exit_:
+            app(["prog", "train", "0.1", *mistake])
+        assert exit_.value.code == 1
+        assert "usage: " in capsys.readouterr().err
+
+    # Arguments after -- are passed on as they are
+    @app.command()
+    def echo(text: str):
+        return text
+
+    assert app(["prog", "echo", "--", "--sweep"]) == "--sweep"
+
+
+def test_chain(tmp_path, capsys):
+    """Chained commands share a context and run in order."""
+    app = pl.Platitudes()
+    calls = []
+
+    @app.command()
+    def extract(src: Path, ctx: pl.Context):
+        calls.append("extract")
+        return src.read_text().split()
+
+    @app.command()
+    def transform(ctx: pl.Context, mode: str = "upper"):
+        calls.append("transform")
+        ctx.mode = mode
+        return [getattr(word, mode)() for word in ctx.last]
+
+    @app.command()
+    def load(dst: Path, ctx: pl.Context):
+        calls.append("load")
+        dst.write_text(f"{ctx.mode}: {' '.join(ctx.last)}")
+        return len(ctx.results["extract"])
+
+    src = tmp_path / "src.txt"
+    src.write_text("hello chained world")
+    dst = tmp_path / "dst.txt"
+
+    chain = ["prog", "chain", "extract", str(src), "--", "transform", "--mode"]
+    assert app([*chain, "title", "--", "load", str(dst)]) == 3
+    assert dst.read_text() == "title: Hello Chained World"
+
+    # Standalone commands get a fresh context
+    assert app(["prog", "extract", str(src)]) == ["hello", "chained", "world"]
+
+    # Nothing runs if any of the commands fails to parse
+    calls.clear()
+    with pytest.raises(SystemExit):
+        app(["prog", "chain", "extract", str(src), "--", "load"])
+    assert calls == []
+
+    for mistake in (["extract", str(src), "--"], ["--", "load", str(dst)]):
+        with pytest.raises(SystemExit) as exit_:
+            app(["prog", "chain", *mistake])
+        assert exit_.value.code == 1
+        assert "Missing command in chain" in capsys.readouterr().err
+
+    with pytest.raises(SystemExit) as exit_:
+        app(["prog", "chain", "extract", str(src), "--watch"])
+    assert exit_.value.code == 1
+
+
+def test_resources(tmp_path, capsys):
+    """Resources are created once and injected into commands."""
+    app = pl.Platitudes()
+    events = []
+
+    @app.resource("pool")
+    def make_pool():
+        events.append("open")
+        yield ["connection"]
+        events.append("close")
+
+    @app.command()
+    def first(n: int, pool: Annotated[list, pl.Resource()]):
+        pool.append(n)
+        return n
+
+    @app.command()
+    def second(conn: Annotated[list, pl.Resource("pool")], missing: int = 1):
+        return conn
+
+    @app.command()
+    def broken(db: Annotated[list, pl.Resource()]):
+        pass
+
+    # Resources are kept for the life of the process, across invocations
+    assert app(["prog", "first", "3"]) == 3
+    chain = ["prog", "chain", "first", "1", "--", "first", "2", "--", "second"]
+    assert app(chain) == ["connection", 3, 1, 2]
+    assert events == ["open"]
+
+    # And torn down at exit
+    app._providers.close()
+    assert events == ["open", "close"]
+
+    with pytest.raises(pl.PlatitudesError):
+        app(["prog", "broken"])
+
+    # Each worker of a sweep creates its own and tears them down when exiting
+    @app.resource()
+    def log():
+        path = tmp_path / "log.txt"
+        yield path
+        with path.open("a") as fh:
+            fh.write("close\n")
+
+    @app.command()
+    def logged(n: int, log: Annotated[Path, pl.Resource()]):
+        with log.open("a") as fh:
+            fh.write(f"{n}\n")
+
+    app(["prog", "logged", "--sweep", "n=1..3", "--sweep-workers", "1"])
+    assert (tmp_path / "log.txt").read_text() == "1\n2\n3\nclose\n"
+
+    with pytest.raises(pl.PlatitudesError):
+        pl.run(first, ["prog", "1"])
+
+
+def test_glob(tmp_path, monkeypatch):
+    """Glob patterns are expanded for Iterator and list of Path params."""
+    for name in ("a.csv", "b.txt", "x/c.csv", "x/y/d.csv", "x/.hidden.csv"):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).touch()
+    (tmp_path / "z.csv").mkdir()
+    monkeypatch.chdir(tmp_path)
+
+    def lazy(paths: Annotated[Iterator[Path], pl.Argument(glob=True)]):
+        assert not isinstance(paths, list)
+        return sorted(paths)
+
+    def files(
+        paths: Annotated[
+            list[Path], pl.Argument(glob=True, dir_okay=False, exists=True)
+        ] = "*.csv",  # pyright: ignore
+    ):
+        return paths
+
+    assert pl.run(lazy, ["prog", "**/*.csv"]) == [
+        Path("a.csv"),
+        Path("x/c.csv"),
+        Path("x/y/d.csv"),
+        Path("z.csv"),
+    ]
+    assert pl.run(lazy, ["prog", f"{tmp_path}/x/*"]) == [
+        tmp_path / "x/c.csv",
+        tmp_path / "x/y",
+    ]
+    assert pl.run(lazy, ["prog", "x/.*"]) == [Path("x/.hidden.csv")]
+    assert pl.run(files, ["prog"]) == [Path("a.csv")]
+
+    with pytest.raises(pl.PlatitudesError):
+        pl.run(files, ["prog", "--paths", "*.parquet"])
+
+
+def test_config_layers(tmp_path, monkeypatch):
+    """Config layers are merged with the later ones taking precedence."""
+    app = pl.Platitudes()
+    # TOML layers can only be read from Python 3.11
+    toml = sys.version_info >= (3, 11)
+    user = tmp_path / ("user.toml" if toml else "user.json")
+
+    def write_user(depth: int):
+        user.write_text(f"depth = {depth}\n" if toml else json.dumps({"depth": depth}))
+
+    @app.command(
+        config_file="config-file",
+        config_layers=[tmp_path / "system.json", user, "missing"],
+    )
+    def train(lr: float, depth: int, name: str = "model"):
+        return (lr, depth, name)
+
+    @app.command()
+    def plain(depth: int):
+        return depth
+
+    (tmp_path / "system.json").write_text(
+        json.dumps({"lr": 0.1, "depth": 2, "unrelated": [1, 2, 3]})
+    )
+    write_user(3)
+    (tmp_path / "project.json").write_text(json.dumps({"depth": 4}))
+
+    assert app(["prog", "train"]) == (0.1, 3, "model")
+    assert app(["prog", "train", "--config-file", str(tmp_path / "project.json")]) == (
+        0.1,
+        4,
+        "model",
+    )
+    assert app(["prog", "train", "--lr", "0.5"]) == (0.5, 3, "model")
+
+    # Commands without config files are unaffected by those of other commands
+    assert app(["prog", "plain", "7"]) == 7
+
+    # Converted values are reused until the file changes
+    def fail(path):
+        raise AssertionError(path)
+
+    monkeypatch.setattr("platitudes.config._read", fail)
+    assert app(["prog", "train"]) == (0.1, 3, "model")
+
+    write_user(30)
+    with pytest.raises(AssertionError):
+        app(["prog", "train"])
+
+    if not toml:
+        monkeypatch.undo()
+        (tmp_path / "user.toml").write_text("depth = 3\n")
+        with pytest.raises(pl.PlatitudesError, match="TOML"):
+            pl.run(train, ["prog"], config_layers=[tmp_path / "user.toml"])
+
+
+@pytest.mark.parametrize("poll", [False, True])
+def test_watch(tmp_path, monkeypatch, capsys, poll):
+    """--watch runs the command again when an input changes."""
+    if poll:
+        monkeypatch.setenv("PLATITUDES_WATCH_POLL", "1")
+        monkeypatch.setattr("platitudes.watch.POLL_INTERVAL", 0.05)
+    elif sys.platform.startswith("linux"):
+        # False values don't force polling
+        monkeypatch.setenv("PLATITUDES_WATCH_POLL", "0")
+        watcher = make_watcher([tmp_path])
+        watcher.close()
+        assert type(watcher).__name__ == "_InotifyWatcher"
+
+    src = tmp_path / "src.txt"
+    src.write_text("one")
+    seen = []
+
+    def _(src: Path, out: Annotated[Path, pl.Argument(role="output")]):
+        seen.append(src.read_text())
+        # Outputs are not watched so this doesn't trigger a rerun
+        out.write_text(str(len(seen)))
+        if len(seen) == 2:
+            raise KeyboardInterrupt
+
+    timer = threading.Timer(0.5, src.write_text, ["second"])
+    timer.start()
+    pl.run(_, ["prog", str(src), str(tmp_path / "out"), "--watch"])
+    timer.join()
+
+    assert seen == ["one", "second"]
+    assert "rerunning after changes to" in capsys.readouterr().err
+
+    # Glob matches are watched, and invalid arguments wait for the next change
+    def glob(srcs: Annotated[list[Path], pl.Argument(glob=True, exists=True)]):
+        seen.append([src.read_text() for src in srcs])
+        if len(seen) == 4:
+            raise KeyboardInterrupt
+
+    removal = threading.Timer(0.5, src.unlink)
+    creation = threading.Timer(1.5, src.write_text, ["third"])
+    removal.start()
+    creation.start()
+    pl.run(glob, ["prog", str(tmp_path / "*.txt"), "--watch"])
+    removal.join()
+    creation.join()
+
+    assert seen[2:] == [["second"], ["third"]]
+    assert "No path matches" in capsys.readouterr().err
+
+    # Arguments after -- are values, even if they look like the flag
+    def echo(text: str):
+        return text
+
+    assert pl.run(echo, ["prog", "--", "--watch"]) == "--watch"
+
+
+def test_progress(capsys, monkeypatch):
+    """Progress reporters are injected and log their progress."""
+    monkeypatch.setattr("platitudes.progress.LOG_INTERVAL", 0.0)
+
+    def count(n: int, progress: pl.Progress):
+        for _ in progress.track(range(n)):
+            pass
+        assert progress.count == n
+        return n
+
+    # stderr is not a terminal so the progress is logged line by line
+    assert pl.run(count, ["prog", "1000"]) == 1000
+    lines = capsys.readouterr().err.splitlines()
+    assert lines[-1].startswith("count: 1,000/1,000 (100%)")
+
+    pl.run(count, ["prog", "--sweep", "n=100,200,300", "--sweep-workers=2"])
+    out, err = capsys.readouterr()
+    assert [json.loads(line)["result"] for line in out.splitlines()] == [
+        100,
+        200,
+        300,
+    ]
+    assert err.splitlines()[-1].startswith("count: 600/600 (100%)")
+    assert err.splitlines()[-1].endswith("[3/3 runs]")
+
+
+def test_shell(capsys, monkeypatch, tmp_path):
+    """The shell runs commands from its input until the end."""
+
+    class Colour(Enum):
+        RED = "red"
+        BLUE = "blue"
+
+    app = pl.Platitudes()
+    created = []
+
+    @app.resource()
+    def counter():
+        created.append([])
+        return created[-1]
+
+    @app.command()
+    def greet(
+        name: str,
+        counter: Annotated[list, pl.Resource()],
+        colour: Colour = Colour.RED,
+    ):
+        counter.append(name)
+        print(f"hello {name} in {colour.value}")
+
+    lines = "greet ada --colour blue\n\ngreet 'grace hopper'\ngreet\nshell\nexit\n"
+    shell = Shell(app, "prog", stdin=io.StringIO(lines), stdout=io.StringIO())
+    shell.run()
+
+    # The resource is created once and reused by every command
+    assert created == [["ada", "grace hopper"]]
+    out, err = capsys.readouterr()
+    assert out == "hello ada in blue\nhello grace hopper in red\n"
+    statuses = [line for line in err.splitlines() if line.startswith("[")]
+    assert [status.rsplit(",", 1)[0] for status in statuses] == [
+        "[greet: ok",
+        "[greet: ok",
+        "[greet: exit code 2",
+    ]
+    assert "already in the shell" in err
+
+    assert shell.completenames("gr") == ["greet"]
+    assert shell.completedefault("--c", "greet ada --c", 10, 13) == ["--colour"]
+    assert shell.completedefault("b", "greet ada --colour b", 19, 20) == ["blue"]
+    for name in ("data.csv", "data", ".data"):
+        (tmp_path / name).touch()
+    text = f"{tmp_path}/da"
+    assert shell.completedefault(text, f"greet {text}", 6, 6 + len(text)) == [
+        f"{tmp_path}/data",
+        f"{tmp_path}/data.csv",
+    ]
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO("greet linus\n"))
+    app(["prog", "shell"])
+    assert "hello linus in red\n" in capsys.readouterr().out
+    assert created == [["ada", "grace hopper", "linus"]]
+
+    for mistake in (["shell", "greet"], ["shell", "--watch"]):
+        with pytest.raises(SystemExit) as exit_:
+            app(["prog", *mistake])
+        assert exit_.value.code == 1
+        assert "The shell takes no arguments" in capsys.readouterr().err
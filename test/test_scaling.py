@@ -0,0 +1,156 @@
+"""Stress tests checking that Platitudes scales linearly.
+
+Each test times an operation at two sizes, `N` and `4 * N`, and checks that
+the larger one costs less than `MAX_RATIO` times the smaller one. A linear
+operation has a ratio close to 4 while a quadratic one would be close to 16.
+"""
+
+import argparse
+import gc
+import inspect
+import time
+from collections.abc import Callable
+from typing import Any
+
+import platitudes as pl
+
+SIZE = 250
+MAX_RATIO = 6
+
+
+def _make_command(n_params: int, positional: bool = False) -> Callable:
+    def command(**kwargs):
+        pass
+
+    command.__signature__ = inspect.Signature(  # pyright: ignore
+        [
+            inspect.Parameter(
+                f"param_{i}",
+                inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                default=inspect.Parameter.empty if positional else 0,
+                annotation=int,
+            )
+            for i in range(n_params)
+        ]
+    )
+    command.__name__ = "cmd"
+    return command
+
+
+def _best_time(setup: Callable[[int], Any], run: Callable[[Any], Any], n: int):
+    timings = []
+    for _ in range(5):
+        state = setup(n)
+        # Like `timeit`, so that collections triggered by the setup don't
+        # land in the timings
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run(state)
+            timings.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return min(timings)
+
+
+def _ratio(setup: Callable[[int], Any], run: Callable[[Any], Any]) -> float:
+    small = _best_time(setup, run, SIZE)
+    large = _best_time(setup, run, 4 * SIZE)
+    return large / small
+
+
+def _best_ratio(
+    setup: Callable[[int], Any], run: Callable[[Any], Any], limit: float
+) -> float:
+    # Other processes slowing down the larger size inflate the ratio, so it's
+    # measured again before failing. A quadratic operation stays around 16.
+    for _ in range(3):
+        ratio = _ratio(setup, run)
+        if ratio < limit:
+            break
+    return ratio
+
+
+def _assert_linear(setup: Callable[[int], Any], run: Callable[[Any], Any]):
+    ratio = _best_ratio(setup, run, MAX_RATIO)
+    assert ratio < MAX_RATIO, f"{ratio=:.1f}"
+
+
+def _app_with_params(n: int, positional: bool = False) -> pl.Platitudes:
+    app = pl.Platitudes()
+    app.command()(_make_command(n, positional))
+    return app
+
+
+def test_decoration_scales_with_parameters():
+    """Decorating a command is linear in its number of parameters."""
+    _assert_linear(_make_command, lambda cmd: pl.Platitudes().command()(cmd))
+
+
+def test_decoration_scales_with_commands():
+    """Registering commands is linear in their number."""
+
+    def setup(n):
+        commands = []
+        for i in range(n):
+            command = _make_command(3)
+            command.__name__ = f"cmd_{i}"
+            commands.append(command)
+        return commands
+
+    def run(commands):
+        app = pl.Platitudes()
+        for command in commands:
+            app.command()(command)
+
+    _assert_linear(setup, run)
+
+
+def test_parse_scales_with_positionals():
+    """Parsing is linear in the number of positionals passed."""
+
+    def setup(n):
+        return _app_with_params(n, positional=True), ["cmd"] + ["1"] * n
+
+    _assert_linear(setup, lambda state: state[0]._parser.parse_args(state[1]))
+
+
+def _options_argv(n: int) -> list[str]:
+    argv = ["cmd"]
+    for i in range(n):
+        argv.extend([f"--param-{i}", "1"])
+    return argv
+
+
+def test_parse_scales_with_options():
+    """Parsing options scales no worse than with argparse alone."""
+
+    # argparse before 3.13 is itself quadratic on the number of options passed,
+    # so the ratio is compared to the one of a bare parser with the same options
+    def setup_argparse(n):
+        parser = argparse.ArgumentParser()
+        subparser = parser.add_subparsers().add_parser("cmd")
+        for i in range(n):
+            subparser.add_argument(f"--param-{i}", type=int, default=0)
+        return parser, _options_argv(n)
+
+    def setup(n):
+        return _app_with_params(n)._parser, _options_argv(n)
+
+    def run(state):
+        state[0].parse_args(state[1])
+
+    baseline = _ratio(setup_argparse, run)
+    limit = max(MAX_RATIO, 1.5 * baseline)
+    ratio = _best_ratio(setup, run, limit)
+    assert ratio < limit, f"{ratio=:.1f} {baseline=:.1f}"
+
+
+def test_help_scales_with_parameters():
+    """Formatting the help is linear in the number of parameters."""
+
+    def setup(n):
+        app = _app_with_params(n)
+        return app._subparsers.choices["cmd"]
+
+    _assert_linear(setup, lambda parser: parser.format_help())
@@ -0,0 +1,130 @@
+"""Tests for the `platitudes.testing` helpers."""
+
+import os
+import sys
+import time
+
+import pytest
+
+import platitudes as pl
+from platitudes.testing import CliRunner
+
+
+@pytest.fixture
+def app():
+    """Application with commands exercising every kind of outcome."""
+    app = pl.Platitudes()
+
+    @app.command()
+    def greet(name: str, times: int = 1):
+        print(f"Hello {name}" * times)
+        print("greeted", file=sys.stderr)
+        return times
+
+    @app.command()
+    def echo():
+        print(sys.stdin.read().upper(), end="")
+
+    @app.command()
+    def env(name: str):
+        print(os.environ.get(name))
+
+    @app.command()
+    def argv(name: str):
+        return sys.argv
+
+    @app.command()
+    def fail():
+        e_ = "Nope"
+        raise ValueError(e_)
+
+    @app.command()
+    def leave():
+        raise pl.Exit
+
+    return app
+
+
+def test_invoke(app):
+    """Output, exit code and return value of an invocation are captured."""
+    runner = CliRunner(app)
+
+    result = runner.invoke(["greet", "World", "--times", "2"])
+    assert result.exit_code == 0
+    assert result.stdout == "Hello WorldHello World\n"
+    assert result.stderr == "greeted\n"
+    assert result.return_value == 2
+
+    assert runner.invoke(["echo"], input="abc").stdout == "ABC"
+    assert runner.invoke(["env", "CLI_TEST"], env={"CLI_TEST": "x"}).stdout == "x\n"
+    assert "CLI_TEST" not in os.environ
+
+    argv = sys.argv
+    assert runner.invoke(["argv", "a"]).return_value == ["prog", "argv", "a"]
+    assert sys.argv is argv
+
+    result = runner.invoke(["greet"])
+    assert result.exit_code == 2
+    assert "required: name" in result.stderr
+
+    result = runner.invoke(["fail"])
+    assert result.exit_code == 1
+    assert isinstance(result.exception, ValueError)
+
+    assert runner.invoke(["leave"]).exit_code == 0
+    assert sys.stdout is not None and not hasattr(sys.stdout, "redirect")
+
+
+def test_invoke_many_threads(app):
+    """Invocations on threads don't see each other's output."""
+    runner = CliRunner(app)
+    cases = [["greet", str(i)] for i in range(200)]
+
+    results = runner.invoke_many(cases, workers=8)
+
+    assert [r.stdout for r in results] == [f"Hello {i}\n" for i in range(200)]
+
+    with pytest.raises(pl.PlatitudesError):
+        runner.invoke_many([{"args": ["env", "A"], "env": {"A": "1"}}])
+
+
+def test_invoke_many_processes(app):
+    """Invocations on processes can set environment variables."""
+    runner = CliRunner(app)
+    cases = [
+        {"args": ["env", "CLI_TEST"], "env": {"CLI_TEST": str(i)}} for i in range(8)
+    ]
+    cases.append(["fail"])
+
+    results = runner.invoke_many(cases, workers=2, processes=True)
+
+    assert [r.stdout for r in results[:-1]] == [f"{i}\n" for i in range(8)]
+    assert results[-1].exit_code == 1
+
+
+def test_invoke_many_cached(tmp_path, monkeypatch):
+    """Output of cached commands is captured per invocation."""
+    monkeypatch.setenv("PLATITUDES_CACHE_DIR", str(tmp_path))
+    stdout = sys.stdout
+    app = pl.Platitudes()
+
+    @app.command(cache=True)
+    def square(n: int):
+        for _ in range(50):
+            print(n)
+            # Let the other threads run in between
+            time.sleep(0.001)
+        return n * n
+
+    runner = CliRunner(app)
+    cases = [["square", str(i)] for i in range(40)]
+    expected = [f"{i}\n" * 50 for i in range(40)]
+
+    results = runner.invoke_many(cases, workers=8)
+    assert [r.stdout for r in results] == expected
+    assert sys.stdout is stdout
+
+    # Replayed from the cache
+    results = [runner.invoke(case) for case in cases]
+    assert [r.stdout for r in results] == expected
+    assert [r.return_value for r in results] == [i * i for i in range(40)]
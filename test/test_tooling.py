@@ -0,0 +1,173 @@
+"""Tests for the build tools available through `python -m platitudes`."""
+
+import functools
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import zipfile
+
+import pytest
+
+import platitudes as pl
+from platitudes.__main__ import app as tools
+from platitudes.launcher import launch
+
+APP_SOURCE = """
+from typing import Annotated
+
+import platitudes as pl
+
+app = pl.Platitudes(description="Example app", version="1.2.3")
+
+
+@app.command()
+def greet(name: Annotated[str, pl.Argument(help="Who to greet")], times: int = 1):
+    '''Say hello.
+
+    More details.
+    '''
+    return name * times
+"""
+
+
+@pytest.fixture
+def example_app(tmp_path, monkeypatch):
+    """Importable application, yielding its target string."""
+    (tmp_path / "example_cli.py").write_text(textwrap.dedent(APP_SOURCE))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "example_cli:app"
+    sys.modules.pop("example_cli", None)
+
+
+def _write_manifest(target, tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    tools(["prog", "manifest", target, "--output", str(manifest_path)])
+    sys.modules.pop("example_cli")
+    return manifest_path
+
+
+def test_manifest(example_app, tmp_path):
+    """The manifest describes every command of the app."""
+    manifest_path = _write_manifest(example_app, tmp_path)
+
+    manifest = json.loads(manifest_path.read_text())
+    assert manifest["prog"] == "example_cli"
+    assert manifest["version"] == "1.2.3"
+    greet = manifest["commands"]["greet"]
+    assert greet["summary"] == "Say hello."
+    assert greet["help"].startswith("usage: example_cli greet")
+    assert greet["parameters"][0]["help"] == "Who to greet"
+    assert greet["parameters"][1]["default"] == 1
+
+
+def test_launcher(example_app, tmp_path, capsys):
+    """The launcher answers --help from the manifest."""
+    manifest_path = _write_manifest(example_app, tmp_path)
+    capsys.readouterr()
+
+    for arguments in (["--help"], ["greet", "-h"], ["--version"]):
+        with pytest.raises(SystemExit) as wrapped_exit:
+            launch(manifest_path, ["prog", *arguments])
+        assert wrapped_exit.value.code == 0
+        assert "example_cli" not in sys.modules
+
+    out = capsys.readouterr().out
+    assert "Example app" in out
+    assert "Who to greet" in out
+    assert out.endswith("1.2.3\n")
+
+    assert launch(manifest_path, ["prog", "greet", "a", "--times", "3"]) == "aaa"
+
+
+def test_bundle(example_app, tmp_path, monkeypatch):
+    """Bundled apps run as zipapps."""
+    bundle = tmp_path / "tool.pyz"
+    tools(["prog", "bundle", example_app, "--output", str(bundle), "--no-timing"])
+
+    with zipfile.ZipFile(bundle) as archive:
+        names = archive.namelist()
+    assert "example_cli.pyc" in names
+    assert "platitudes/platitudes.pyc" in names
+
+    # The bundle must not depend on anything outside of the archive
+    monkeypatch.delenv("PYTHONPATH", raising=False)
+    run = functools.partial(
+        subprocess.run, capture_output=True, text=True, cwd="/", check=True
+    )
+    assert run([sys.executable, str(bundle), "--version"]).stdout == "1.2.3\n"
+    assert "Who to greet" in run([sys.executable, str(bundle), "greet", "-h"]).stdout
+    run([sys.executable, str(bundle), "greet", "a"])
+
+
+BROKEN_APP_SOURCE = """
+from pathlib import Path
+from typing import Annotated
+
+import platitudes as pl
+
+app = pl.Platitudes()
+
+
+@app.command()
+def fine(path: Annotated[Path, pl.Argument(role="input")] = Path("in")):
+    pass
+
+
+@app.command()
+def broken(
+    maybe: int | None,
+    env: Annotated[int, pl.Argument(envvar="N")],
+    pattern: Annotated[Path, pl.Argument(glob=True)],
+):
+    pass
+
+
+@app.command()
+def bad_help(x: Annotated[int, pl.Argument(help="100% wrong")] = 1):
+    pass
+"""
+
+
+def test_check(example_app, tmp_path, capsys, monkeypatch):
+    """Mistakes in commands are reported without running them."""
+    tools(["prog", "check", example_app])
+    assert capsys.readouterr().out == "example_cli:app: 1 commands OK\n"
+
+    (tmp_path / "broken_cli.py").write_text(textwrap.dedent(BROKEN_APP_SOURCE))
+    with pytest.raises(SystemExit) as exit_:
+        tools(["prog", "check", "broken_cli:app"])
+    sys.modules.pop("broken_cli", None)
+    assert exit_.value.code == 1
+
+    errors = capsys.readouterr().err.splitlines()
+    assert errors[0].startswith("broken: parameter 'maybe': Potentially None")
+    assert errors[1].startswith("broken: parameter 'env': Envvars")
+    assert errors[2].startswith("broken: parameter 'pattern': glob=True")
+    assert errors[3].startswith("bad_help: invalid help string")
+    assert errors[4] == "broken_cli:app: 4 problems found"
+
+    # Defaults which need converting are still validated on import
+    source = BROKEN_APP_SOURCE.replace("= 1):", '= "one"):')
+    (tmp_path / "broken_cli.py").write_text(textwrap.dedent(source))
+    with pytest.raises(SystemExit) as exit_:
+        tools(["prog", "check", "broken_cli:app"])
+    sys.modules.pop("broken_cli", None)
+    assert "invalid int value: 'one'" in capsys.readouterr().err
+
+    # Trusted mode skips the checks when registering commands
+    def _(maybe: int | None, count: int = 3):
+        return maybe, count
+
+    with pytest.raises(pl.PlatitudesError):
+        pl.run(_, ["prog", "1"])
+    monkeypatch.setenv("PLATITUDES_TRUSTED", "0")
+    with pytest.raises(pl.PlatitudesError):
+        pl.run(_, ["prog", "1"])
+    monkeypatch.setenv("PLATITUDES_TRUSTED", "1")
+    assert pl.run(_, ["prog", "1"]) == (1, 3)
+
+    # The check leaves the trusted mode of the caller as it was
+    tools(["prog", "check", example_app])
+    assert os.environ["PLATITUDES_TRUSTED"] == "1"